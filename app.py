@@ -1,17 +1,24 @@
-from dash import Dash, dcc, html
-from dash.dependencies import Input, Output
+import time
+from collections import OrderedDict
+
+from dash import Dash, dcc, html, Patch, no_update
+from dash.dependencies import Input, Output, State, ALL
+from dash.exceptions import PreventUpdate
+from flask import Response, request
 
 import plotly.graph_objects as go
 import plotly.subplots as sp
 import numpy as np
-import json, os
 
-# Usamos funciones y constantes desde fuzzy_core
-from fuzzy_core import (
-    create_system_from_json as run_system, 
+# Usamos funciones y constantes desde fuzzy_numpy (sin skfuzzy)
+from fuzzy_numpy import (
+    create_system_numpy as run_system, compile_ruleset,
     create_mf, X_COLOR, KEY_POINTS, X_OUTPUT, get_output_functions
 )
-from app_layout import create_layout
+from rules_loader import read_rules_json
+from app_layout import INVERSE_TAB, create_layout
+from fuzzy_inverse import get_index
+from fuzzy_metrics import dump_json, format_table, instrument, reset, timed
 
 
 # Inicialización de la App Dash
@@ -20,11 +27,26 @@ app.title = "Clasificador Fuzzy"
 app.layout = create_layout()
 
 
+# --- MÉTRICAS: tiempos por etapa (fuzzy_metrics) ---
+# /metrics devuelve los histogramas en JSON; ?format=table en texto y
+# ?reset=1 los vacía después de leerlos. FUZZY_METRICS=0 desactiva la toma de tiempos.
+@app.server.route('/metrics')
+def metrics():
+    if request.args.get('format') == 'table':
+        response = Response(format_table() + "\n", mimetype='text/plain')
+    else:
+        response = Response(dump_json(), mimetype='application/json')
+    if request.args.get('reset') in ('1', 'true'):
+        reset()
+    return response
+
+
 # --- CALLBACK 1: Actualizar la Gráfica de MF ---
 @app.callback(
     Output('mf-graph', 'figure'),
     [Input('mf-type-selector', 'value')]
 )
+@instrument('callback/update_mf_graph')
 def update_mf_graph(mf_type_selected):
     fig = go.Figure()
 
@@ -61,6 +83,7 @@ def update_rules_info(rules_filename):
      Input('ruleset-selector', 'value'), 
      Input('mf-type-selector', 'value')] 
 )
+@instrument('callback/run_simulation_and_update_ui')
 def run_simulation_and_update_ui(R, G, B, rules_filename, mf_type_selected):
     """
     Ejecuta el sistema difuso y actualiza los elementos visuales del dashboard.
@@ -85,94 +108,28 @@ def run_simulation_and_update_ui(R, G, B, rules_filename, mf_type_selected):
         text_output = f"Clasificación Fuzzy: {float(final_output_val):.2f} / 100"
 
         try:
-            output_funcs = get_output_functions(mf_type_selected)
-            agregado_np = np.zeros_like(X_OUTPUT)
-
-            # Método ALTERNATIVO: Usar el conjunto agregado interno de skfuzzy si está disponible
-            if hasattr(color_simulador, 'aggregate') and color_simulador.aggregate is not None:
-                # Si skfuzzy ya calculó el agregado, usarlo directamente
-                agregado_np = color_simulador.aggregate
-            else:
-                # Método de respaldo: reconstruir manualmente
-                for i, rule in enumerate(color_simulador.ctrl.rules):
-                    try:
-                        # Calcular activación de forma más robusta
-                        activacion_regla = 1.0
-                        
-                        # Método alternativo para acceder a los términos del antecedente
-                        if hasattr(rule.antecedent, '_terms'):
-                            terms_dict = rule.antecedent._terms
-                        elif hasattr(rule.antecedent, 'terms'):
-                            terms_dict = rule.antecedent.terms
-                        else:
-                            continue
-                            
-                        for (var_obj, term_obj) in terms_dict.items():
-                            var_name = var_obj.label
-                            term_label = term_obj.label
-                            
-                            # Obtener valor crisp
-                            if var_name == 'Rojo':
-                                crisp_val = R
-                            elif var_name == 'Verde':
-                                crisp_val = G  
-                            elif var_name == 'Azul':
-                                crisp_val = B
-                            else:
-                                continue
-                                
-                            # Calcular grado de pertenencia
-                            mf_vals = create_mf(mf_type_selected, KEY_POINTS[term_label], X_COLOR)
-                            grado = np.interp(crisp_val, X_COLOR, mf_vals)
-                            activacion_regla = min(activacion_regla, grado)
-                        
-                        # Obtener etiqueta de salida
-                        salida_label = None
-                        consequent_str = str(rule.consequent)
-                        # Buscar patrones como "ColorOutput IS Verde" o "ColorOutput_is_Verde"
-                        if 'IS' in consequent_str:
-                            parts = consequent_str.split('IS')
-                            if len(parts) > 1:
-                                salida_label = parts[1].strip()
-                        elif '_is_' in consequent_str:
-                            parts = consequent_str.split('_is_')
-                            if len(parts) > 1:
-                                salida_label = parts[1].strip()
-                        
-                        if salida_label and salida_label in output_funcs:
-                            mf_salida = output_funcs[salida_label]
-                            implicacion = np.minimum(mf_salida, activacion_regla)
-                            agregado_np = np.maximum(agregado_np, implicacion)
-                            
-                    except Exception as e:
-                        # Si falla, continuar con la siguiente regla
-                        continue
-
-            # Si no hay activación, crear forma suave alrededor del centroide
-            if np.max(agregado_np) == 0 and final_output_val is not None:
-                centroide = final_output_val
-                x_vals = X_OUTPUT
-                y_vals = np.exp(-0.05 * (x_vals - centroide)**2)
-                agregado_np = y_vals * 0.3
-
-            # --- Gráfica del conjunto agregado ---
-            fig.add_trace(go.Scatter(
-                x=X_OUTPUT, y=agregado_np,
-                mode='lines', fill='tozeroy',
-                name='Conjunto Agregado',
-                line=dict(color='blue', width=2),
-                fillcolor='rgba(0,0,255,0.4)'
-            ))
-
-            # --- Línea del centroide ---
-            max_height = np.max(agregado_np) if agregado_np.size > 0 else 1.0
-            fig.add_trace(go.Scatter(
-                x=[float(final_output_val), float(final_output_val)],
-                y=[0.0, float(max_height)],
-                mode='lines',
-                name=f'Centroide: {final_output_val:.2f}',
-                line=dict(color='red', dash='solid', width=3)
-            ))
+            # create_system_numpy siempre devuelve el conjunto agregado (se mide en 'numpy/aggregate')
+            agregado_np = color_simulador.aggregate
+
+            with timed('app/run_simulation/figure'):
+                # --- Gráfica del conjunto agregado ---
+                fig.add_trace(go.Scatter(
+                    x=X_OUTPUT, y=agregado_np,
+                    mode='lines', fill='tozeroy',
+                    name='Conjunto Agregado',
+                    line=dict(color='blue', width=2),
+                    fillcolor='rgba(0,0,255,0.4)'
+                ))
+
+                # --- Línea del centroide ---
+                max_height = np.max(agregado_np) if agregado_np.size > 0 else 1.0
+                fig.add_trace(go.Scatter(
+                    x=[float(final_output_val), float(final_output_val)],
+                    y=[0.0, float(max_height)],
+                    mode='lines',
+                    name=f'Centroide: {final_output_val:.2f}',
+                    line=dict(color='red', dash='solid', width=3)
+                ))
 
         except Exception as e:
             print(f"⚠️ Error en gráfica de defuzzificación: {e}") 
@@ -197,96 +154,329 @@ def run_simulation_and_update_ui(R, G, B, rules_filename, mf_type_selected):
     return text_output, style, fig
 
 # --- FUNCIÓN AUXILIAR: Gráfica estilo Toolbox ---
-def plot_rule_toolbox(rule, R_val, G_val, B_val, mf_type_selected):
-    """Visualización de reglas individuales - CORREGIDA para evitar el amarillo"""
-    fig = sp.make_subplots(rows=1, cols=4, subplot_titles=("Rojo", "Verde", "Azul", "Salida"))
+# Orden fijo de trazas en cada figura de regla, para poder parchearlas por índice:
+# Rojo, Verde, Azul -> [MF, línea crisp, área recortada]; Salida -> [MF, área recortada]
+RULE_VARS = ["Rojo", "Verde", "Azul"]
+OUTPUT_MF_TRACE = 3 * len(RULE_VARS)
+OUTPUT_AREA_TRACE = OUTPUT_MF_TRACE + 1
 
-    selected_mf = {name: create_mf(mf_type_selected, points, X_COLOR) for name, points in KEY_POINTS.items()}
-    crisp_vals = {"Rojo": R_val, "Verde": G_val, "Azul": B_val}
+# Figuras estáticas (curvas de MF) por (archivo de reglas, tipo de MF); se
+# reconstruyen si fuzzy_numpy recompila el ruleset (p. ej. porque cambió el archivo)
+RULE_FIGURES_CACHE_SIZE = 8
+_rule_figures_cache = OrderedDict()
 
-    # Calcular activación
-    activacion = min(
-        np.interp(R_val, X_COLOR, selected_mf[rule["Rojo"]]),
-        np.interp(G_val, X_COLOR, selected_mf[rule["Verde"]]),
-        np.interp(B_val, X_COLOR, selected_mf[rule["Azul"]])
-    )
+
+@instrument('app/rules/build_figure')
+def build_rule_figure(rule, mf_type_selected):
+    """Figura de una regla solo con las partes fijas: las curvas de MF (áreas y líneas vacías)."""
+    fig = sp.make_subplots(rows=1, cols=4, subplot_titles=("Rojo", "Verde", "Azul", "Salida"))
 
     # Colores más apropiados
     color_activation = 'orange'  # En lugar de amarillo brillante
     color_mf = 'blue'
     color_crisp = 'red'
-    
-    for j, var in enumerate(["Rojo", "Verde", "Azul"], start=1):
-        mf_vals = selected_mf[rule[var]]
-        crisp = crisp_vals[var]
-        
+
+    for j, var in enumerate(RULE_VARS, start=1):
+        mf_vals = create_mf(mf_type_selected, KEY_POINTS[rule[var]], X_COLOR)
+
         # MF original
-        fig.add_trace(go.Scatter(x=X_COLOR, y=mf_vals, mode="lines", 
+        fig.add_trace(go.Scatter(x=X_COLOR, y=mf_vals, mode="lines",
                                line=dict(color=color_mf, width=2)), row=1, col=j)
-        
+
         # Línea del valor crisp
-        fig.add_trace(go.Scatter(x=[crisp, crisp], y=[0, 1], mode="lines", 
+        fig.add_trace(go.Scatter(x=[], y=[0, 1], mode="lines",
                                line=dict(color=color_crisp, width=2)), row=1, col=j)
-        
+
         # Área de activación (con color más suave)
-        mf_recortada = np.minimum(activacion, mf_vals)
-        fig.add_trace(go.Scatter(x=X_COLOR, y=mf_recortada, mode="lines", 
-                               fill="tozeroy", 
+        fig.add_trace(go.Scatter(x=[], y=[], mode="lines",
+                               fill="tozeroy",
                                line=dict(color=color_activation, width=1),
                                fillcolor='rgba(255,165,0,0.4)'),  # Naranja semitransparente
                      row=1, col=j)
 
-    # Salida
-    salida_funcs = get_output_functions(mf_type_selected)
-    salida = salida_funcs[rule["OUTPUT"]]
-    salida_recortada = np.minimum(activacion, salida)
-    
     # MF de salida original
-    fig.add_trace(go.Scatter(x=X_OUTPUT, y=salida, mode="lines", 
+    salida = get_output_functions(mf_type_selected)[rule["OUTPUT"]]
+    fig.add_trace(go.Scatter(x=X_OUTPUT, y=salida, mode="lines",
                            line=dict(color=color_mf, width=2)), row=1, col=4)
-    
+
     # Área de salida activada
-    fig.add_trace(go.Scatter(x=X_OUTPUT, y=salida_recortada, mode="lines", 
-                           fill="tozeroy", 
+    fig.add_trace(go.Scatter(x=[], y=[], mode="lines",
+                           fill="tozeroy",
                            line=dict(color=color_activation, width=1),
                            fillcolor='rgba(255,165,0,0.4)'), row=1, col=4)
 
     fig.update_layout(
-        height=250, 
-        showlegend=False, 
+        height=250,
+        showlegend=False,
         margin=dict(l=10, r=10, t=30, b=10),
         title_text=f"Regla: R={rule['Rojo']}, G={rule['Verde']}, B={rule['Azul']} → {rule['OUTPUT']}"
     )
-    
+
+    return fig.to_plotly_json()
+
+
+def get_rule_figures(rules_filename, mf_type_selected):
+    """(ruleset compilado, figuras estáticas de sus reglas), desde la caché."""
+    compiled = compile_ruleset(rules_filename, mf_type_selected)
+    key = (rules_filename, mf_type_selected)
+    cached = _rule_figures_cache.get(key)
+    if cached is None or cached[0] is not compiled:
+        cached = (compiled, [build_rule_figure(rule, mf_type_selected) for rule in compiled.rules])
+        _rule_figures_cache[key] = cached
+        while len(_rule_figures_cache) > RULE_FIGURES_CACHE_SIZE:
+            _rule_figures_cache.popitem(last=False)
+    _rule_figures_cache.move_to_end(key)
+    return cached
+
+
+def clipped_area(points, activacion, universe):
+    """Polígono (x, y) de min(activación, MF) para la MF de vértices points: 4 puntos en vez de todo el universo."""
+    p1, p2, p3, p4 = points
+    xs = np.clip([p1, p1 + activacion * (p2 - p1), p4 - activacion * (p4 - p3), p4], universe[0], universe[-1])
+    return xs.tolist(), [0.0, activacion, activacion, 0.0]
+
+
+def rule_trace_updates(compiled, i, activacion, crisp_vals):
+    """Partes dinámicas de la figura de la regla i: {índice de traza: {'x': ..., 'y': ...}}."""
+    updates = {}
+    for j, var in enumerate(RULE_VARS):
+        crisp = crisp_vals[var]
+        x, y = clipped_area(compiled.input_points[compiled.rule_terms[i, j]], activacion, X_COLOR)
+        updates[3 * j + 1] = {'x': [crisp, crisp]}
+        updates[3 * j + 2] = {'x': x, 'y': y}
+
+    x, y = clipped_area(compiled.output_points[compiled.rule_outputs[i]], activacion, X_OUTPUT)
+    updates[OUTPUT_AREA_TRACE] = {'x': x, 'y': y}
+    return updates
+
+
+@instrument('app/rules/activations')
+def rule_activations(compiled, R_val, G_val, B_val):
+    """Activación de cada regla del ruleset compilado para un color."""
+    ids, strengths = compiled.active_rules(np.array([[R_val, G_val, B_val]], dtype=float))
+    return compiled.dense_strengths(ids, strengths)[0]
+
+
+def rule_title(i, rule, activacion):
+    title = f"Regla {i}: IF R={rule['Rojo']} AND G={rule['Verde']} AND B={rule['Azul']} → {rule['OUTPUT']}"
+    return f"{title} (activación {activacion:.2f})" if activacion > 0 else f"{title} (inactiva)"
+
+
+def rule_graph_style(activacion):
+    """Las reglas sin activación se pliegan: solo queda visible su título."""
+    return {'height': '260px'} if activacion > 0 else {'height': '260px', 'display': 'none'}
+
+
+@instrument('app/rules/plot_figure')
+def plot_rule_toolbox(compiled, i, figure, activacion, R_val, G_val, B_val):
+    """Figura completa de la regla i: copia la figura estática y le aplica las partes dinámicas."""
+    fig = dict(figure, data=[dict(trace) for trace in figure['data']])
+    crisp_vals = {"Rojo": R_val, "Verde": G_val, "Azul": B_val}
+    for index, update in rule_trace_updates(compiled, i, activacion, crisp_vals).items():
+        fig['data'][index].update(update)
     return fig
 
+
 # --- CALLBACK 4: Visualizador de Reglas Estilo Toolbox ---
+# Al cambiar de archivo o de tipo de MF se reconstruyen las tarjetas (con las
+# figuras estáticas de la caché); al mover los sliders solo viajan parches.
+def rule_cards_key(rules_filename, mf_type_selected):
+    """Identifica el archivo y el tipo de MF con que se construyeron las tarjetas del visor."""
+    return {'rules': rules_filename, 'mf': mf_type_selected}
+
+
 @app.callback(
-    Output('rules-graphs-container', 'children'),
+    [Output('rules-graphs-container', 'children'),
+     Output('rules-cards-key', 'data')],
     [Input('ruleset-selector', 'value'),
-     Input('mf-type-selector', 'value'),
-     Input('R-slider', 'value'),
-     Input('G-slider', 'value'),
-     Input('B-slider', 'value')]
+     Input('mf-type-selector', 'value')],
+    [State('R-slider', 'value'),
+     State('G-slider', 'value'),
+     State('B-slider', 'value')]
 )
+@instrument('callback/update_rules_graphs')
 def update_rules_graphs(rules_filename, mf_type_selected, R_val, G_val, B_val):
-    figs = []
-    filepath = os.path.join("rules_data", rules_filename)
-    try:
-        with open(filepath, 'r') as f:
-            rules_data = json.load(f)
-    except Exception:
-        return [html.Div("⚠️ No se pudo cargar el archivo de reglas.", style={'color': 'red', 'textAlign': 'center'})]
-
-    for i, rule in enumerate(rules_data, start=1):
-        fig = plot_rule_toolbox(rule, R_val, G_val, B_val, mf_type_selected)
-        figs.append(html.Div([
-            html.H5(f"Regla {i}: IF R={rule['Rojo']} AND G={rule['Verde']} AND B={rule['Azul']} → {rule['OUTPUT']}",
+    if not read_rules_json(rules_filename):
+        return [html.Div("⚠️ No se pudo cargar el archivo de reglas.",
+                         style={'color': 'red', 'textAlign': 'center'})], None
+
+    compiled, figures = get_rule_figures(rules_filename, mf_type_selected)
+    activaciones = rule_activations(compiled, R_val, G_val, B_val)
+
+    cards = []
+    for i, (rule, figure) in enumerate(zip(compiled.rules, figures)):
+        activacion = float(activaciones[i])
+        cards.append(html.Div([
+            html.H5(rule_title(i + 1, rule, activacion), id={'type': 'rule-title', 'index': i},
                     style={'textAlign': 'center'}),
-            dcc.Graph(figure=fig, style={'height': '260px'})
+            dcc.Graph(figure=plot_rule_toolbox(compiled, i, figure, activacion, R_val, G_val, B_val),
+                      id={'type': 'rule-graph', 'index': i}, style=rule_graph_style(activacion))
         ], style={'marginBottom': '20px'}))
 
-    return figs
+    return cards, rule_cards_key(rules_filename, mf_type_selected)
+
+
+@app.callback(
+    [Output({'type': 'rule-graph', 'index': ALL}, 'figure'),
+     Output({'type': 'rule-graph', 'index': ALL}, 'style'),
+     Output({'type': 'rule-title', 'index': ALL}, 'children')],
+    [Input('R-slider', 'value'),
+     Input('G-slider', 'value'),
+     Input('B-slider', 'value')],
+    [State('ruleset-selector', 'value'),
+     State('mf-type-selector', 'value'),
+     State('rules-cards-key', 'data'),
+     State({'type': 'rule-graph', 'index': ALL}, 'style')]
+)
+@instrument('callback/update_rules_activation')
+def update_rules_activation(R_val, G_val, B_val, rules_filename, mf_type_selected, cards_key, styles):
+    """
+    Actualiza el visor de reglas al mover los sliders con actualizaciones parciales.
+
+    Por regla activa solo se envían las líneas crisp, los polígonos de las
+    áreas recortadas y el título; las reglas sin activación se pliegan y su
+    figura no se toca.
+    """
+    if cards_key != rule_cards_key(rules_filename, mf_type_selected):
+        # Las tarjetas son de otro archivo o tipo de MF (aunque tenga tantas reglas
+        # como este): las reconstruye update_rules_graphs
+        raise PreventUpdate
+    compiled, _ = get_rule_figures(rules_filename, mf_type_selected)
+    if len(styles) != len(compiled.rules):
+        # El archivo cambió en disco y se recompiló con otro número de reglas
+        raise PreventUpdate
+
+    activaciones = rule_activations(compiled, R_val, G_val, B_val)
+    crisp_vals = {"Rojo": R_val, "Verde": G_val, "Azul": B_val}
+
+    figures, new_styles, titles = [], [], []
+    for i, rule in enumerate(compiled.rules):
+        activacion = float(activaciones[i])
+        style = rule_graph_style(activacion)
+        unchanged = style == styles[i]
+        new_styles.append(no_update if unchanged else style)
+        # Una regla que sigue inactiva conserva su título
+        titles.append(no_update if unchanged and activacion == 0 else rule_title(i + 1, rule, activacion))
+
+        if activacion > 0:
+            patch = Patch()
+            for index, update in rule_trace_updates(compiled, i, activacion, crisp_vals).items():
+                for key, value in update.items():
+                    patch['data'][index][key] = value
+            figures.append(patch)
+        else:
+            figures.append(no_update)
+
+    return figures, new_styles, titles
+
+
+# --- CALLBACK: Búsqueda inversa (colores que dan un rango de salida o una etiqueta) ---
+# El índice se construye una vez por ruleset y tipo de MF (se guarda en lut_data);
+# cada consulta son dos búsquedas binarias o un corte por etiqueta. La figura
+# solo se reconstruye al cambiar la consulta y con la pestaña abierta; mover
+# los sliders RGB solo mueve el marcador del color actual (update_inverse_marker).
+INVERSE_MAX_POINTS = 5000   # vóxeles dibujados como máximo: validar un color por punto es lo que más tarda
+
+
+def inverse_query(index, output_range, label):
+    """Ids de vóxel de la consulta y su descripción."""
+    if label:
+        return index.query_label(label), f"etiqueta {label}"
+    return index.query_range(*output_range), f"salida en [{output_range[0]}, {output_range[1]}]"
+
+
+def inverse_marker(r, g, b):
+    """Traza del color actual (la segunda de la figura)."""
+    return {'x': [r], 'y': [g], 'z': [b], 'name': f'Color actual ({r}, {g}, {b})',
+            'marker': {'size': 10, 'symbol': 'diamond', 'color': f'rgb({r},{g},{b})',
+                       'line': {'width': 2, 'color': 'black'}}}
+
+
+def inverse_current(index, ids, r, g, b):
+    """Frase que dice si el vóxel del color actual está en la consulta (no el color exacto)."""
+    inside = bool(index.contains(ids, [r, g, b])[0])
+    return f"El color actual ({r}, {g}, {b}) {'está' if inside else 'no está'} en la región (según su vóxel)."
+
+
+@app.callback(
+    [Output('inverse-graph', 'figure'),
+     Output('inverse-summary', 'children'),
+     Output('inverse-current', 'children')],
+    [Input('tabs', 'value'),
+     Input('inverse-range', 'value'),
+     Input('inverse-label', 'value'),
+     Input('ruleset-selector', 'value'),
+     Input('mf-type-selector', 'value')],
+    [State('R-slider', 'value'),
+     State('G-slider', 'value'),
+     State('B-slider', 'value')]
+)
+@instrument('callback/inverse_query')
+def update_inverse_query(active_tab, output_range, label, rules_filename, mf_type_selected, r, g, b):
+    if active_tab != INVERSE_TAB:
+        # Con la pestaña cerrada no se paga el índice; se calcula al abrirla
+        raise PreventUpdate
+
+    index = get_index(rules_filename, mf_type_selected)
+    if index is None:
+        return go.Figure(), "⚠️ No se pudo construir el índice inverso", ""
+
+    start = time.perf_counter()
+    ids, query = inverse_query(index, output_range, label)
+    n_boxes = len(index.boxes(ids))
+    query_ms = (time.perf_counter() - start) * 1e3
+
+    shown = ids[::max(1, -(-len(ids) // INVERSE_MAX_POINTS))]
+    centers = index.centers(shown)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter3d(
+        x=centers[:, 0], y=centers[:, 1], z=centers[:, 2], mode='markers', name=query,
+        marker={'size': 3, 'color': [f'rgb({cr},{cg},{cb})' for cr, cg, cb in centers]}
+    ))
+    fig.add_trace(go.Scatter3d(mode='markers', **inverse_marker(r, g, b)))
+    fig.update_layout(
+        title=f'Colores con {query}',
+        scene={'xaxis': {'title': 'R', 'range': [0, 255]}, 'yaxis': {'title': 'G', 'range': [0, 255]},
+               'zaxis': {'title': 'B', 'range': [0, 255]}},
+        margin={'l': 0, 'r': 0, 't': 40, 'b': 0}
+    )
+
+    total = index.n ** 3
+    summary = (f"{len(ids)} de {total} vóxeles de lado {index.step} ({len(ids) / total:.1%} del cubo), "
+               f"{n_boxes} cajas, {query_ms:.1f} ms.")
+    if len(shown) < len(ids):
+        summary += f" Se dibujan {len(shown)} vóxeles."
+    return fig, summary, inverse_current(index, ids, r, g, b)
+
+
+@app.callback(
+    [Output('inverse-graph', 'figure', allow_duplicate=True),
+     Output('inverse-current', 'children', allow_duplicate=True)],
+    [Input('R-slider', 'value'),
+     Input('G-slider', 'value'),
+     Input('B-slider', 'value')],
+    [State('tabs', 'value'),
+     State('inverse-range', 'value'),
+     State('inverse-label', 'value'),
+     State('ruleset-selector', 'value'),
+     State('mf-type-selector', 'value')],
+    prevent_initial_call=True
+)
+@instrument('callback/inverse_marker')
+def update_inverse_marker(r, g, b, active_tab, output_range, label, rules_filename, mf_type_selected):
+    """Mueve solo el marcador del color actual con un Patch; los vóxeles no se reenvían."""
+    if active_tab != INVERSE_TAB:
+        raise PreventUpdate
+    index = get_index(rules_filename, mf_type_selected)
+    if index is None:
+        raise PreventUpdate
+
+    ids, _ = inverse_query(index, output_range, label)
+    patch = Patch()
+    for key, value in inverse_marker(r, g, b).items():
+        patch['data'][1][key] = value
+    return patch, inverse_current(index, ids, r, g, b)
 
 
 if __name__ == '__main__':
@@ -1,7 +1,8 @@
 from dash import dcc
 from dash import html
-from fuzzy_core import LEVELS, COLORS_OUT, MF_TYPES 
-from fuzzy_core import X_COLOR, KEY_POINTS 
+from fuzzy_numpy import LEVELS, COLORS_OUT, MF_TYPES, OUTPUT_LABELS
+from fuzzy_numpy import X_COLOR, KEY_POINTS 
+from fuzzy_inverse import DEFAULT_STEP
 
 # --- DATA NECESARIA PARA EL SELECTOR DE ARCHIVOS ---
 RULE_FILES = [
@@ -105,10 +106,38 @@ def build_tab_rules_viewer():
     return dcc.Tab(label='3. Visualizador de Reglas', children=[
         html.Div([
             html.H3("Visualización de Reglas Difusas", style={'textAlign': 'center'}),
-            html.Div(id='rules-graphs-container')
+            html.Div(id='rules-graphs-container'),
+            # Archivo y tipo de MF de las tarjetas mostradas (lo comprueba update_rules_activation)
+            dcc.Store(id='rules-cards-key')
         ], style={'maxWidth': '900px', 'margin': 'auto', 'padding': '20px'})
     ])
 
+INVERSE_TAB = 'tab-4'   # la búsqueda inversa solo se calcula con esta pestaña abierta
+
+def build_tab_inverse_query():
+    """Pestaña 4: Búsqueda inversa (qué colores dan una salida o una etiqueta)"""
+    return dcc.Tab(label='4. Búsqueda Inversa', value=INVERSE_TAB, children=[
+        html.Div([
+            html.H3("¿Qué colores dan esta salida?", style={'textAlign': 'center'}),
+            html.P(f"Búsqueda aproximada: el cubo se divide en vóxeles de {DEFAULT_STEP}³ colores y cada uno "
+                   "toma la salida de su color central, así que cerca de los bordes de la región puede incluir colores "
+                   "que no cumplen la consulta o dejar fuera alguno que sí.",
+                   style={'fontStyle': 'italic'}),
+
+            html.Label('Rango de salida crisp:', style={'fontWeight': 'bold'}),
+            dcc.RangeSlider(id='inverse-range', min=0, max=100, step=1, value=[70, 80],
+                            marks={v: str(v) for v in range(0, 101, 10)}),
+
+            html.Label('O etiqueta ganadora (tiene prioridad sobre el rango):',
+                       style={'fontWeight': 'bold', 'marginTop': '15px', 'display': 'block'}),
+            dcc.Dropdown(id='inverse-label', options=[{'label': l, 'value': l} for l in OUTPUT_LABELS],
+                         value=None, placeholder='(usar el rango)', style={'width': '350px'}),
+
+            html.P(id='inverse-summary', style={'fontWeight': 'bold', 'marginTop': '15px'}),
+            html.P(id='inverse-current', style={'fontWeight': 'bold'}),
+            dcc.Graph(id='inverse-graph', style={'height': '600px'}),
+        ], style={'maxWidth': '900px', 'margin': 'auto', 'padding': '20px'})
+    ])
 
 
 def create_layout():
@@ -118,7 +147,8 @@ def create_layout():
         dcc.Tabs(id="tabs", value='tab-1', children=[
             build_tab_io_with_selector(),      # NUEVA PESTAÑA 1 (Fusionada)
             build_tab_mf_config(),             # PESTAÑA 2 (MF)
-            build_tab_rules_viewer() # PESTAÑA 3 (Visor de Reglas)
+            build_tab_rules_viewer(), # PESTAÑA 3 (Visor de Reglas)
+            build_tab_inverse_query()          # PESTAÑA 4 (Búsqueda inversa)
         ]),
         
         # Almacenamiento invisible necesario para el flujo de datos
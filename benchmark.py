@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from fuzzy_core import (
+    ENGINES, MF_TYPES, CompiledRuleset, build_control_system, classify_batch, run_engine
+)
+import fuzzy_metrics
+from rules_loader import read_rules_json
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "bench_baseline.json")
+DEFAULT_THRESHOLD = 0.25  # 25 % más lento que la referencia = regresión
+# Metadatos de environment() que deben coincidir para comparar con la referencia;
+# si alguno cambia, las regresiones se avisan pero no hacen fallar la ejecución
+HOST_KEYS = ['cpu_count', 'processor', 'python', 'numpy', 'skfuzzy']
+
+# Presupuesto (s) de `import módulo` en un intérprete nuevo: lo que paga cada
+# CLI o proceso de trabajo antes de clasificar nada. Ninguno debe cargar
+# skfuzzy (scipy, networkx) ni Dash/Plotly; solo app e hijos los necesitan.
+# tests/test_import_budget.py los comprueba con pytest.
+IMPORT_BUDGETS = {
+    'fuzzy_numpy': 0.5,
+    'fuzzy_core': 0.5,
+    'fuzzy_lut': 0.5,
+    'fuzzy_service': 0.5,
+}
+HEAVY_MODULES = ['skfuzzy', 'scipy', 'networkx', 'dash', 'plotly']
+
+
+def _mf_tag(mf_type):
+    return 'trapmf' if 'Trapezoidal' in mf_type else 'trimf'
+
+
+def time_call(fn, repeat=5, number=1):
+    """Mide fn() `repeat` veces (cada una con `number` llamadas) y devuelve segundos por llamada."""
+    samples = []
+    # Los avisos de los motores (p. ej. "ninguna regla se activó") no deben ensuciar la salida
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - start) / number)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'repeat': repeat, 'number': number}
+
+
+def environment():
+    """Metadatos del entorno para que los resultados sean comparables."""
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except Exception:
+            return None
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': version('numpy'),
+        'skfuzzy': version('skfuzzy'),
+        'dash': version('dash'),
+        'commit': commit,
+    }
+
+
+def import_time(module, repeat=3):
+    """
+    Mide `import module` en un intérprete nuevo `repeat` veces.
+
+    Devuelve los tiempos como time_call y, en 'heavy_modules', los de
+    HEAVY_MODULES que quedaron cargados.
+    """
+    code = (f"import json, sys, time; start = time.perf_counter(); import {module}; "
+            f"print(json.dumps([time.perf_counter() - start, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))")
+    samples, heavy = [], []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        seconds, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(seconds)
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'repeat': repeat, 'number': 1,
+            'heavy_modules': heavy}
+
+
+def run_import_benchmarks(quick=False):
+    """Etapas import/<módulo> para los módulos de IMPORT_BUDGETS."""
+    return {f"import/{module}": import_time(module, 3 if quick else 5) for module in IMPORT_BUDGETS}
+
+
+def check_import_budgets(results):
+    """Devuelve [(módulo, mensaje)] de los módulos que superan su presupuesto o cargan HEAVY_MODULES."""
+    problems = []
+    for module, budget in IMPORT_BUDGETS.items():
+        stats = results.get(f"import/{module}")
+        if stats is None:
+            continue
+        if stats['median_s'] > budget:
+            problems.append((module, f"{stats['median_s'] * 1e3:.0f} ms > {budget * 1e3:.0f} ms"))
+        if stats['heavy_modules']:
+            problems.append((module, f"carga {', '.join(stats['heavy_modules'])}"))
+    return problems
+
+
+def run_benchmarks(quick=False, batch_size=10000, seed=0):
+    """Ejecuta todas las etapas y devuelve {nombre_de_etapa: tiempos}."""
+    repeat = 3 if quick else 7
+    rng = np.random.default_rng(seed)
+    batch = rng.integers(0, 256, (batch_size, 3), dtype=np.uint8)
+    points = [tuple(int(v) for v in p) for p in rng.integers(0, 256, (20, 3))]
+    results = run_import_benchmarks(quick)
+
+    for rules_filename in RULESETS:
+        results[f"load_rules/{rules_filename}"] = time_call(lambda: read_rules_json(rules_filename), repeat, 20)
+
+        for mf_type in MF_TYPES:
+            tag = f"{rules_filename}/{_mf_tag(mf_type)}"
+
+            # 1. Construcción del sistema (sin caché)
+            results[f"construct/skfuzzy/{tag}"] = time_call(
+                lambda: build_control_system(rules_filename, mf_type), 1 if quick else 2)
+            results[f"construct/numpy/{tag}"] = time_call(
+                lambda: CompiledRuleset(rules_filename, mf_type, read_rules_json(rules_filename)), repeat, 5)
+
+            # 2. Un punto, con el sistema ya compilado en caché
+            for engine in ENGINES:
+                run_engine(engine, rules_filename, *points[0], mf_type)
+                cycle = iter(points * 1000)
+                results[f"single/{engine}/{tag}"] = time_call(
+                    lambda: run_engine(engine, rules_filename, *next(cycle), mf_type), repeat, 20)
+
+            # 3. Lote: NumPy vectorizado frente a un bucle sobre skfuzzy (por punto)
+            results[f"batch/numpy/{tag}"] = time_call(
+                lambda: classify_batch(rules_filename, batch, mf_type), repeat)
+            results[f"batch/numpy/{tag}"]['per_point_s'] = results[f"batch/numpy/{tag}"]['median_s'] / batch_size
+            small = batch[:50]
+            results[f"batch/skfuzzy/{tag}"] = time_call(
+                lambda: [run_engine('skfuzzy', rules_filename, *map(int, p), mf_type) for p in small], 1 if quick else 3)
+            results[f"batch/skfuzzy/{tag}"]['per_point_s'] = results[f"batch/skfuzzy/{tag}"]['median_s'] / len(small)
+
+    # 4. Cuerpos de los callbacks de Dash
+    import app
+    for rules_filename in RULESETS:
+        for mf_type in MF_TYPES:
+            tag = f"{rules_filename}/{_mf_tag(mf_type)}"
+            cycle = iter(points * 1000)
+            results[f"callback/run_simulation_and_update_ui/{tag}"] = time_call(
+                lambda: app.run_simulation_and_update_ui(*next(cycle), rules_filename, mf_type), repeat, 3)
+            # La primera llamada llena la caché de figuras estáticas; con --quick (una
+            # sola repetición) se mediría esa construcción en vez del callback
+            cards, cards_key = app.update_rules_graphs(rules_filename, mf_type, *points[0])
+            results[f"callback/update_rules_graphs/{tag}"] = time_call(
+                lambda: app.update_rules_graphs(rules_filename, mf_type, *next(cycle)), 1 if quick else 3)
+            styles = [card.children[1].style for card in cards]
+            results[f"callback/update_rules_activation/{tag}"] = time_call(
+                lambda: app.update_rules_activation(*next(cycle), rules_filename, mf_type, cards_key, styles),
+                repeat, 10)
+
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Devuelve [(etapa, referencia_s, actual_s, cambio)] de las etapas que empeoraron más que threshold."""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if reference is None:
+            continue
+        change = stats['median_s'] / reference['median_s'] - 1
+        if change > threshold:
+            regressions.append((name, reference['median_s'], stats['median_s'], change))
+    return regressions
+
+
+def host_differences(baseline, env):
+    """[(clave, referencia, actual)] de HOST_KEYS en que el entorno `env` no coincide con la referencia."""
+    recorded = baseline.get('environment', {})
+    return [(key, recorded.get(key), env.get(key)) for key in HOST_KEYS if recorded.get(key) != env.get(key)]
+
+
+def print_table(results):
+    width = max(len(name) for name in results)
+    for name, stats in results.items():
+        print(f"{name:<{width}}  {stats['median_s'] * 1e3:12.3f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks del clasificador fuzzy.")
+    parser.add_argument('--quick', action='store_true', help="Menos repeticiones")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Tamaño del lote para batch/numpy")
+    parser.add_argument('--out', default=None, help="Guardar los resultados en este JSON")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="JSON de referencia con el que comparar")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Empeoramiento relativo máximo permitido (0.25 = 25 %%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Guardar estos resultados como referencia")
+    parser.add_argument('--stages', action='store_true',
+                        help="Mostrar también los tiempos por etapa de fuzzy_metrics acumulados en la ejecución")
+    parser.add_argument('--imports-only', action='store_true',
+                        help="Medir solo los tiempos de importación y comprobar IMPORT_BUDGETS")
+    args = parser.parse_args()
+
+    if args.imports_only:
+        results = run_import_benchmarks(args.quick)
+        print_table(results)
+        problems = check_import_budgets(results)
+        for module, problem in problems:
+            print(f"⚠️ Importar {module}: {problem}")
+        sys.exit(1 if problems else 0)
+
+    report = {'environment': environment(), 'batch_size': args.batch_size,
+              'results': run_benchmarks(args.quick, args.batch_size)}
+    print_table(report['results'])
+    budget_problems = check_import_budgets(report['results'])
+    for module, problem in budget_problems:
+        print(f"⚠️ Importar {module}: {problem}")
+    if args.stages:
+        print()
+        fuzzy_metrics.print_table()
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Referencia guardada en {args.baseline}")
+        sys.exit(1 if budget_problems else 0)
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ No hay referencia en {args.baseline}; usa --save-baseline para crearla")
+        sys.exit(1 if budget_problems else 0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report['results'], baseline, args.threshold)
+    differences = host_differences(baseline, report['environment'])
+    if differences:
+        print(f"⚠️ La referencia ({baseline.get('environment', {}).get('commit')}) se grabó en otro entorno: "
+              + ", ".join(f"{key} {before} → {after}" for key, before, after in differences)
+              + "; las regresiones solo se avisan")
+    for name, before, after, change in regressions:
+        print(f"⚠️ Regresión en {name}: {before * 1e3:.3f} ms → {after * 1e3:.3f} ms (+{change:.0%})")
+    sys.exit(1 if (regressions and not differences) or budget_problems else 0)
@@ -0,0 +1,230 @@
+import argparse
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+from fuzzy_numpy import MF_TYPES, classify_batch
+
+DEFAULT_CHUNK_ROWS = 100000
+
+
+# --- LECTORES: generadores de (fila_inicial, offset_de_bytes_siguiente, rgb) ---
+
+def iter_npy_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, start_row=0):
+    """Recorre un .npy (N, 3) mapeado en memoria, sin cargarlo entero."""
+    data = np.load(path, mmap_mode='r')
+    for start in range(start_row, data.shape[0], chunk_rows):
+        stop = min(start + chunk_rows, data.shape[0])
+        yield start, None, np.asarray(data[start:stop, :3])
+
+
+def iter_csv_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, start_row=0, start_byte=0):
+    """
+    Recorre un CSV con columnas R,G,B (cabecera opcional) por bloques de líneas.
+
+    Con start_byte > 0 la lectura empieza en ese offset y start_row es el
+    número de la fila que comienza ahí; con start_byte == 0 se saltan las
+    primeras start_row filas de datos. Cada bloque informa el offset de bytes
+    donde empieza el siguiente, para poder reanudar tras una interrupción.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start_byte)
+        offset = start_byte
+        row = start_row if start_byte else 0
+        chunk_start, lines = row, []
+
+        for line in f:
+            offset += len(line)
+            if not line.strip() or (offset == len(line) and _is_header(line)):
+                continue
+            if row < start_row:
+                row += 1
+                continue
+            if not lines:
+                chunk_start = row
+            lines.append(line)
+            row += 1
+            if len(lines) == chunk_rows:
+                yield chunk_start, offset, _parse_csv_lines(lines)
+                lines = []
+
+        if lines:
+            yield chunk_start, offset, _parse_csv_lines(lines)
+
+
+def _is_header(line):
+    """True si la primera línea del CSV no empieza con un número."""
+    first = line.split(b',')[0].strip().lstrip(b'-').replace(b'.', b'')
+    return not first.isdigit()
+
+
+def _parse_csv_lines(lines):
+    return np.loadtxt(io.BytesIO(b''.join(lines)), delimiter=',', usecols=(0, 1, 2), ndmin=2)
+
+
+# --- INFERENCIA POR BLOQUES ---
+
+def classify_chunks(chunks, rules_filename, mf_type_selected):
+    """Aplica classify_batch a cada bloque: genera (fila_inicial, offset, valores, etiquetas)."""
+    for row, offset, rgb in chunks:
+        values, labels = classify_batch(rules_filename, rgb, mf_type_selected, return_labels=True)
+        yield row, offset, values, labels
+
+
+# --- ESCRITORES ---
+
+class CsvWriter:
+    """Escribe 'valor,etiqueta' por fila en un CSV, en modo append para poder reanudar."""
+
+    def __init__(self, path, resume_byte=None):
+        exists = os.path.exists(path) and resume_byte is not None
+        self.f = open(path, 'r+b' if exists else 'wb')
+        if exists:
+            # Descarta lo escrito después del último checkpoint
+            self.f.truncate(resume_byte)
+            self.f.seek(resume_byte)
+        else:
+            self.f.write(b'value,label\n')
+
+    def write(self, row, values, labels):
+        text = ''.join(f"{'' if np.isnan(v) else f'{v:.6f}'},{l}\n" for v, l in zip(values, labels))
+        self.f.write(text.encode('utf-8'))
+        self.f.flush()
+
+    def position(self):
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+class NpyWriter:
+    """Escribe los valores en un .npy (N,) preasignado y mapeado en memoria."""
+
+    def __init__(self, path, n_rows, resume_byte=None):
+        mode = 'r+' if resume_byte is not None and os.path.exists(path) else 'w+'
+        self.array = np.lib.format.open_memmap(path, mode=mode, dtype=np.float64, shape=(n_rows,))
+
+    def write(self, row, values, labels):
+        self.array[row:row + len(values)] = values
+        self.array.flush()
+
+    def position(self):
+        return 0
+
+    def close(self):
+        self.array.flush()
+        del self.array
+
+
+def _checkpoint_path(output_path):
+    return output_path + '.progress'
+
+
+def _csv_output_offset(path, row):
+    """Offset de bytes del CSV de salida donde empieza la fila de datos `row` (tras la cabecera)."""
+    with open(path, 'rb') as f:
+        offset = len(f.readline())
+        for written in range(row):
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                raise ValueError(f"{path} solo tiene {written} filas completas; no se puede continuar en la fila {row}")
+            offset += len(line)
+    return offset
+
+
+def classify_file(input_path, output_path, rules_filename, mf_type_selected,
+                  chunk_rows=DEFAULT_CHUNK_ROWS, start_row=0, start_byte=0, resume=False, report=True):
+    """
+    Clasifica un archivo de colores (.csv o .npy) por bloques: lector → inferencia → escritor.
+
+    La memoria queda acotada por chunk_rows. Tras cada bloque se guarda un
+    checkpoint (<salida>.progress) con la fila y el offset de bytes alcanzados;
+    con resume=True se continúa desde ahí. Con start_row / start_byte > 0 y sin
+    checkpoint la salida debe existir y se continúa (la fila start_row del CSV
+    de salida, o el final si solo se da start_byte). Devuelve el número de
+    filas procesadas.
+    """
+    checkpoint = _checkpoint_path(output_path)
+    output_byte = None
+    if resume and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            state = json.load(f)
+        start_row, start_byte, output_byte = state['row'], state['input_byte'], state['output_byte']
+        print(f"Reanudando desde la fila {start_row}")
+    elif start_row or start_byte:
+        # Reanudación manual: se continúa la salida existente en lugar de volver a crearla
+        if not os.path.exists(output_path):
+            raise FileNotFoundError(f"Para empezar en la fila {start_row} / byte {start_byte} "
+                                    f"la salida {output_path} debe existir")
+        if output_path.lower().endswith('.npy'):
+            output_byte = 0
+        elif start_row:
+            output_byte = _csv_output_offset(output_path, start_row)
+        else:
+            # Solo con el offset de la entrada no se sabe qué fila es: se añade al final
+            output_byte = os.path.getsize(output_path)
+
+    if input_path.lower().endswith('.npy'):
+        n_rows = np.load(input_path, mmap_mode='r').shape[0]
+        chunks = iter_npy_chunks(input_path, chunk_rows, start_row)
+    else:
+        n_rows = None
+        chunks = iter_csv_chunks(input_path, chunk_rows, start_row, start_byte)
+
+    if output_path.lower().endswith('.npy'):
+        if n_rows is None:
+            raise ValueError("La salida .npy requiere una entrada .npy (tamaño conocido); usa una salida .csv")
+        writer = NpyWriter(output_path, n_rows, output_byte)
+    else:
+        writer = CsvWriter(output_path, output_byte)
+
+    processed = 0
+    begin = time.perf_counter()
+    try:
+        for row, offset, values, labels in classify_chunks(chunks, rules_filename, mf_type_selected):
+            writer.write(row, values, labels)
+            processed += len(values)
+
+            with open(checkpoint, 'w') as f:
+                json.dump({'row': row + len(values), 'input_byte': offset or 0,
+                           'output_byte': writer.position()}, f)
+
+            if report:
+                elapsed = time.perf_counter() - begin
+                print(f"  {row + len(values)} filas ({processed / elapsed:,.0f} filas/s)", flush=True)
+    finally:
+        writer.close()
+
+    # Sin ningún bloque procesado (entrada vacía o ya terminada) no llega a crearse
+    if os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return processed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clasificación fuzzy por bloques para archivos RGB grandes (.csv/.npy).")
+    parser.add_argument('input', help="Archivo de entrada: CSV con columnas R,G,B o .npy (N, 3)")
+    parser.add_argument('output', help="Archivo de salida: .csv (valor,etiqueta) o .npy (valores)")
+    parser.add_argument('--rules', default='rules_100.json', help="Archivo de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Filas por bloque")
+    parser.add_argument('--start-row', type=int, default=0,
+                        help="Fila de datos desde la que empezar (continúa la salida existente)")
+    parser.add_argument('--start-byte', type=int, default=0,
+                        help="Offset de bytes del CSV desde el que empezar (añade al final de la salida)")
+    parser.add_argument('--resume', action='store_true', help="Continuar desde el último checkpoint")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    start = time.perf_counter()
+    try:
+        total = classify_file(args.input, args.output, args.rules, mf_type, args.chunk_rows,
+                              args.start_row, args.start_byte, args.resume)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ {e}")
+        raise SystemExit(1)
+    print(f"{total} filas clasificadas en {time.perf_counter() - start:.1f} s → {args.output}")
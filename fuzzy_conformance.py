@@ -0,0 +1,216 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from fuzzy_core import (
+    KEY_POINTS, LEVELS, MF_TYPES, OUTPUT_DEFINITIONS, X_COLOR, classify_batch, input_mf_points, run_engine
+)
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+
+# Diferencia admitida frente a skfuzzy por motor: los motores NumPy hacen las
+# mismas operaciones en otro orden; la tabla float32 redondea la salida
+ENGINE_TOLERANCES = {
+    'numpy': 1e-9,
+    'batch': 1e-9,
+    'batch_chunked': 1e-9,
+    'lut': 1e-4,
+}
+WORST_CASES = 5
+
+
+def boundary_values():
+    """Valores de canal donde cambia la forma de la salida: extremos, vértices (con los hombros recortados) y bordes de soporte."""
+    values = {int(X_COLOR[0]), int(X_COLOR[0]) + 1, int(X_COLOR[-1]) - 1, int(X_COLOR[-1])}
+    for mf_type in MF_TYPES:
+        for points in KEY_POINTS.values():
+            for v in input_mf_points(mf_type, points):
+                values.update({int(v) - 1, int(v), int(v) + 1})
+    return np.array(sorted(v for v in values if X_COLOR[0] <= v <= X_COLOR[-1]))
+
+
+def sample_points(stride=None, samples=400, seed=0):
+    """
+    Colores (N, 3) de prueba.
+
+    Con `stride`, la malla completa de paso `stride` por canal (incluido 255).
+    Sin él, `samples` colores aleatorios más los de frontera: las 8 esquinas,
+    la diagonal de grises en cada valor de boundary_values y, por cada canal y
+    valor de frontera, dos colores con ese canal fijo y los otros al azar.
+    """
+    if stride:
+        axis = np.union1d(np.arange(0, 256, stride), [255])
+        return np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+
+    rng = np.random.default_rng(seed)
+    edges = boundary_values()
+    corners = np.array([[r, g, b] for r in (0, 255) for g in (0, 255) for b in (0, 255)])
+    greys = np.repeat(edges[:, None], 3, axis=1)
+    faces = rng.integers(0, 256, (len(edges) * 3 * 2, 3))
+    for i, (channel, value) in enumerate((c, v) for c in range(3) for v in edges for _ in range(2)):
+        faces[i, channel] = value
+    points = np.vstack([corners, greys, faces, rng.integers(0, 256, (samples, 3))])
+    return np.unique(points, axis=0)
+
+
+def edge_case_rulesets():
+    """
+    Rulesets sintéticos {nombre: reglas} para los casos límite del motor de referencia.
+
+    - duplicates: reglas que apuntan a etiquetas de salida con la misma
+      definición (a, b, c) en celdas vecinas; skfuzzy las agrega como términos
+      distintos.
+    - invalid: solo reglas con etiquetas desconocidas, así que entra la regla
+      de emergencia (OR).
+    - sparse: dos reglas; casi todo el cubo no activa ninguna (None / NaN).
+    """
+    same = defaultdict(list)
+    for label, abc in OUTPUT_DEFINITIONS.items():
+        same[abc].append(label)
+    groups = [labels for labels in same.values() if len(labels) > 1]
+
+    duplicates = []
+    cells = [(r, g, b) for r in LEVELS for g in LEVELS for b in LEVELS]
+    for i, labels in enumerate(groups):
+        for j, label in enumerate(labels):
+            r, g, b = cells[(i * 5 + j) % len(cells)]
+            duplicates.append({'Rojo': r, 'Verde': g, 'Azul': b, 'OUTPUT': label})
+
+    return {
+        'duplicates': duplicates,
+        'invalid': [{'Rojo': 'Bajo', 'Verde': 'Bajo', 'Azul': 'Nada', 'OUTPUT': 'Azul'},
+                    {'Rojo': 'Alto', 'Verde': 'Alto', 'Azul': 'Alto', 'OUTPUT': 'NoExiste'}],
+        'sparse': [{'Rojo': 'Bajo', 'Verde': 'Bajo', 'Azul': 'Bajo', 'OUTPUT': 'Negro'},
+                   {'Rojo': 'Alto', 'Verde': 'Alto', 'Azul': 'Alto', 'OUTPUT': 'Blanco'}],
+    }
+
+
+def reference_values(rules_filename, mf_type_selected, rgb):
+    """Salidas de create_system_from_json (skfuzzy) punto a punto; NaN donde devuelve None."""
+    return np.array([np.nan if (v := run_engine('skfuzzy', rules_filename, *map(int, p), mf_type_selected)[0]) is None
+                     else v for p in rgb], dtype=float)
+
+
+def engine_values(engine, rules_filename, mf_type_selected, rgb, lut_dtype='float32'):
+    """Salidas (N,) de un motor rápido, o None si no está disponible (p. ej. sin tabla construida)."""
+    if engine == 'numpy':
+        return np.array([np.nan if (v := run_engine('numpy', rules_filename, *map(int, p), mf_type_selected)[0])
+                         is None else v for p in rgb], dtype=float)
+    if engine == 'batch':
+        return classify_batch(rules_filename, rgb, mf_type_selected)
+    if engine == 'batch_chunked':
+        # Bloques pequeños: cada uno recorta sus columnas de reglas activas por separado
+        return classify_batch(rules_filename, rgb, mf_type_selected, chunk_size=7)
+    if engine == 'lut':
+        from fuzzy_lut import load_lut
+        lut = load_lut(rules_filename, mf_type_selected, lut_dtype, build=False)
+        return lut.lookup(rgb.astype(np.uint8)) if lut is not None else None
+    raise ValueError(f"Motor desconocido: {engine}")
+
+
+def compare(values, reference, rgb, tolerance):
+    """Error máximo y medio, None/NaN distintos, casos peores y si se cumple la tolerancia."""
+    mismatched = np.isnan(values) != np.isnan(reference)
+    both = ~(np.isnan(values) | np.isnan(reference))
+    diff = np.where(both, np.abs(values - reference), 0.0)
+    # Los None distintos encabezan los peores casos
+    order = np.argsort(-np.where(mismatched, np.inf, diff), kind='stable')[:WORST_CASES]
+    worst = [{'rgb': [int(v) for v in rgb[i]], 'value': None if np.isnan(values[i]) else float(values[i]),
+              'reference': None if np.isnan(reference[i]) else float(reference[i])}
+             for i in order if mismatched[i] or diff[i] > 0]
+    max_diff = float(diff.max(initial=0.0))
+    return {
+        'max_abs_diff': max_diff,
+        'mean_abs_diff': float(diff[both].mean()) if both.any() else 0.0,
+        'none_mismatches': int(mismatched.sum()),
+        'reference_none': int(np.isnan(reference).sum()),
+        'worst': worst,
+        'passed': bool(max_diff <= tolerance and not mismatched.any()),
+    }
+
+
+def run_conformance(rulesets, engines, rgb, mf_types=MF_TYPES, lut_dtype='float32'):
+    """
+    Compara cada motor con skfuzzy para cada ruleset y tipo de MF sobre los colores `rgb`.
+
+    `rulesets` es {nombre: archivo en rules_data o ruta absoluta}. Devuelve
+    [dict] con ruleset, tipo de MF, motor, tiempos y el resultado de compare();
+    un motor no disponible aparece con 'skipped'.
+    """
+    results = []
+    for name, rules_filename in rulesets.items():
+        for mf_type in mf_types:
+            # Los avisos de "ninguna regla se activó" y de reglas inválidas son parte de la prueba
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                reference = reference_values(rules_filename, mf_type, rgb)
+                reference_s = time.perf_counter() - start
+
+                for engine in engines:
+                    start = time.perf_counter()
+                    values = engine_values(engine, rules_filename, mf_type, rgb, lut_dtype)
+                    elapsed = time.perf_counter() - start
+                    result = {'ruleset': name, 'mf_type': mf_type, 'engine': engine, 'samples': len(rgb),
+                              'reference_us': reference_s / len(rgb) * 1e6, 'engine_us': elapsed / len(rgb) * 1e6}
+                    if values is None:
+                        result['skipped'] = True
+                    else:
+                        result.update(compare(values, reference, rgb, ENGINE_TOLERANCES[engine]))
+                    results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Comprueba los motores rápidos contra la referencia de skfuzzy.")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--engines', nargs='*', choices=list(ENGINE_TOLERANCES),
+                        default=['numpy', 'batch', 'batch_chunked'],
+                        help="Motores a comprobar ('lut' usa las tablas ya construidas)")
+    parser.add_argument('--stride', type=int, default=None,
+                        help="Malla completa con este paso por canal (por defecto, aleatorios + frontera)")
+    parser.add_argument('--samples', type=int, default=400, help="Colores aleatorios además de los de frontera")
+    parser.add_argument('--no-edge-cases', action='store_true', help="No añadir los rulesets sintéticos")
+    parser.add_argument('--out', default=None, help="Guardar los resultados en este JSON")
+    args = parser.parse_args()
+
+    rgb = sample_points(args.stride, args.samples)
+    rulesets = {f: f for f in args.rules}
+    with tempfile.TemporaryDirectory() as tmp:
+        if not args.no_edge_cases:
+            # Rutas absolutas: os.path.join(RULES_DIR, ruta) devuelve la ruta tal cual
+            for name, rules in edge_case_rulesets().items():
+                path = os.path.join(tmp, f"{name}.json")
+                with open(path, 'w') as f:
+                    json.dump(rules, f)
+                rulesets[f"<{name}>"] = path
+
+        start = time.perf_counter()
+        results = run_conformance(rulesets, args.engines, rgb)
+        elapsed = time.perf_counter() - start
+
+    failed = False
+    print(f"{len(rgb)} colores por combinación, {elapsed:.1f} s")
+    for r in results:
+        tag = f"{r['ruleset']:<16} {r['mf_type']:<21} {r['engine']:<14}"
+        if r.get('skipped'):
+            print(f"{tag} ⚠️ no disponible (¿tabla sin construir?)")
+            continue
+        print(f"{tag} máx {r['max_abs_diff']:.2e}  media {r['mean_abs_diff']:.2e}  "
+              f"None en referencia {r['reference_none']:>4}  {r['engine_us']:.1f} µs vs {r['reference_us']:.0f} µs"
+              + ("" if r['passed'] else "  ⚠️ FALLA"))
+        if not r['passed']:
+            failed = True
+            for w in r['worst']:
+                print(f"    {tuple(w['rgb'])}: {w['value']} en lugar de {w['reference']}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'samples': len(rgb), 'stride': args.stride, 'results': results}, f, indent=2)
+    sys.exit(1 if failed else 0)
@@ -1,140 +1,81 @@
-import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
-from rules_loader import load_rules_from_file  
-
-
-# 1. Universos y Constantes
-X_COLOR = np.arange(0, 256, 1)
-X_OUTPUT = np.arange(0, 101, 1)
-
-KEY_POINTS = {
-    'Bajo': [0, 0, 85],
-    'MedioBajo': [0, 85, 170],
-    'MedioAlto': [85, 170, 255],
-    'Alto': [170, 255, 255],
-}
-
-MF_TYPES = ['Triangular (trimf)', 'Trapezoidal (trapmf)']
-LEVELS = list(KEY_POINTS.keys())
-COLORS_OUT = ['Rojo', 'Naranja', 'Amarillo', 'VerdeLima', 'Verde', 'Cian', 'Azul', 'Magenta']
-
-
-def create_mf(mf_type, points, universe):
-    """Crea una función de pertenencia según el tipo y los puntos dados."""
-    a, b, c = points[0], points[1], points[2]
-
-    if 'Triangular' in mf_type:
-        return fuzz.trimf(universe, [a, b, c])
-
-    elif 'Trapezoidal' in mf_type:
-        p1 = a
-        p2 = b - 20 if b > 20 else b
-        p3 = b + 20 if b < 235 else b
-        p4 = c
-
-        if p2 < p1: p2 = p1
-        if p3 > p4: p3 = p4
-
-        return fuzz.trapmf(universe, [p1, p2, p3, p4])
-
-    return fuzz.trimf(universe, [a, b, c])
-
-
-def get_output_functions(mf_type_selected="Triangular (trimf)"):
-    """Genera las funciones de salida (consequents) para todos los colores del sistema RGB difuso."""
-    
-    def make_mf(a, b, c):
-        if "Trapezoidal" in mf_type_selected:
-            p1, p2, p3, p4 = a, b - 5, b + 5, c 
-            if p2 < p1: p2 = p1
-            if p3 > p4: p3 = p4
-            return fuzz.trapmf(X_OUTPUT, [p1, p2, p3, p4])
-        else:
-            return fuzz.trimf(X_OUTPUT, [a, b, c])
-
-    # DEFINICIÓN COMPLETA CON TODAS TUS ETIQUETAS
-    color_definitions = {
-        # Tonos Oscuros/Bajos
-        'Negro': (0, 0, 5),
-        'AzulOscuro': (5, 10, 20),
-        'VerdeOscuro': (15, 20, 30),
-        'RojoOscuro': (25, 30, 40),
-        'NaranjaOscuro': (30, 35, 45),
-        'AmarilloOscuro': (35, 40, 50),
-        'CianOscuro': (40, 45, 55),
-        'MagentaOscuro': (45, 50, 60),
-        
-        # Colores Base/Medios
-        'Azul': (50, 55, 65),
-        'Cian': (55, 60, 70),
-        'Verde': (60, 65, 75),
-        'Amarillo': (65, 70, 80),
-        'Naranja': (70, 75, 85),
-        'Rojo': (75, 80, 90),
-        'Magenta': (80, 85, 95),
-        
-        # Tonos Claros/Brillantes
-        'AmarilloClaro': (70, 75, 85),
-        'NaranjaClaro': (75, 80, 90),
-        'CianClaro': (78, 83, 93),
-        'MagentaClaro': (82, 87, 97),
-        'Rosa': (70, 80, 90),
-        'BlancoApagado': (65, 75, 85),
-        'Blanco': (85, 90, 98),
-        
-        'AzulBrillante': (85, 90, 95),
-        'CianBrillante': (88, 93, 98),
-        'VerdeBrillante': (88, 93, 98),
-        'AmarilloBrillante': (90, 95, 100),
-        'RojoBrillante': (90, 95, 100),
-        'MagentaBrillante': (92, 97, 100),
-        'BlancoBrillante': (95, 100, 100),
-        
-        # Colores personalizados de tus reglas
-        'VerdeAzulado': (55, 65, 75),
-        'VerdeAzuladoBrillante': (75, 85, 95),
-        'Gris': (40, 50, 60),
-        'Lavanda': (65, 75, 85),
-        'AmarilloVerde': (60, 70, 80),
-        'AmarilloVerdeClaro': (70, 80, 90),
-        'RojoMagenta': (70, 80, 90),
-        'Salmon': (75, 85, 95),
-        'LavandaClaro': (75, 85, 95),
-        'RosaClaro': (80, 90, 100),
-        'RosaBrillante': (85, 95, 100),
-        'BlancoAzulado': (85, 92, 100),
-        'AmarilloVerdeBrillante': (85, 95, 100),
-        'BlancoVerde': (88, 95, 100),
-        'RojoMagentaBrillante': (90, 97, 100),
-        'Melon': (80, 90, 100),
-        'AmarilloClaroBrillante': (85, 95, 100),
-        'BlancoAmarillento': (90, 97, 100),
-        'BlancoPuro': (98, 100, 100),
-        'NaranjaBrillante': (85, 92, 100),  # <-- ESTA FALTABA
-    }
-    
-    # Crear las funciones de pertenencia
-    output_funcs = {}
-    for color_name, (a, b, c) in color_definitions.items():
-        output_funcs[color_name] = make_mf(a, b, c)
-    
-    return output_funcs
-# --- FUNCIÓN PRINCIPAL DEL SISTEMA FUZZY ---
-def create_system_from_json(rules_filename, R_val, G_val, B_val, mf_type_selected):
+import threading
+
+from fuzzy_metrics import instrument, timed
+from fuzzy_numpy import (
+    BATCH_CHUNK_SIZE, COLORS_OUT, DEFAULT_RESOLUTION, ENGINES, EXACT_DEFUZZ_METHODS, INPUT_VARIABLES, KEY_POINTS,
+    LEVELS, MF_TYPES, OUTPUT_DEFINITIONS, OUTPUT_LABELS, RESOLUTION_PROFILES, SUGENO_CONSTANTS, SYSTEM_CACHE_SIZE,
+    X_COLOR, X_OUTPUT, CompiledRuleset, NumpySimulation, _cached_build, classify_batch, clear_system_cache,
+    compile_ruleset, create_mf, create_system_numpy, get_output_functions, input_membership, input_mf_points,
+    output_membership, output_mf_points, sugeno_constants, trapezoid_membership, universes
+)
+from rules_loader import load_rules_from_file
+
+# El motor NumPy y todo lo que solo necesita NumPy (universos, KEY_POINTS,
+# bancos de MF, inferencia, lotes) vive en fuzzy_numpy y se reexporta aquí.
+# skfuzzy (y con él scipy y networkx) se importa al construir o ejecutar el
+# primer ControlSystem, no al importar este módulo.
+_control_system_class = None
+
+
+def _cached_control_system_class():
+    """
+    ControlSystem que reutiliza el orden de cálculo de las reglas.
+
+    skfuzzy crea un RuleOrderGenerator nuevo cada vez que se accede a `rules`
+    (dos veces por compute()), recorriendo de nuevo todo el grafo con networkx.
+    El generador ya se invalida solo cuando cambia el grafo, así que basta con
+    conservar una única instancia. La clase se define al primer uso porque
+    hereda de ctrl.ControlSystem.
+    """
+    global _control_system_class
+    if _control_system_class is None:
+        from skfuzzy import control as ctrl
+        from skfuzzy.control.controlsystem import RuleOrderGenerator
+
+        class CachedControlSystem(ctrl.ControlSystem):
+            @property
+            def rules(self):
+                generator = self.__dict__.get('_rule_order')
+                if generator is None:
+                    generator = self._rule_order = RuleOrderGenerator(self)
+                return generator
+
+        _control_system_class = CachedControlSystem
+    return _control_system_class
+
+
+def skfuzzy_mf(mf_type_selected, points, universe):
     """
-    Crea y ejecuta el sistema de control Fuzzy basado en un archivo JSON de reglas.
+    MF [p1, p2, p3, p4] muestreada con fuzz.trimf / fuzz.trapmf sobre `universe`.
+
+    El sistema de skfuzzy es la referencia de los motores NumPy, que evalúan
+    las mismas MF con trapezoid_membership; muestrearlas aquí con skfuzzy,
+    como el código original, hace que fuzzy_conformance compare dos
+    implementaciones distintas de la forma y no la misma dos veces.
     """
+    import skfuzzy as fuzz
+
+    if 'Trapezoidal' in mf_type_selected:
+        return fuzz.trapmf(universe, points)
+    return fuzz.trimf(universe, [points[0], points[1], points[3]])
+
+
+@instrument('skfuzzy/construct')
+def build_control_system(rules_filename, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """Construye el ControlSystem de skfuzzy para un archivo de reglas, sin ejecutarlo."""
+    from skfuzzy import control as ctrl
+
+    x_color, x_output = universes(mf_type_selected, resolution)
 
     # 1. Variables de Entrada y Salida
-    Rojo = ctrl.Antecedent(X_COLOR, 'Rojo')
-    Verde = ctrl.Antecedent(X_COLOR, 'Verde')
-    Azul = ctrl.Antecedent(X_COLOR, 'Azul')
-    Clasificacion = ctrl.Consequent(X_OUTPUT, 'ColorOutput')
+    Rojo = ctrl.Antecedent(x_color, 'Rojo')
+    Verde = ctrl.Antecedent(x_color, 'Verde')
+    Azul = ctrl.Antecedent(x_color, 'Azul')
+    Clasificacion = ctrl.Consequent(x_output, 'ColorOutput')
 
     # Funciones de entrada (MF)
     selected_mf = {
-        name: create_mf(mf_type_selected, points, X_COLOR)
+        name: skfuzzy_mf(mf_type_selected, input_mf_points(mf_type_selected, points), x_color)
         for name, points in KEY_POINTS.items()
     }
     for var in [Rojo, Verde, Azul]:
@@ -142,8 +83,8 @@ def create_system_from_json(rules_filename, R_val, G_val, B_val, mf_type_selecte
             var[name] = func
 
     # Funciones de salida
-    for label, mf in get_output_functions(mf_type_selected).items():
-        Clasificacion[label] = mf
+    for label, (a, b, c) in OUTPUT_DEFINITIONS.items():
+        Clasificacion[label] = skfuzzy_mf(mf_type_selected, output_mf_points(mf_type_selected, a, b, c), x_output)
 
     # 2. Cargar reglas desde archivo usando rules_loader
     rules = load_rules_from_file(rules_filename, Rojo, Verde, Azul, Clasificacion)
@@ -152,18 +93,56 @@ def create_system_from_json(rules_filename, R_val, G_val, B_val, mf_type_selecte
         # Regla de emergencia si no hay reglas válidas
         rules = [ctrl.Rule(Rojo['Bajo'] | Verde['Bajo'] | Azul['Bajo'], Clasificacion['Azul'])]
 
-    # 3. Crear y ejecutar sistema de control
-    control_system = ctrl.ControlSystem(rules)
-    color_simulador = ctrl.ControlSystemSimulation(control_system)
+    return _cached_control_system_class()(rules)
 
-    color_simulador.input['Rojo'] = R_val
-    color_simulador.input['Verde'] = G_val
-    color_simulador.input['Azul'] = B_val
 
-    try:
-        color_simulador.compute()
-    except Exception as e:
-        print(f"Error en computación fuzzy: {e}")
-        return None, None
+def get_compiled_system(rules_filename, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """
+    Devuelve (ControlSystem, lock) para el archivo y tipo de MF, desde la caché LRU.
+
+    skfuzzy guarda el estado de cada simulación dentro de los términos del
+    sistema, así que las ejecuciones sobre un mismo sistema deben hacerse
+    sosteniendo el lock devuelto.
+    """
+    return _cached_build(
+        'skfuzzy', rules_filename, mf_type_selected,
+        lambda filename, mf_type, res: (build_control_system(filename, mf_type, res), threading.Lock()),
+        resolution
+    )
+
+
+# --- FUNCIÓN PRINCIPAL DEL SISTEMA FUZZY ---
+def create_system_from_json(rules_filename, R_val, G_val, B_val, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """
+    Ejecuta el sistema de control Fuzzy basado en un archivo JSON de reglas.
+    El sistema compilado se reutiliza desde la caché; aquí solo se fijan entradas y se calcula.
+    """
+    from skfuzzy import control as ctrl
+
+    control_system, system_lock = get_compiled_system(rules_filename, mf_type_selected, resolution)
+
+    with system_lock:
+        # cache=False: skfuzzy limpia el estado interno tras cada ejecución,
+        # así el sistema compartido no acumula resultados entre llamadas.
+        color_simulador = ctrl.ControlSystemSimulation(control_system, cache=False)
+
+        color_simulador.input['Rojo'] = R_val
+        color_simulador.input['Verde'] = G_val
+        color_simulador.input['Azul'] = B_val
+
+        try:
+            with timed('skfuzzy/compute'):
+                color_simulador.compute()
+        except Exception as e:
+            print(f"Error en computación fuzzy: {e}")
+            color_simulador.reset()
+            return None, None
 
     return color_simulador.output.get('ColorOutput'), color_simulador
+
+
+def run_engine(engine, rules_filename, R_val, G_val, B_val, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """Ejecuta el motor indicado ('skfuzzy' o 'numpy') con la firma de create_system_from_json."""
+    if engine == 'numpy':
+        return create_system_numpy(rules_filename, R_val, G_val, B_val, mf_type_selected, resolution)
+    return create_system_from_json(rules_filename, R_val, G_val, B_val, mf_type_selected, resolution)
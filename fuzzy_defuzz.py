@@ -0,0 +1,76 @@
+import argparse
+import time
+
+import numpy as np
+import skfuzzy as fuzz
+
+from fuzzy_core import EXACT_DEFUZZ_METHODS, MF_TYPES, X_OUTPUT, compile_ruleset
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+
+
+def sampled_defuzz(compiled, cuts, method='centroid'):
+    """Defuzzificación clásica: el agregado muestreado sobre X_OUTPUT y fuzz.defuzz, fila a fila."""
+    aggregate = compiled.aggregate(cuts)
+    values = np.full(cuts.shape[0], np.nan)
+    for i, row in enumerate(aggregate):
+        if row.max() > 0:
+            values[i] = fuzz.defuzz(X_OUTPUT, row, method)
+    return values
+
+
+def validate_exact(rules_filename, mf_type_selected, method='centroid', samples=2000, seed=0):
+    """
+    Compara la defuzzificación exacta con la muestreada sobre colores aleatorios.
+
+    Devuelve un diccionario con la diferencia máxima y media, el color donde la
+    diferencia es mayor (con ambos valores) y el tiempo por muestra de cada modo.
+    """
+    compiled = compile_ruleset(rules_filename, mf_type_selected)
+    rgb = np.random.default_rng(seed).integers(0, 256, (samples, 3))
+    _, cuts, _ = compiled.evaluate(rgb)
+
+    start = time.perf_counter()
+    exact = compiled.defuzzify_exact(cuts, method)
+    exact_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sampled = sampled_defuzz(compiled, cuts, method)
+    sampled_s = time.perf_counter() - start
+
+    both = ~(np.isnan(exact) | np.isnan(sampled))
+    diff = np.where(both, np.abs(exact - sampled), 0.0)
+    worst = int(np.argmax(diff))
+    return {
+        'rules_filename': rules_filename,
+        'mf_type': mf_type_selected,
+        'method': method,
+        'samples': samples,
+        'nan_mismatches': int((np.isnan(exact) != np.isnan(sampled)).sum()),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff[both].mean()) if both.any() else 0.0,
+        'worst_rgb': [int(v) for v in rgb[worst]],
+        'worst_exact': float(exact[worst]),
+        'worst_sampled': float(sampled[worst]),
+        'exact_us': exact_s / samples * 1e6,
+        'sampled_us': sampled_s / samples * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara la defuzzificación exacta con la muestreada sobre X_OUTPUT.")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--method', nargs='*', choices=list(EXACT_DEFUZZ_METHODS), default=list(EXACT_DEFUZZ_METHODS),
+                        help="Métodos a validar")
+    parser.add_argument('--samples', type=int, default=2000, help="Colores aleatorios por combinación")
+    args = parser.parse_args()
+
+    for rules_filename in args.rules:
+        for mf_type in MF_TYPES:
+            for method in args.method:
+                r = validate_exact(rules_filename, mf_type, method, args.samples)
+                print(f"{rules_filename:<15} {mf_type:<21} {method:<9} "
+                      f"máx {r['max_abs_diff']:.4f}  media {r['mean_abs_diff']:.4f}  "
+                      f"peor {tuple(r['worst_rgb'])}: {r['worst_exact']:.3f} vs {r['worst_sampled']:.3f}  "
+                      f"exacto {r['exact_us']:.1f} µs  muestreado {r['sampled_us']:.1f} µs"
+                      + (f"  ⚠️ {r['nan_mismatches']} NaN distintos" if r['nan_mismatches'] else ""))
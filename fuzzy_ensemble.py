@@ -0,0 +1,227 @@
+import argparse
+import time
+import warnings
+
+import numpy as np
+
+from fuzzy_numpy import (
+    BATCH_CHUNK_SIZE, DEFAULT_RESOLUTION, MF_TYPES, OUTPUT_LABELS, classify_batch, compile_ruleset
+)
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+
+
+class RulesetEnsemble:
+    """
+    Varios rulesets evaluados juntos sobre las mismas entradas, en una sola pasada.
+
+    Todos comparten KEY_POINTS y las MF de salida (mismo tipo de MF y
+    resolución), así que:
+
+    - la fuzzificación y la búsqueda de celdas activas se hacen una vez por
+      bloque con CompiledRuleset.active_cells;
+    - cada ruleset se reduce a una tabla de consecuentes por celda
+      (cell_labels: (n_rulesets, celdas, m), índice en OUTPUT_LABELS o
+      len(OUTPUT_LABELS) si no hay regla) y las tablas se apilan: todas las
+      reglas de una celda tienen la misma activación (la de la celda), así que
+      los consecuentes activos de cada ruleset salen de un solo índice;
+    - las filas (ruleset, color) con los mismos consecuentes activos dan la
+      misma salida y se evalúan una vez;
+    - el centroide de las filas restantes se calcula con una llamada a
+      defuzzify_terms por número de reglas activas K, sin rellenar las filas
+      hasta el K mayor del bloque.
+
+    El resultado coincide con classify_batch de cada ruleset por separado
+    (salvo el redondeo de la suma del centroide, < 1e-12). Un ruleset con
+    reglas OR (la de emergencia) no pertenece a celdas y se evalúa aparte.
+    """
+
+    def __init__(self, rules_filenames, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+        self.rules_filenames = list(rules_filenames)
+        self.mf_type = mf_type_selected
+        self.members = [compile_ruleset(f, mf_type_selected, resolution) for f in self.rules_filenames]
+        self.reference = self.members[0]
+        self.shared = [not c.rule_is_or.any() for c in self.members]
+
+        # Consecuente de cada regla de cada celda; la etiqueta ficticia n_labels
+        # tiene vértices [0, 1, 1, 2] y corte 0, como la regla ficticia de active_rules
+        n_labels = len(OUTPUT_LABELS)
+        width = max(c.cell_rules.shape[1] for c in self.members)
+        self.cell_labels = np.full((len(self.members), self.reference.cell_rules.shape[0], width), n_labels,
+                                   dtype=np.intp)
+        for i, compiled in enumerate(self.members):
+            outputs = np.r_[compiled.rule_outputs, n_labels]
+            self.cell_labels[i, :, :compiled.cell_rules.shape[1]] = outputs[compiled.cell_rules]
+        self.label_points = np.vstack([self.reference.output_points, [[0.0, 1.0, 1.0, 2.0]]])
+
+    def _evaluate_shared(self, cells, cell_strengths, members, return_labels):
+        """Salidas (N, len(members)) y etiquetas ganadoras (índices, n_labels si ninguna) de los rulesets `members`."""
+        n, n_labels = cells.shape[0], len(OUTPUT_LABELS)
+        width = self.cell_labels.shape[2]
+        # (S, N, K) consecuentes activos y sus activaciones; una celda sin activación no aporta
+        labels = self.cell_labels[members][:, cells].reshape(len(members), n, -1)
+        strengths = np.repeat(cell_strengths, width, axis=1)
+        labels = np.where(strengths[None] > 0, labels, n_labels)
+        strengths = np.where(labels < n_labels, strengths[None], 0.0)
+
+        # Filas repetidas: mismo color y mismos consecuentes activos que un ruleset anterior
+        source = np.broadcast_to(np.arange(len(members))[:, None], (len(members), n)).copy()
+        for i in range(1, len(members)):
+            for j in range(i):
+                same = (source[i] == i) & (labels[i] == labels[j]).all(axis=1)
+                source[i, same] = source[j, same]
+        unique = (source == np.arange(len(members))[:, None]).reshape(-1)
+
+        # Reglas activas primero; las filas únicas se agrupan por cuántas tienen
+        rows_labels = labels.reshape(-1, labels.shape[2])[unique]
+        rows_strengths = strengths.reshape(-1, labels.shape[2])[unique]
+        order = np.argsort(rows_labels == n_labels, axis=1, kind='stable')
+        rows_labels = np.take_along_axis(rows_labels, order, axis=1)
+        rows_strengths = np.take_along_axis(rows_strengths, order, axis=1)
+        counts = (rows_labels < n_labels).sum(axis=1)
+
+        unique_values = np.full(len(rows_labels), np.nan)
+        unique_winners = np.full(len(rows_labels), n_labels)
+        for k in np.unique(counts[counts > 0]):
+            # Un solo defuzzify_terms por K: las filas de rulesets con menos reglas
+            # activas no se rellenan hasta el K del más grande (como evaluate_rules)
+            rows = np.flatnonzero(counts == k)
+            k_labels, k_strengths = rows_labels[rows, :k], rows_strengths[rows, :k]
+            same = k_labels[:, :, None] == k_labels[:, None, :]
+            cuts = np.where(same, k_strengths[:, None, :], 0.0).max(axis=2)
+            unique_values[rows] = self.reference.defuzzify_terms(cuts, self.label_points[k_labels])
+            if return_labels:
+                # Etiqueta con mayor corte; en empate, la de menor índice (como winning_labels)
+                best = cuts.max(axis=1, keepdims=True)
+                unique_winners[rows] = np.where(cuts == best, k_labels, n_labels).min(axis=1)
+
+        columns = np.arange(n)[None, :]
+        flat = np.full(len(members) * n, np.nan)
+        flat[unique] = unique_values
+        values = flat.reshape(len(members), n)[source, columns].T
+        winners = None
+        if return_labels:
+            flat = np.full(len(members) * n, n_labels)
+            flat[unique] = unique_winners
+            winners = flat.reshape(len(members), n)[source, columns].T
+        return values, winners
+
+    def evaluate(self, rgb, chunk_size=BATCH_CHUNK_SIZE, return_labels=False):
+        """
+        Matriz de salidas (N, n_rulesets), NaN donde un ruleset no activa ninguna regla.
+
+        Con return_labels=True devuelve también la etiqueta ganadora (N, n_rulesets).
+        """
+        rgb = np.asarray(rgb).reshape(-1, 3)
+        n, s = rgb.shape[0], len(self.members)
+        values = np.empty((n, s))
+        labels = np.empty((n, s), dtype=f'<U{max(map(len, OUTPUT_LABELS))}') if return_labels else None
+        names = np.array(OUTPUT_LABELS + [''])
+        shared = [i for i in range(s) if self.shared[i]]
+
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            if shared:
+                chunk_values, winners = self._evaluate_shared(*self.reference.active_cells(rgb[start:stop]),
+                                                              shared, return_labels)
+                values[start:stop, shared] = chunk_values
+                if return_labels:
+                    labels[start:stop, shared] = names[winners]
+            for i in (i for i in range(s) if not self.shared[i]):
+                compiled = self.members[i]
+                chunk_values, ids, active = compiled.evaluate_active(rgb[start:stop])
+                values[start:stop, i] = chunk_values
+                if return_labels:
+                    cuts = compiled.output_cuts(compiled.dense_strengths(ids, active))
+                    labels[start:stop, i] = compiled.winning_labels(cuts)
+
+        return (values, labels) if return_labels else values
+
+
+def disagreement(values, labels=None):
+    """
+    Estadísticas de desacuerdo para una matriz de salidas (N, n_rulesets).
+
+    - range, std: (N,) rango y desviación típica entre rulesets de cada muestra
+      (solo rulesets con salida).
+    - pairwise_mean_abs_diff, pairwise_max_abs_diff: (n_rulesets, n_rulesets).
+    - pairwise_nan_mismatches: muestras donde solo uno de los dos no tiene salida.
+    - pairwise_label_agreement: fracción de muestras con la misma etiqueta ganadora (si se dan labels).
+    """
+    s = values.shape[1]
+    with warnings.catch_warnings():
+        # Filas sin salida en ningún ruleset: nanmax/nanstd devuelven NaN y avisan
+        warnings.simplefilter('ignore', RuntimeWarning)
+        stats = {'range': np.nanmax(values, axis=1) - np.nanmin(values, axis=1),
+                 'std': np.nanstd(values, axis=1)}
+
+    mean_diff, max_diff = np.zeros((s, s)), np.zeros((s, s))
+    nan_mismatches = np.zeros((s, s), dtype=int)
+    agreement = np.ones((s, s)) if labels is not None else None
+    for i in range(s):
+        for j in range(i + 1, s):
+            a, b = values[:, i], values[:, j]
+            both = ~(np.isnan(a) | np.isnan(b))
+            diff = np.abs(a[both] - b[both])
+            mean_diff[i, j] = mean_diff[j, i] = diff.mean() if diff.size else 0.0
+            max_diff[i, j] = max_diff[j, i] = diff.max() if diff.size else 0.0
+            nan_mismatches[i, j] = nan_mismatches[j, i] = int((np.isnan(a) != np.isnan(b)).sum())
+            if labels is not None:
+                agreement[i, j] = agreement[j, i] = float((labels[:, i] == labels[:, j]).mean())
+
+    stats.update(pairwise_mean_abs_diff=mean_diff, pairwise_max_abs_diff=max_diff,
+                 pairwise_nan_mismatches=nan_mismatches)
+    if agreement is not None:
+        stats['pairwise_label_agreement'] = agreement
+    return stats
+
+
+def evaluate_ensemble(rules_filenames, rgb, mf_type_selected, return_stats=False, return_labels=False):
+    """Atajo: salidas (N, n_rulesets) de RulesetEnsemble y, si se piden, etiquetas y disagreement()."""
+    ensemble = RulesetEnsemble(rules_filenames, mf_type_selected)
+    if not (return_stats or return_labels):
+        return ensemble.evaluate(rgb)
+    values, labels = ensemble.evaluate(rgb, return_labels=True)
+    result = (values,)
+    if return_labels:
+        result += (labels,)
+    if return_stats:
+        result += (disagreement(values, labels),)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evalúa varios rulesets sobre los mismos colores y compara sus salidas.")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--samples', type=int, default=50000, help="Colores aleatorios")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    rgb = np.random.default_rng(0).integers(0, 256, (args.samples, 3))
+    ensemble = RulesetEnsemble(args.rules, mf_type)
+
+    start = time.perf_counter()
+    values, labels = ensemble.evaluate(rgb, return_labels=True)
+    ensemble_s = time.perf_counter() - start
+    start = time.perf_counter()
+    separate = np.stack([classify_batch(f, rgb, mf_type) for f in args.rules], axis=1)
+    separate_s = time.perf_counter() - start
+
+    both = ~(np.isnan(values) | np.isnan(separate))
+    print(f"Conjunto: {ensemble_s / args.samples * 1e6:.2f} µs/muestra  "
+          f"por separado: {separate_s / args.samples * 1e6:.2f} µs/muestra  "
+          f"diferencia máx {np.abs(values - separate)[both].max():.2e}  "
+          f"NaN distintos {int((np.isnan(values) != np.isnan(separate)).sum())}")
+
+    stats = disagreement(values, labels)
+    print(f"Rango entre rulesets: media {np.nanmean(stats['range']):.3f}  "
+          f"p95 {np.nanpercentile(stats['range'], 95):.3f}  máx {np.nanmax(stats['range']):.3f}")
+    width = max(map(len, args.rules))
+    for i, a in enumerate(args.rules):
+        for j, b in enumerate(args.rules[i + 1:], start=i + 1):
+            print(f"  {a:<{width}} vs {b:<{width}}  media {stats['pairwise_mean_abs_diff'][i, j]:.3f}  "
+                  f"máx {stats['pairwise_max_abs_diff'][i, j]:.3f}  "
+                  f"misma etiqueta {stats['pairwise_label_agreement'][i, j]:.1%}"
+                  + (f"  ⚠️ {stats['pairwise_nan_mismatches'][i, j]} NaN distintos"
+                     if stats['pairwise_nan_mismatches'][i, j] else ""))
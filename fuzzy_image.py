@@ -0,0 +1,95 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+from fuzzy_numpy import MF_TYPES, OUTPUT_LABELS, classify_batch
+
+# Índice de etiqueta para los píxeles donde ninguna regla se activa
+NO_LABEL = -1
+
+
+def load_image(path):
+    """Carga una imagen como arreglo (H, W, 3) uint8 desde .npy o un formato de imagen (requiere Pillow)."""
+    if path.lower().endswith('.npy'):
+        image = np.load(path)
+    else:
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ImportError("Para leer archivos de imagen instala Pillow (pip install pillow) o usa .npy")
+        with Image.open(path) as img:
+            image = np.asarray(img.convert('RGB'))
+
+    if image.ndim == 2:
+        image = np.stack([image] * 3, axis=-1)
+    return np.ascontiguousarray(image[..., :3], dtype=np.uint8)
+
+
+def pack_rgb(pixels):
+    """Empaqueta colores (N, 3) uint8 en claves uint32 0xRRGGBB."""
+    pixels = pixels.astype(np.uint32)
+    return (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+
+
+def unpack_rgb(keys):
+    """Inverso de pack_rgb: claves uint32 a colores (N, 3) uint8."""
+    return np.stack([(keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF], axis=1).astype(np.uint8)
+
+
+def classify_image(image, rules_filename, mf_type_selected):
+    """
+    Clasifica cada píxel de una imagen (H, W, 3) uint8.
+
+    Solo se infiere una vez por color distinto: los colores se empaquetan en
+    uint32, np.unique devuelve los índices inversos y los resultados se
+    reparten de vuelta a los píxeles. Devuelve (valores, etiquetas), ambos
+    (H, W): la salida crisp (NaN si ninguna regla se activa) y el índice en
+    OUTPUT_LABELS de la etiqueta ganadora (NO_LABEL si no hay).
+    """
+    image = np.asarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+
+    keys, inverse = np.unique(pack_rgb(image.reshape(-1, 3)), return_inverse=True)
+    values, labels = classify_batch(rules_filename, unpack_rgb(keys), mf_type_selected, return_labels=True)
+
+    label_index = {label: i for i, label in enumerate(OUTPUT_LABELS)}
+    label_ids = np.array([label_index.get(label, NO_LABEL) for label in labels], dtype=np.int16)
+
+    inverse = inverse.reshape(-1)
+    return values[inverse].reshape(height, width), label_ids[inverse].reshape(height, width)
+
+
+def label_names(label_ids):
+    """Convierte un mapa de índices de etiqueta en nombres ('' donde no hay etiqueta)."""
+    names = np.array(OUTPUT_LABELS + [''])
+    return names[np.where(label_ids == NO_LABEL, len(OUTPUT_LABELS), label_ids)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clasifica los píxeles de una imagen con el sistema fuzzy.")
+    parser.add_argument('image', help="Imagen (png, jpg, ...) o arreglo .npy (H, W, 3)")
+    parser.add_argument('--rules', default='rules_100.json', help="Archivo de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--out', default=None, help="Prefijo de salida (por defecto, junto a la imagen)")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    image = load_image(args.image)
+
+    start = time.perf_counter()
+    values, label_ids = classify_image(image, args.rules, mf_type)
+    elapsed = time.perf_counter() - start
+
+    out = args.out or os.path.splitext(args.image)[0] + '_fuzzy'
+    np.save(out + '_values.npy', values)
+    np.save(out + '_labels.npy', label_ids)
+
+    n_colors = len(np.unique(pack_rgb(image.reshape(-1, 3))))
+    print(f"{image.shape[0]}x{image.shape[1]} píxeles, {n_colors} colores distintos, {elapsed:.2f} s")
+    ids, counts = np.unique(label_ids, return_counts=True)
+    for i, count in sorted(zip(ids, counts), key=lambda x: -x[1])[:5]:
+        name = OUTPUT_LABELS[i] if i != NO_LABEL else '(sin activación)'
+        print(f"  {name}: {100 * count / label_ids.size:.1f}%")
+    print(f"Resultados guardados en {out}_values.npy y {out}_labels.npy")
@@ -0,0 +1,335 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from fuzzy_image import NO_LABEL
+from fuzzy_lut import LUT_DIR, LUT_SIZE, rules_file_hash
+from fuzzy_numpy import MF_TYPES, OUTPUT_LABELS, _rules_file_mtime, classify_batch
+
+INVERSE_MAGIC = "FZINV1"
+DEFAULT_STEP = 4   # lado del vóxel por canal: 64³ vóxeles
+
+# Caché propia de índices en memoria: no compite con los sistemas compilados
+# por las entradas de la LRU de fuzzy_numpy. Se invalida igual, por la fecha
+# de modificación del archivo de reglas.
+INDEX_CACHE_SIZE = 4
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def index_path(rules_filename, mf_type_selected, step=DEFAULT_STEP):
+    """Ruta del índice inverso para (archivo de reglas, tipo de MF, paso)."""
+    mf_tag = 'trapmf' if 'Trapezoidal' in mf_type_selected else 'trimf'
+    name = os.path.splitext(rules_filename)[0]
+    return os.path.join(LUT_DIR, f"{name}_{mf_tag}_s{step}.inv.npz")
+
+
+def voxel_centers(step):
+    """Color representativo por canal de cada vóxel: el centro de [i*step, (i+1)*step), saturado a 255."""
+    return np.minimum(np.arange(0, LUT_SIZE, step) + step // 2, LUT_SIZE - 1)
+
+
+def _runs(keys, position):
+    """
+    Agrupa elementos con la misma clave y posiciones consecutivas.
+
+    `keys` es (N, K) y `position` (N,); devuelve el id de grupo de cada
+    elemento (en el orden de entrada) y el número de grupos.
+    """
+    order = np.lexsort((position,) + tuple(keys[:, c] for c in reversed(range(keys.shape[1]))))
+    k, p = keys[order], position[order]
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (k[1:] != k[:-1]).any(axis=1) | (p[1:] != p[:-1] + 1)
+    group = np.empty(len(order), dtype=np.intp)
+    group[order] = np.cumsum(new) - 1
+    return group, int(new.sum())
+
+
+def mask_boxes(mask):
+    """
+    Cajas [inicio, fin) en índices de vóxel (M, 6) = (i0, i1, j0, j1, k0, k1)
+    que cubren exactamente una máscara (n, n, n).
+
+    Primero tramos a lo largo del último eje, después se juntan los tramos
+    iguales de filas vecinas y, por último, los rectángulos iguales de planos
+    vecinos. No es la cobertura mínima, pero es exacta y sin solapes.
+    """
+    n_i, n_j, _ = mask.shape
+    edges = np.diff(np.pad(mask, ((0, 0), (0, 0), (1, 1))).astype(np.int8), axis=2)
+    starts, stops = np.argwhere(edges == 1), np.argwhere(edges == -1)
+    if not len(starts):
+        return np.empty((0, 6), dtype=np.int64)
+    # (i, j, k0, k1): ambos argwhere recorren las filas en el mismo orden
+    runs = np.column_stack([starts, stops[:, 2]])
+
+    group, n_rects = _runs(runs[:, [0, 2, 3]], runs[:, 1])
+    rects = np.empty((n_rects, 5), dtype=np.int64)   # (i, j0, j1, k0, k1)
+    rects[group, 0] = runs[:, 0]
+    rects[group, 3:] = runs[:, 2:]
+    rects[:, 1] = n_j
+    rects[:, 2] = 0
+    np.minimum.at(rects[:, 1], group, runs[:, 1])
+    np.maximum.at(rects[:, 2], group, runs[:, 1] + 1)
+
+    group, n_boxes = _runs(rects[:, 1:], rects[:, 0])
+    boxes = np.empty((n_boxes, 6), dtype=np.int64)
+    boxes[group, 2:] = rects[:, 1:]
+    boxes[:, 0] = n_i
+    boxes[:, 1] = 0
+    np.minimum.at(boxes[:, 0], group, rects[:, 0])
+    np.maximum.at(boxes[:, 1], group, rects[:, 0] + 1)
+    return boxes
+
+
+class InverseIndex:
+    """
+    Índice inverso de la superficie de clasificación sobre una malla de vóxeles.
+
+    El cubo RGB se divide en vóxeles de lado `step`; cada uno se clasifica
+    con su color central. El índice guarda:
+
+    - order: ids de vóxel (i*n² + j*n + k) ordenados por salida crisp, con los
+      que no activan ninguna regla al final; un rango de salida es un tramo
+      contiguo que se encuentra con dos búsquedas binarias.
+    - sorted_values: las salidas en ese orden (sin los NaN).
+    - label_offsets / label_voxels: los ids agrupados por etiqueta ganadora
+      (índice en OUTPUT_LABELS) en formato CSR; el último grupo son los
+      vóxeles sin etiqueta.
+
+    Las consultas devuelven ids de vóxel; mask() y boxes() los convierten en
+    una máscara (n, n, n) o en cajas RGB [inicio, fin) por canal.
+
+    Las respuestas son aproximadas a nivel de vóxel: todos los colores de un
+    vóxel reciben la salida y la etiqueta de su color central, así que cerca
+    de los bordes de una región hay colores incluidos que no cumplen la
+    consulta y colores que la cumplen pero quedan fuera (verify() los cuenta).
+    Solo con step=1 cada vóxel es un color y el índice es exacto.
+    """
+
+    def __init__(self, order, sorted_values, label_offsets, label_voxels, header):
+        self.order = order
+        self.sorted_values = sorted_values
+        self.label_offsets = label_offsets
+        self.label_voxels = label_voxels
+        self.header = header
+        self.step = header['step']
+        self.n = len(voxel_centers(self.step))
+
+    @property
+    def memory_bytes(self):
+        return sum(a.nbytes for a in (self.order, self.sorted_values, self.label_offsets, self.label_voxels))
+
+    def query_range(self, lo, hi):
+        """Ids de los vóxeles cuya salida está en [lo, hi]."""
+        start = np.searchsorted(self.sorted_values, lo, side='left')
+        stop = np.searchsorted(self.sorted_values, hi, side='right')
+        return self.order[start:max(start, stop)]
+
+    def query_label(self, label):
+        """Ids de los vóxeles cuya etiqueta ganadora es `label` (nombre o índice); None para los que no activan reglas."""
+        if label is None or label == NO_LABEL:
+            i = len(OUTPUT_LABELS)
+        elif isinstance(label, str):
+            if label not in OUTPUT_LABELS:
+                print(f"⚠️ Etiqueta desconocida: {label}")
+                return self.label_voxels[:0]
+            i = OUTPUT_LABELS.index(label)
+        else:
+            i = int(label)
+        return self.label_voxels[self.label_offsets[i]:self.label_offsets[i + 1]]
+
+    def voxel_of(self, rgb):
+        """Id del vóxel (N,) de cada color (N, 3) en 0–255."""
+        idx = np.clip(np.asarray(rgb, dtype=np.int64).reshape(-1, 3), 0, LUT_SIZE - 1) // self.step
+        return (idx[:, 0] * self.n + idx[:, 1]) * self.n + idx[:, 2]
+
+    def centers(self, ids):
+        """Color central (N, 3) de cada vóxel."""
+        return voxel_centers(self.step)[np.stack(np.unravel_index(ids, (self.n,) * 3), axis=1)]
+
+    def contains(self, ids, rgb):
+        """True por color (N,) si su vóxel está entre `ids`; no construye la máscara del cubo."""
+        return np.isin(self.voxel_of(rgb), ids)
+
+    def mask(self, ids):
+        """Máscara booleana (n, n, n) de los vóxeles `ids`."""
+        mask = np.zeros(self.n ** 3, dtype=bool)
+        mask[ids] = True
+        return mask.reshape((self.n,) * 3)
+
+    def boxes(self, ids):
+        """Cajas RGB (M, 6) = (r0, r1, g0, g1, b0, b1), [inicio, fin) por canal, que cubren los vóxeles `ids`."""
+        boxes = mask_boxes(self.mask(ids)) * self.step
+        return np.minimum(boxes, LUT_SIZE)
+
+    def verify(self, rules_filename, mf_type_selected, output_range=None, label=None, samples=200000, seed=0):
+        """
+        Compara una consulta con classify_batch en colores aleatorios.
+
+        Devuelve (coincidencias reales, falsos positivos, falsos negativos):
+        el error de asignar a cada color la salida del centro de su vóxel.
+        """
+        rgb = np.random.default_rng(seed).integers(0, LUT_SIZE, (samples, 3))
+        values, labels = classify_batch(rules_filename, rgb, mf_type_selected, return_labels=True)
+        if label is not None:
+            ids = self.query_label(label)
+            truth = np.array([l == label for l in labels]) if label != NO_LABEL else np.isnan(values)
+        else:
+            ids = self.query_range(*output_range)
+            with np.errstate(invalid='ignore'):
+                truth = (values >= output_range[0]) & (values <= output_range[1])
+        found = self.contains(ids, rgb)
+        return int(truth.sum()), int((found & ~truth).sum()), int((truth & ~found).sum())
+
+    def save(self, path):
+        np.savez(path, header=np.array(json.dumps(self.header)), order=self.order, sorted_values=self.sorted_values,
+                 label_offsets=self.label_offsets, label_voxels=self.label_voxels)
+
+    def is_stale(self):
+        """True si el archivo de reglas cambió desde que se construyó el índice."""
+        return rules_file_hash(self.header['rules_filename']) != self.header['rules_sha256']
+
+
+def load_index(path):
+    """Abre un índice guardado con InverseIndex.save."""
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        if header.get('magic') != INVERSE_MAGIC:
+            raise ValueError(f"{path} no es un índice inverso de clasificación fuzzy")
+        return InverseIndex(data['order'], data['sorted_values'], data['label_offsets'], data['label_voxels'], header)
+
+
+def build_index(rules_filename, mf_type_selected, step=DEFAULT_STEP):
+    """Clasifica el color central de cada vóxel con classify_batch y ordena los ids por salida y por etiqueta."""
+    axis = voxel_centers(step)
+    rgb = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+    values, labels = classify_batch(rules_filename, rgb, mf_type_selected, return_labels=True)
+
+    label_index = {label: i for i, label in enumerate(OUTPUT_LABELS)}
+    label_ids = np.array([label_index.get(label, len(OUTPUT_LABELS)) for label in labels], dtype=np.int32)
+
+    # argsort deja los NaN al final
+    order = np.argsort(values, kind='stable').astype(np.int32)
+    n_valid = int((~np.isnan(values)).sum())
+    label_voxels = np.argsort(label_ids, kind='stable').astype(np.int32)
+    label_offsets = np.concatenate([[0], np.cumsum(np.bincount(label_ids, minlength=len(OUTPUT_LABELS) + 1))])
+
+    header = {
+        'magic': INVERSE_MAGIC,
+        'rules_filename': rules_filename,
+        'rules_sha256': rules_file_hash(rules_filename),
+        'mf_type': mf_type_selected,
+        'step': step,
+    }
+    return InverseIndex(order, values[order[:n_valid]].astype(np.float32), label_offsets.astype(np.int64),
+                        label_voxels, header)
+
+
+def load_or_build_index(rules_filename, mf_type_selected, step=DEFAULT_STEP, build=True):
+    """
+    Abre el índice guardado en lut_data; si no existe o quedó desactualizado
+    lo construye y lo guarda (build=True), o devuelve None.
+    """
+    path = index_path(rules_filename, mf_type_selected, step)
+    if os.path.exists(path):
+        index = load_index(path)
+        if not index.is_stale():
+            return index
+        print(f"⚠️ El índice {os.path.basename(path)} no corresponde a la versión actual de {rules_filename}")
+
+    if not build:
+        return None
+    index = build_index(rules_filename, mf_type_selected, step)
+    os.makedirs(LUT_DIR, exist_ok=True)
+    index.save(path)
+    return index
+
+
+def get_index(rules_filename, mf_type_selected, step=DEFAULT_STEP):
+    """Índice en memoria con su propia caché LRU (se invalida al cambiar el archivo de reglas)."""
+    key = (rules_filename, mf_type_selected, step)
+    mtime = _rules_file_mtime(rules_filename)
+
+    with _index_cache_lock:
+        entry = _index_cache.get(key)
+        if entry is not None and entry[0] == mtime:
+            _index_cache.move_to_end(key)
+            return entry[1]
+
+    index = load_or_build_index(rules_filename, mf_type_selected, step)
+
+    with _index_cache_lock:
+        _index_cache[key] = (mtime, index)
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+    return index
+
+
+def clear_index_cache():
+    """Vacía la caché de índices en memoria."""
+    with _index_cache_lock:
+        _index_cache.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Busca los colores RGB que dan un rango de salida o una etiqueta.")
+    parser.add_argument('--rules', default='rules_100.json', help="Archivo de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--step', type=int, default=DEFAULT_STEP, help="Lado del vóxel por canal")
+    parser.add_argument('--range', nargs=2, type=float, default=None, metavar=('MIN', 'MAX'),
+                        help="Rango de salida crisp a buscar")
+    parser.add_argument('--label', default=None, help="Etiqueta ganadora a buscar")
+    parser.add_argument('--boxes', type=int, default=10, help="Cajas a mostrar")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruir el índice aunque esté guardado")
+    parser.add_argument('--verify', type=int, default=0, metavar='SAMPLES',
+                        help="Contar falsos positivos y negativos frente al motor en tantos colores aleatorios")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    start = time.perf_counter()
+    if args.rebuild:
+        index = build_index(args.rules, mf_type, args.step)
+        os.makedirs(LUT_DIR, exist_ok=True)
+        index.save(index_path(args.rules, mf_type, args.step))
+    else:
+        index = load_or_build_index(args.rules, mf_type, args.step)
+    print(f"Índice {args.rules} {mf_type} paso {args.step}: {index.n ** 3} vóxeles, "
+          f"{index.memory_bytes / 2 ** 20:.1f} MB, {time.perf_counter() - start:.2f} s")
+    if index.step > 1:
+        print(f"Aproximado: cada vóxel de {index.step}³ colores toma la salida de su color central "
+              f"(--step 1 da la respuesta exacta, --verify mide el error)")
+
+    queries = []
+    if args.range:
+        queries.append((f"salida en [{args.range[0]:g}, {args.range[1]:g}]", lambda: index.query_range(*args.range),
+                        {'output_range': args.range}))
+    if args.label:
+        queries.append((f"etiqueta {args.label}", lambda: index.query_label(args.label), {'label': args.label}))
+    if not queries:
+        queries = [(f"etiqueta {label}", lambda label=label: index.query_label(label), {'label': label})
+                   for label in OUTPUT_LABELS]
+
+    for name, query, query_args in queries:
+        start = time.perf_counter()
+        ids = query()
+        query_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        boxes = index.boxes(ids)
+        boxes_ms = (time.perf_counter() - start) * 1e3
+        print(f"{name}: {len(ids)} vóxeles ({len(ids) / index.n ** 3:.1%} del cubo), {len(boxes)} cajas  "
+              f"consulta {query_ms:.3f} ms  cajas {boxes_ms:.1f} ms")
+        if args.verify:
+            true, false_pos, false_neg = index.verify(args.rules, mf_type, samples=args.verify, **query_args)
+            print(f"    frente al motor en {args.verify} colores: {true} coincidencias reales, "
+                  f"{false_pos} falsos positivos, {false_neg} falsos negativos")
+        for r0, r1, g0, g1, b0, b1 in boxes[:args.boxes]:
+            print(f"    R [{r0}, {r1})  G [{g0}, {g1})  B [{b0}, {b1})")
+        if len(boxes) > args.boxes:
+            print(f"    ... {len(boxes) - args.boxes} más")
@@ -0,0 +1,352 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from fuzzy_numpy import INPUT_VARIABLES, KEY_POINTS, MF_TYPES, OUTPUT_LABELS, X_COLOR, classify_batch, create_mf
+from rules_loader import RULES_DIR, read_rules_json
+
+# Las tablas se guardan junto al proyecto, fuera del control de versiones
+LUT_DIR = os.path.join(os.path.dirname(__file__), "lut_data")
+
+# Cabecera JSON de tamaño fijo al inicio del archivo; los datos empiezan después
+HEADER_SIZE = 4096
+LUT_MAGIC = "FZLUT1"
+LUT_SIZE = len(X_COLOR)  # 256 valores por canal
+
+# Tipos de salida admitidos. Los enteros guardan round(valor * escala) y
+# reservan el valor máximo para "ninguna regla se activó" (NaN).
+LUT_DTYPES = {
+    'float32': None,
+    'float64': None,
+    'uint8': 254 / 100,
+    'uint16': 65534 / 100,
+}
+
+
+def rules_file_hash(rules_filename):
+    """SHA-256 del contenido del archivo de reglas."""
+    with open(os.path.join(RULES_DIR, rules_filename), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def lut_path(rules_filename, mf_type_selected, dtype='float32'):
+    """Ruta del archivo de tabla para (archivo de reglas, tipo de MF, tipo de salida)."""
+    mf_tag = 'trapmf' if 'Trapezoidal' in mf_type_selected else 'trimf'
+    name = os.path.splitext(rules_filename)[0]
+    return os.path.join(LUT_DIR, f"{name}_{mf_tag}_{dtype}.lut")
+
+
+def rules_snapshot_path(path):
+    """Copia de las reglas con las que se construyó la tabla, para calcular el diff en update_lut."""
+    return path + '.rules.json'
+
+
+def _write_header(f, header):
+    f.seek(0)
+    f.write(json.dumps(header).encode('utf-8').ljust(HEADER_SIZE, b' '))
+
+
+def quantize(values, dtype):
+    """Convierte salidas crisp (NaN = sin activación) al tipo de almacenamiento de la tabla."""
+    scale = LUT_DTYPES[dtype]
+    if scale is None:
+        return values.astype(dtype)
+    sentinel = np.iinfo(dtype).max
+    quantized = np.round(np.nan_to_num(values, nan=0.0) * scale)
+    return np.where(np.isnan(values), sentinel, quantized).astype(dtype)
+
+
+def dequantize(stored, dtype):
+    """Inverso de quantize: devuelve salidas float64 con NaN donde ninguna regla se activó."""
+    scale = LUT_DTYPES[dtype]
+    if scale is None:
+        return stored.astype(float)
+    values = stored / scale
+    values[stored == np.iinfo(dtype).max] = np.nan
+    return values
+
+
+def _slab_rgb(r_values, g_values=X_COLOR, b_values=X_COLOR):
+    """Todas las combinaciones (R, G, B) para los valores dados, en orden C de la tabla."""
+    r, g, b = np.meshgrid(r_values, g_values, b_values, indexing='ij')
+    return np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1).astype(np.uint8)
+
+
+# --- Trabajadores del pool: cada proceso abre la tabla una sola vez ---
+_worker = {}
+
+
+def _init_worker(path, rules_filename, mf_type_selected, dtype):
+    _worker['table'] = np.memmap(path, dtype=dtype, mode='r+', offset=HEADER_SIZE,
+                                 shape=(LUT_SIZE, LUT_SIZE, LUT_SIZE))
+    _worker['args'] = (rules_filename, mf_type_selected, dtype)
+    # Compila el ruleset una vez por proceso (queda en la caché de fuzzy_numpy)
+    classify_batch(rules_filename, np.zeros((1, 3)), mf_type_selected)
+
+
+def _build_slab(r_start, r_stop):
+    rules_filename, mf_type_selected, dtype = _worker['args']
+    values = classify_batch(rules_filename, _slab_rgb(np.arange(r_start, r_stop)), mf_type_selected)
+    _worker['table'][r_start:r_stop] = quantize(values, dtype).reshape(r_stop - r_start, LUT_SIZE, LUT_SIZE)
+    _worker['table'].flush()
+    return r_stop - r_start
+
+
+def _update_box(r_start, r_stop, g_start, g_stop, b_start, b_stop):
+    rules_filename, mf_type_selected, dtype = _worker['args']
+    rgb = _slab_rgb(np.arange(r_start, r_stop), np.arange(g_start, g_stop), np.arange(b_start, b_stop))
+    values = classify_batch(rules_filename, rgb, mf_type_selected)
+    shape = (r_stop - r_start, g_stop - g_start, b_stop - b_start)
+    _worker['table'][r_start:r_stop, g_start:g_stop, b_start:b_stop] = quantize(values, dtype).reshape(shape)
+    _worker['table'].flush()
+    return int(np.prod(shape))
+
+
+def _run_tasks(worker_fn, tasks, init_args, workers):
+    """Ejecuta worker_fn(*tarea) para cada tarea en `workers` procesos (o en este, si workers == 1)."""
+    if workers == 1:
+        _init_worker(*init_args)
+        done = sum(worker_fn(*task) for task in tasks)
+        _worker.clear()
+        return done
+    with Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+        return sum(pool.starmap(worker_fn, tasks))
+
+
+def build_lut(rules_filename, mf_type_selected, dtype='float32', workers=None, slab=4, path=None):
+    """
+    Evalúa el ruleset sobre todo el cubo RGB 256³ y guarda la tabla en disco.
+
+    El cubo se reparte en bloques de `slab` valores de R entre `workers`
+    procesos (por defecto, todos los núcleos); cada proceso escribe su bloque
+    directamente en el archivo mapeado, sin devolver datos al padre.
+    """
+    if dtype not in LUT_DTYPES:
+        raise ValueError(f"Tipo de tabla no soportado: {dtype} (usa {', '.join(LUT_DTYPES)})")
+
+    path = path or lut_path(rules_filename, mf_type_selected, dtype)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    header = {
+        'magic': LUT_MAGIC,
+        'rules_filename': rules_filename,
+        'rules_sha256': rules_file_hash(rules_filename),
+        'mf_type': mf_type_selected,
+        'dtype': dtype,
+        'scale': LUT_DTYPES[dtype],
+        'shape': [LUT_SIZE, LUT_SIZE, LUT_SIZE],
+    }
+
+    # Se escribe en un archivo temporal y se renombra al final: un lector nunca
+    # ve una tabla a medio construir
+    rules_data = read_rules_json(rules_filename)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        _write_header(f, header)
+        f.truncate(HEADER_SIZE + LUT_SIZE ** 3 * np.dtype(dtype).itemsize)
+
+    start = time.perf_counter()
+    tasks = [(r, min(r + slab, LUT_SIZE)) for r in range(0, LUT_SIZE, slab)]
+    workers = workers or os.cpu_count() or 1
+    _run_tasks(_build_slab, tasks, (tmp_path, rules_filename, mf_type_selected, dtype), workers)
+
+    os.replace(tmp_path, path)
+    with open(rules_snapshot_path(path), 'w') as f:
+        json.dump(rules_data, f)
+    print(f"Tabla {os.path.basename(path)} construida en {time.perf_counter() - start:.1f} s "
+          f"con {workers} proceso(s)")
+    return path
+
+
+# --- ACTUALIZACIÓN INCREMENTAL ---
+# Con KEY_POINTS cada término de entrada solo es no nulo en un intervalo de
+# cada canal, así que una regla solo influye dentro de una caja del cubo RGB
+# (el producto de los soportes de sus tres términos). Fuera de las cajas de
+# las reglas que cambiaron, la salida de la tabla no cambia.
+
+def rule_key(rule):
+    """Identidad de una regla: (Rojo, Verde, Azul, OUTPUT). El orden y las repeticiones no cambian la salida."""
+    return tuple(rule.get(var) for var in INPUT_VARIABLES + ['OUTPUT'])
+
+
+def diff_rules(old_rules, new_rules):
+    """(eliminadas, añadidas): listas ordenadas de rule_key entre dos versiones de un archivo de reglas."""
+    old_keys = {rule_key(rule) for rule in old_rules}
+    new_keys = {rule_key(rule) for rule in new_rules}
+    return sorted(old_keys - new_keys, key=str), sorted(new_keys - old_keys, key=str)
+
+
+def _is_valid(key):
+    """Mismo criterio que CompiledRuleset: términos en KEY_POINTS y salida en OUTPUT_LABELS."""
+    return all(term in KEY_POINTS for term in key[:3]) and key[3] in OUTPUT_LABELS
+
+
+def term_support(mf_type_selected, term):
+    """Intervalo [inicio, fin) de valores enteros del canal donde el término es no nulo."""
+    nonzero = np.flatnonzero(create_mf(mf_type_selected, KEY_POINTS[term], X_COLOR) > 0)
+    return int(nonzero[0]), int(nonzero[-1]) + 1
+
+
+def changed_boxes(mf_type_selected, keys):
+    """
+    Cajas disjuntas (r0, r1, g0, g1, b0, b1) que cubren el soporte de las reglas `keys`.
+
+    Los extremos de los soportes de todos los términos parten cada canal en
+    intervalos elementales; cada regla cubre un producto de ellos, así que la
+    unión de sus cajas se expresa sin solapes como un conjunto de cajas
+    elementales y ningún vóxel se recalcula dos veces.
+    """
+    supports = {term: term_support(mf_type_selected, term) for term in KEY_POINTS}
+    edges = sorted({0, LUT_SIZE} | {v for support in supports.values() for v in support})
+    cells = set()
+    for key in keys:
+        ranges = []
+        for term in key[:3]:
+            start, stop = supports[term]
+            ranges.append([i for i in range(len(edges) - 1) if edges[i] >= start and edges[i + 1] <= stop])
+        cells.update((i, j, k) for i in ranges[0] for j in ranges[1] for k in ranges[2])
+    return [(edges[i], edges[i + 1], edges[j], edges[j + 1], edges[k], edges[k + 1])
+            for i, j, k in sorted(cells)]
+
+
+def update_lut(rules_filename, mf_type_selected, dtype='float32', workers=None, slab=4, path=None):
+    """
+    Pone al día una tabla existente recalculando solo las cajas de las reglas que cambiaron.
+
+    El diff se hace entre la copia de reglas guardada al construir la tabla
+    (rules_snapshot_path) y el archivo actual. Como build_lut, trabaja sobre
+    una copia temporal que se renombra al terminar. Si no hay tabla o copia de
+    reglas, o el archivo nuevo no tiene reglas válidas (y entra la regla de
+    emergencia de fuzzy_numpy), la tabla se construye entera. Devuelve el
+    número de vóxeles recalculados.
+    """
+    path = path or lut_path(rules_filename, mf_type_selected, dtype)
+    snapshot = rules_snapshot_path(path)
+    new_rules = read_rules_json(rules_filename)
+    new_valid = [rule for rule in new_rules if _is_valid(rule_key(rule))]
+    if not (os.path.exists(path) and os.path.exists(snapshot)) or not new_valid:
+        build_lut(rules_filename, mf_type_selected, dtype, workers, slab, path)
+        return LUT_SIZE ** 3
+
+    with open(snapshot) as f:
+        old_rules = json.load(f)
+    if not any(_is_valid(rule_key(rule)) for rule in old_rules):
+        build_lut(rules_filename, mf_type_selected, dtype, workers, slab, path)
+        return LUT_SIZE ** 3
+
+    removed, added = diff_rules(old_rules, new_rules)
+    boxes = changed_boxes(mf_type_selected, [key for key in removed + added if _is_valid(key)])
+    with open(path, 'rb') as f:
+        header = json.loads(f.read(HEADER_SIZE).decode('utf-8'))
+    header['rules_sha256'] = rules_file_hash(rules_filename)
+
+    start = time.perf_counter()
+    tmp_path = path + '.tmp'
+    shutil.copyfile(path, tmp_path)
+    with open(tmp_path, 'r+b') as f:
+        _write_header(f, header)
+
+    tasks = [(r, min(r + slab, r1), g0, g1, b0, b1)
+             for r0, r1, g0, g1, b0, b1 in boxes for r in range(r0, r1, slab)]
+    workers = min(workers or os.cpu_count() or 1, max(1, len(tasks)))
+    voxels = _run_tasks(_update_box, tasks, (tmp_path, rules_filename, mf_type_selected, dtype), workers) if tasks else 0
+
+    os.replace(tmp_path, path)
+    with open(snapshot, 'w') as f:
+        json.dump(new_rules, f)
+    print(f"Tabla {os.path.basename(path)}: {len(removed)} regla(s) eliminada(s), {len(added)} añadida(s); "
+          f"{voxels} vóxeles ({voxels / LUT_SIZE ** 3:.1%}) recalculados en {time.perf_counter() - start:.1f} s")
+    return voxels
+
+
+class ColorLUT:
+    """Tabla 256³ de salidas mapeada en memoria (compartida entre procesos vía page cache)."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.header = json.loads(f.read(HEADER_SIZE).decode('utf-8'))
+        if self.header.get('magic') != LUT_MAGIC:
+            raise ValueError(f"{path} no es una tabla de clasificación fuzzy")
+        self.path = path
+        self.dtype = self.header['dtype']
+        self.table = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER_SIZE,
+                               shape=tuple(self.header['shape']))
+
+    def is_stale(self):
+        """True si el archivo de reglas cambió desde que se construyó la tabla."""
+        return rules_file_hash(self.header['rules_filename']) != self.header['rules_sha256']
+
+    def lookup_raw(self, rgb):
+        """Valores tal como están guardados para entradas enteras (N, 3) en 0–255."""
+        rgb = np.asarray(rgb)
+        if rgb.dtype != np.uint8:
+            if not np.array_equal(rgb, np.round(rgb)) or rgb.min() < 0 or rgb.max() > 255:
+                raise ValueError("La tabla solo admite entradas enteras entre 0 y 255")
+            rgb = rgb.astype(np.uint8)
+        rgb = rgb.reshape(-1, 3)
+        return self.table[rgb[:, 0], rgb[:, 1], rgb[:, 2]]
+
+    def lookup(self, rgb):
+        """Salidas crisp (N,) para entradas enteras (N, 3); NaN donde ninguna regla se activa."""
+        return dequantize(self.lookup_raw(rgb), self.dtype)
+
+
+def load_lut(rules_filename, mf_type_selected, dtype='float32', build=True, workers=None):
+    """
+    Abre la tabla del ruleset; si no existe la construye y si quedó
+    desactualizada la pone al día con update_lut (build=True), o devuelve None.
+    """
+    path = lut_path(rules_filename, mf_type_selected, dtype)
+    if os.path.exists(path):
+        lut = ColorLUT(path)
+        if not lut.is_stale():
+            return lut
+        print(f"⚠️ La tabla {os.path.basename(path)} no corresponde a la versión actual de {rules_filename}")
+
+    if not build:
+        return None
+    if os.path.exists(path):
+        update_lut(rules_filename, mf_type_selected, dtype, workers=workers)
+        return ColorLUT(path)
+    return ColorLUT(build_lut(rules_filename, mf_type_selected, dtype, workers=workers))
+
+
+def verify_lut(lut, samples=100000, seed=0):
+    """
+    Compara la tabla con el motor en vivo sobre muestras aleatorias del cubo.
+    Devuelve el número de entradas cuyo valor guardado difiere del que produce el motor.
+    """
+    rgb = np.random.default_rng(seed).integers(0, LUT_SIZE, (samples, 3), dtype=np.uint8)
+    expected = quantize(classify_batch(lut.header['rules_filename'], rgb, lut.header['mf_type']), lut.dtype)
+    stored = lut.lookup_raw(rgb)
+    if lut.dtype.startswith('float'):
+        differ = ~((stored == expected) | (np.isnan(stored) & np.isnan(expected)))
+    else:
+        differ = stored != expected
+    return int(differ.sum())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Construye la tabla 256³ de un set de reglas.")
+    parser.add_argument('rules', help="Archivo de reglas en rules_data (p. ej. rules_100.json)")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--dtype', choices=list(LUT_DTYPES), default='float32', help="Tipo de salida")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument('--verify', type=int, default=100000, help="Muestras para comparar con el motor (0 = no)")
+    parser.add_argument('--update', action='store_true',
+                        help="Recalcular solo las cajas de las reglas que cambiaron desde la última construcción")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    if args.update:
+        update_lut(args.rules, mf_type, args.dtype, workers=args.workers)
+        lut = ColorLUT(lut_path(args.rules, mf_type, args.dtype))
+    else:
+        lut = ColorLUT(build_lut(args.rules, mf_type, args.dtype, workers=args.workers))
+    if args.verify:
+        print(f"Diferencias con el motor en {args.verify} muestras: {verify_lut(lut, args.verify)}")
@@ -0,0 +1,167 @@
+import bisect
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+# Activadas por defecto; FUZZY_METRICS=0 las desactiva desde el arranque y
+# set_enabled() las cambia en caliente. Desactivadas, cada punto medido cuesta
+# solo la comprobación de un booleano.
+_enabled = os.environ.get('FUZZY_METRICS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# Límites superiores de las cubetas en µs: potencias de 2 desde 1 µs hasta ~67 s
+BUCKET_BOUNDS_US = [2 ** i for i in range(27)]
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def set_enabled(enabled):
+    """Activa o desactiva la toma de tiempos en todo el proceso."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    return _enabled
+
+
+class StageHistogram:
+    """Histograma logarítmico de duraciones de una etapa: cuenta, suma, mínimo, máximo y cubetas."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_US) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_US, seconds * 1e6)] += 1
+
+    def quantile(self, q):
+        """Cuantil aproximado (s): límite superior de la cubeta que lo contiene, acotado por el máximo."""
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                bound = BUCKET_BOUNDS_US[i] * 1e-6 if i < len(BUCKET_BOUNDS_US) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        ms = 1e3
+        return {
+            'count': self.count,
+            'total_ms': self.total * ms,
+            'mean_ms': self.total / self.count * ms if self.count else 0.0,
+            'min_ms': self.min * ms if self.count else 0.0,
+            'max_ms': self.max * ms,
+            'p50_ms': self.quantile(0.5) * ms,
+            'p95_ms': self.quantile(0.95) * ms,
+            'p99_ms': self.quantile(0.99) * ms,
+            'buckets_us': {f"<={bound}": n for bound, n in zip(BUCKET_BOUNDS_US, self.buckets) if n},
+        }
+
+
+def record(stage, seconds):
+    """Añade una duración (s) al histograma de la etapa."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = StageHistogram()
+        histogram.add(seconds)
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage):
+    """Context manager que mide el bloque como `stage` (no hace nada si las métricas están desactivadas)."""
+    return _Timer(stage) if _enabled else _NULL_TIMER
+
+
+def instrument(stage):
+    """Decorador que mide cada llamada a la función como `stage`."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """{etapa: estadísticas} de todas las etapas medidas, ordenadas por nombre."""
+    with _lock:
+        return {stage: _histograms[stage].to_dict() for stage in sorted(_histograms)}
+
+
+def reset():
+    """Borra todos los histogramas."""
+    with _lock:
+        _histograms.clear()
+
+
+def dump_json(path=None):
+    """Devuelve el snapshot como JSON y, si se indica `path`, lo guarda en ese archivo."""
+    text = json.dumps({'enabled': _enabled, 'stages': snapshot()}, indent=2)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+
+def format_table(stats=None):
+    """Tabla de texto con cuenta, media, p50, p95, p99 y máximo (ms) por etapa."""
+    stats = snapshot() if stats is None else stats
+    if not stats:
+        return "(sin mediciones)"
+    width = max(len(stage) for stage in stats)
+    lines = [f"{'etapa':<{width}}  {'n':>7}  {'media':>9}  {'p50':>9}  {'p95':>9}  {'p99':>9}  {'máx':>9}"]
+    for stage, s in stats.items():
+        lines.append(f"{stage:<{width}}  {s['count']:>7}  {s['mean_ms']:>9.3f}  {s['p50_ms']:>9.3f}  "
+                     f"{s['p95_ms']:>9.3f}  {s['p99_ms']:>9.3f}  {s['max_ms']:>9.3f}")
+    return "\n".join(lines)
+
+
+def print_table(stats=None):
+    print(format_table(stats))
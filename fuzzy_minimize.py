@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from fuzzy_lut import term_support
+from fuzzy_numpy import (
+    BATCH_CHUNK_SIZE, INPUT_VARIABLES, KEY_POINTS, MF_TYPES, OUTPUT_LABELS, X_COLOR, CompiledRuleset,
+    input_mf_points
+)
+from rules_loader import REPORT_SUFFIX, RULES_DIR, read_rules_json
+
+
+def sample_grid(step=16):
+    """
+    Muestra (M, 3) del cubo RGB: una malla de paso `step` por canal más los
+    vértices de las MF de entrada y los bordes de sus soportes, que es donde
+    la salida cambia de forma.
+    """
+    values = set(range(0, len(X_COLOR), step)) | {int(X_COLOR[-1])}
+    for mf_type in MF_TYPES:
+        for term, points in KEY_POINTS.items():
+            values.update(int(round(v)) for v in input_mf_points(mf_type, points))
+            start, stop = term_support(mf_type, term)
+            values.update((start - 1, start, stop - 1, stop))
+    axis = np.array(sorted(v for v in values if X_COLOR[0] <= v <= X_COLOR[-1]), dtype=float)
+    return np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+def evaluate(rules_data, mf_type_selected, rgb, chunk_size=BATCH_CHUNK_SIZE):
+    """Salidas crisp (N,) de una lista de reglas sin pasar por un archivo (NaN si ninguna regla se activa)."""
+    compiled = CompiledRuleset('<minimize>', mf_type_selected, rules_data)
+    values = np.empty(rgb.shape[0])
+    for start in range(0, rgb.shape[0], chunk_size):
+        values[start:start + chunk_size] = compiled.evaluate_active(rgb[start:start + chunk_size])[0]
+    return values
+
+
+def output_error(values, reference):
+    """
+    Diferencia absoluta (N,) con la salida de referencia y máscara (N,) de los
+    colores que dejan de activar alguna regla (error 0 en esos colores).
+    """
+    uncovered = np.isnan(values) & ~np.isnan(reference)
+    diff = np.where(np.isnan(values) | np.isnan(reference), 0.0, np.abs(values - reference))
+    return diff, uncovered
+
+
+def rule_box(mf_types, rule):
+    """Caja [inicio, fin) por canal donde la regla puede activarse, unión de los soportes de todos los tipos de MF."""
+    box = []
+    for var in INPUT_VARIABLES:
+        supports = [term_support(mf_type, rule[var]) for mf_type in mf_types]
+        box.append((min(s[0] for s in supports), max(s[1] for s in supports)))
+    return box
+
+
+def _boxes_overlap(a, b):
+    return all(a_start < b_stop and b_start < a_stop for (a_start, a_stop), (b_start, b_stop) in zip(a, b))
+
+
+def minimize_rules(rules_data, mf_types=MF_TYPES, tolerance=0.5, rgb=None, max_uncovered=0.0, verbose=False):
+    """
+    Quita reglas de forma voraz mientras la salida crisp no cambie más de `tolerance`.
+
+    En cada paso se prueba a quitar cada regla restante y se elimina la que
+    menos cambia la salida respecto al ruleset original (no al del paso
+    anterior, así el error no se acumula), midiendo sobre `rgb` (sample_grid
+    por defecto) con todos los tipos de MF de `mf_types`. Una regla solo se
+    activa dentro de la caja de sus soportes, así que su error se mide solo
+    con las muestras de esa caja y se reutiliza mientras no se quite una regla
+    cuya caja la solape. Las reglas no válidas (etiquetas desconocidas) se
+    descartan.
+
+    Cada regla es la única activa en su propio vértice (y cerca de los bordes
+    de su soporte), así que quitarla deja colores sin ninguna regla activa.
+    `max_uncovered` es la fracción de muestras que puede quedar así (0 por
+    defecto: ninguna); esos colores no cuentan para `tolerance` y se informan
+    aparte.
+
+    Devuelve (reglas restantes, [(regla quitada, error, fracción sin cobertura)]
+    en orden de eliminación).
+    """
+    rgb = sample_grid() if rgb is None else np.asarray(rgb, dtype=float)
+    rules = [r for r in rules_data
+             if all(r.get(var) in KEY_POINTS for var in INPUT_VARIABLES) and r.get('OUTPUT') in OUTPUT_LABELS]
+    references = {mf_type: evaluate(rules, mf_type, rgb) for mf_type in mf_types}
+
+    boxes = [rule_box(mf_types, rule) for rule in rules]
+    inside = [np.all([(rgb[:, c] >= start) & (rgb[:, c] < stop) for c, (start, stop) in enumerate(box)], axis=0)
+              for box in boxes]
+
+    # Colores sin cobertura del ruleset actual; cada candidato guarda los de su caja
+    uncovered = np.zeros(rgb.shape[0], dtype=bool)
+    budget = int(max_uncovered * rgb.shape[0])
+    keep, removed, candidates = list(range(len(rules))), [], {}
+    while len(keep) > 1:
+        for i in keep:
+            if i in candidates:
+                continue
+            remaining = [rules[j] for j in keep if j != i]
+            points = rgb[inside[i]]
+            error, lost = 0.0, np.zeros(points.shape[0], dtype=bool)
+            for mf_type, reference in references.items():
+                diff, mf_lost = output_error(evaluate(remaining, mf_type, points), reference[inside[i]])
+                error, lost = max(error, diff.max(initial=0.0)), lost | mf_lost
+            candidates[i] = (error, lost)
+
+        total_uncovered = int(uncovered.sum())
+        allowed = [i for i in keep if candidates[i][0] <= tolerance
+                   and total_uncovered - uncovered[inside[i]].sum() + candidates[i][1].sum() <= budget]
+        if not allowed:
+            break
+        best = min(allowed, key=lambda i: (candidates[i][0], candidates[i][1].sum()))
+        error, lost = candidates[best]
+        uncovered[inside[best]] = lost
+        keep.remove(best)
+        removed.append((rules[best], float(error), float(uncovered.mean())))
+        if verbose:
+            print(f"  - {rules[best]} (error {error:.4f}, sin cobertura {uncovered.mean():.2%}, quedan {len(keep)})")
+        # Solo cambia el resultado de las reglas cuya caja comparte muestras con la quitada
+        for i in keep:
+            if _boxes_overlap(boxes[i], boxes[best]):
+                candidates.pop(i, None)
+
+    return [rules[i] for i in keep], removed
+
+
+def error_report(rules_data, minimized, mf_types, rgb):
+    """
+    Error de la versión reducida frente a la original por tipo de MF: máximo,
+    media y p99 donde ambas tienen salida, colores que quedaron sin cobertura
+    y µs por muestra de cada versión.
+    """
+    report = {}
+    for mf_type in mf_types:
+        start = time.perf_counter()
+        reference = evaluate(rules_data, mf_type, rgb)
+        original_s = time.perf_counter() - start
+        start = time.perf_counter()
+        values = evaluate(minimized, mf_type, rgb)
+        minimized_s = time.perf_counter() - start
+
+        diff, uncovered = output_error(values, reference)
+        both = ~(np.isnan(values) | np.isnan(reference))
+        report[mf_type] = {
+            'max_abs_diff': float(diff.max(initial=0.0)),
+            'mean_abs_diff': float(diff[both].mean()) if both.any() else 0.0,
+            'p99_abs_diff': float(np.percentile(diff[both], 99)) if both.any() else 0.0,
+            'uncovered': int(uncovered.sum()),
+            'uncovered_fraction': float(uncovered.mean()),
+            'original_us': original_s / rgb.shape[0] * 1e6,
+            'minimized_us': minimized_s / rgb.shape[0] * 1e6,
+        }
+    return report
+
+
+def write_rules(rules, path):
+    """Guarda las reglas con el formato de rules_data (una regla por línea)."""
+    with open(path, 'w') as f:
+        f.write("[\n" + ",\n".join(f"  {json.dumps(rule, ensure_ascii=False)}" for rule in rules) + "\n]")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Reduce un archivo de reglas sin cambiar la salida más de una tolerancia.")
+    parser.add_argument('rules', help="Archivo de reglas en rules_data")
+    parser.add_argument('--out', default=None, help="Archivo de salida en rules_data (por defecto <nombre>_min.json)")
+    parser.add_argument('--report', default=None, help="Informe JSON (por defecto junto a la salida, <salida>_report.json)")
+    parser.add_argument('--mf', nargs='*', choices=['trimf', 'trapmf'], default=['trimf', 'trapmf'],
+                        help="Tipos de MF con los que debe mantenerse la salida")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Cambio máximo admitido en la salida crisp")
+    parser.add_argument('--max-uncovered', type=float, default=0.0,
+                        help="Fracción de muestras que puede quedar sin ninguna regla activa")
+    parser.add_argument('--step', type=int, default=16, help="Paso de la malla de muestreo por canal")
+    parser.add_argument('--verify-step', type=int, default=4,
+                        help="Paso de la malla más fina con la que se mide el informe final")
+    parser.add_argument('--verbose', action='store_true', help="Mostrar cada regla quitada")
+    args = parser.parse_args()
+
+    mf_types = [t for t in MF_TYPES if any(tag in t for tag in args.mf)]
+    rules_data = read_rules_json(args.rules)
+    if not rules_data:
+        raise SystemExit(1)
+
+    stem = os.path.splitext(args.rules)[0]
+    out = args.out or f"{stem}_min.json"
+    # Relativo a rules_data; una ruta absoluta se respeta tal cual (os.path.join)
+    out_path = os.path.join(RULES_DIR, out)
+    report_path = args.report or os.path.splitext(out_path)[0] + REPORT_SUFFIX
+
+    start = time.perf_counter()
+    rgb = sample_grid(args.step)
+    minimized, removed = minimize_rules(rules_data, mf_types, args.tolerance, rgb, args.max_uncovered, args.verbose)
+    elapsed = time.perf_counter() - start
+
+    write_rules(minimized, out_path)
+    verify_rgb = sample_grid(args.verify_step)
+    report = {
+        'rules_filename': args.rules,
+        'out': out,
+        'mf_types': mf_types,
+        'tolerance': args.tolerance,
+        'max_uncovered': args.max_uncovered,
+        'sample_step': args.step,
+        'samples': int(rgb.shape[0]),
+        'verify_step': args.verify_step,
+        'verify_samples': int(verify_rgb.shape[0]),
+        'rules_before': len(rules_data),
+        'rules_after': len(minimized),
+        'removed': [{'rule': rule, 'error': error, 'uncovered_fraction': lost} for rule, error, lost in removed],
+        'errors': error_report(rules_data, minimized, mf_types, verify_rgb),
+        'seconds': elapsed,
+    }
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"{args.rules}: {len(rules_data)} → {len(minimized)} reglas en {elapsed:.1f} s "
+          f"({rgb.shape[0]} muestras), guardado en {out_path}")
+    for mf_type, r in report['errors'].items():
+        print(f"  {mf_type:<21} máx {r['max_abs_diff']:.4f}  media {r['mean_abs_diff']:.4f}  "
+              f"p99 {r['p99_abs_diff']:.4f}  {r['original_us']:.2f} → {r['minimized_us']:.2f} µs/muestra"
+              + (f"  ⚠️ {r['uncovered_fraction']:.2%} sin cobertura" if r['uncovered'] else ""))
+    print(f"Informe en {report_path}")
@@ -0,0 +1,989 @@
+import os
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+
+import numpy as np
+from fuzzy_metrics import instrument, timed
+from rules_loader import read_rules_json, RULES_DIR
+
+
+# 1. Universos y Constantes
+X_COLOR = np.arange(0, 256, 1)
+X_OUTPUT = np.arange(0, 101, 1)
+
+KEY_POINTS = {
+    'Bajo': [0, 0, 85],
+    'MedioBajo': [0, 85, 170],
+    'MedioAlto': [85, 170, 255],
+    'Alto': [170, 255, 255],
+}
+
+MF_TYPES = ['Triangular (trimf)', 'Trapezoidal (trapmf)']
+LEVELS = list(KEY_POINTS.keys())
+COLORS_OUT = ['Rojo', 'Naranja', 'Amarillo', 'VerdeLima', 'Verde', 'Cian', 'Azul', 'Magenta']
+
+
+# DEFINICIÓN COMPLETA CON TODAS TUS ETIQUETAS DE SALIDA: (a, b, c) sobre X_OUTPUT
+OUTPUT_DEFINITIONS = {
+    # Tonos Oscuros/Bajos
+    'Negro': (0, 0, 5),
+    'AzulOscuro': (5, 10, 20),
+    'VerdeOscuro': (15, 20, 30),
+    'RojoOscuro': (25, 30, 40),
+    'NaranjaOscuro': (30, 35, 45),
+    'AmarilloOscuro': (35, 40, 50),
+    'CianOscuro': (40, 45, 55),
+    'MagentaOscuro': (45, 50, 60),
+
+    # Colores Base/Medios
+    'Azul': (50, 55, 65),
+    'Cian': (55, 60, 70),
+    'Verde': (60, 65, 75),
+    'Amarillo': (65, 70, 80),
+    'Naranja': (70, 75, 85),
+    'Rojo': (75, 80, 90),
+    'Magenta': (80, 85, 95),
+
+    # Tonos Claros/Brillantes
+    'AmarilloClaro': (70, 75, 85),
+    'NaranjaClaro': (75, 80, 90),
+    'CianClaro': (78, 83, 93),
+    'MagentaClaro': (82, 87, 97),
+    'Rosa': (70, 80, 90),
+    'BlancoApagado': (65, 75, 85),
+    'Blanco': (85, 90, 98),
+
+    'AzulBrillante': (85, 90, 95),
+    'CianBrillante': (88, 93, 98),
+    'VerdeBrillante': (88, 93, 98),
+    'AmarilloBrillante': (90, 95, 100),
+    'RojoBrillante': (90, 95, 100),
+    'MagentaBrillante': (92, 97, 100),
+    'BlancoBrillante': (95, 100, 100),
+
+    # Colores personalizados de tus reglas
+    'VerdeAzulado': (55, 65, 75),
+    'VerdeAzuladoBrillante': (75, 85, 95),
+    'Gris': (40, 50, 60),
+    'Lavanda': (65, 75, 85),
+    'AmarilloVerde': (60, 70, 80),
+    'AmarilloVerdeClaro': (70, 80, 90),
+    'RojoMagenta': (70, 80, 90),
+    'Salmon': (75, 85, 95),
+    'LavandaClaro': (75, 85, 95),
+    'RosaClaro': (80, 90, 100),
+    'RosaBrillante': (85, 95, 100),
+    'BlancoAzulado': (85, 92, 100),
+    'AmarilloVerdeBrillante': (85, 95, 100),
+    'BlancoVerde': (88, 95, 100),
+    'RojoMagentaBrillante': (90, 97, 100),
+    'Melon': (80, 90, 100),
+    'AmarilloClaroBrillante': (85, 95, 100),
+    'BlancoAmarillento': (90, 97, 100),
+    'BlancoPuro': (98, 100, 100),
+    'NaranjaBrillante': (85, 92, 100),  # <-- ESTA FALTABA
+}
+
+
+def input_mf_points(mf_type, points):
+    """Vértices [p1, p2, p3, p4] de la MF de entrada que genera create_mf (triángulo: p2 == p3)."""
+    a, b, c = points[0], points[1], points[2]
+
+    if 'Trapezoidal' in mf_type:
+        p1 = a
+        p2 = b - 20 if b > 20 else b
+        p3 = b + 20 if b < 235 else b
+        p4 = c
+
+        if p2 < p1: p2 = p1
+        if p3 > p4: p3 = p4
+
+        return [p1, p2, p3, p4]
+
+    return [a, b, b, c]
+
+
+def output_mf_points(mf_type_selected, a, b, c):
+    """Vértices [p1, p2, p3, p4] de una MF de salida (triángulo: p2 == p3)."""
+    if "Trapezoidal" in mf_type_selected:
+        p1, p2, p3, p4 = a, b - 5, b + 5, c
+        if p2 < p1: p2 = p1
+        if p3 > p4: p3 = p4
+        return [p1, p2, p3, p4]
+
+    return [a, b, b, c]
+
+
+def trapezoid_membership(x, points):
+    """
+    Grado de pertenencia exacto en x (escalar o arreglo) de la MF [p1, p2, p3, p4].
+
+    Forma cerrada, sin muestrear el universo: rampa de subida entre p1 y p2,
+    meseta hasta p3 y rampa de bajada hasta p4 (p2 == p3 es un triángulo). Un
+    borde vertical (p1 == p2 o p3 == p4) vale 1 justo en el vértice, igual que
+    fuzz.trimf / fuzz.trapmf.
+    """
+    p1, p2, p3, p4 = (float(p) for p in points)
+    x = np.asarray(x, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rise = (x - p1) / (p2 - p1) if p2 > p1 else np.where(x >= p1, 1.0, 0.0)
+        fall = (p4 - x) / (p4 - p3) if p4 > p3 else np.where(x <= p4, 1.0, 0.0)
+    mu = np.clip(np.minimum(rise, fall), 0.0, 1.0)
+    return float(mu) if mu.ndim == 0 else mu
+
+
+def input_membership(mf_type, level, x):
+    """
+    Grado de pertenencia de x (escalar o arreglo) al término de entrada `level`.
+
+    Usa los mismos hombros y recortes que create_mf y, como np.interp sobre la
+    MF muestreada, satura x a los extremos de X_COLOR.
+    """
+    x = np.clip(x, X_COLOR[0], X_COLOR[-1])
+    return trapezoid_membership(x, input_mf_points(mf_type, KEY_POINTS[level]))
+
+
+def output_membership(mf_type_selected, label, x):
+    """Grado de pertenencia de x (escalar o arreglo) a la etiqueta de salida `label`, saturando a X_OUTPUT."""
+    x = np.clip(x, X_OUTPUT[0], X_OUTPUT[-1])
+    return trapezoid_membership(x, output_mf_points(mf_type_selected, *OUTPUT_DEFINITIONS[label]))
+
+
+@instrument('mf/create_mf')
+def create_mf(mf_type, points, universe):
+    """Crea una función de pertenencia según el tipo y los puntos dados."""
+    return trapezoid_membership(universe, input_mf_points(mf_type, points))
+
+
+@instrument('mf/output_functions')
+def get_output_functions(mf_type_selected="Triangular (trimf)", universe=X_OUTPUT):
+    """Genera las funciones de salida (consequents) para todos los colores del sistema RGB difuso."""
+    output_funcs = {}
+    for color_name, (a, b, c) in OUTPUT_DEFINITIONS.items():
+        output_funcs[color_name] = trapezoid_membership(universe, output_mf_points(mf_type_selected, a, b, c))
+
+    return output_funcs
+
+
+# --- PERFILES DE RESOLUCIÓN DE LOS UNIVERSOS ---
+# (paso de X_COLOR, paso de X_OUTPUT). El coste de skfuzzy, de las gráficas y
+# del centroide del motor NumPy crece con el número de puntos de los universos.
+# 'default' son exactamente X_COLOR y X_OUTPUT.
+RESOLUTION_PROFILES = {
+    'coarse': (15, 10),
+    'default': (1, 1),
+    'fine': (0.5, 0.25),
+    'reference': (0.1, 0.05),
+}
+DEFAULT_RESOLUTION = 'default'
+
+
+def _grid(lo, hi, step, vertices):
+    """Malla uniforme de paso `step` entre lo y hi, más los vértices de las MF que caen dentro."""
+    uniform = np.linspace(lo, hi, int(round((hi - lo) / step)) + 1)
+    vertices = np.asarray(vertices, dtype=float)
+    return np.union1d(uniform, vertices[(vertices >= lo) & (vertices <= hi)])
+
+
+def universes(mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """
+    (universo de entrada, universo de salida) para un perfil de RESOLUTION_PROFILES.
+
+    Cada universo incluye todos los vértices de sus MF: así ninguna esquina cae
+    entre dos muestras y la MF interpolada sigue siendo un triángulo o
+    trapecio aunque la malla sea gruesa.
+    """
+    if resolution not in RESOLUTION_PROFILES:
+        raise ValueError(f"Perfil de resolución desconocido: {resolution} "
+                         f"(usa {', '.join(RESOLUTION_PROFILES)})")
+    if resolution == 'default':
+        return X_COLOR, X_OUTPUT
+
+    color_step, output_step = RESOLUTION_PROFILES[resolution]
+    input_vertices = [v for points in KEY_POINTS.values() for v in input_mf_points(mf_type_selected, points)]
+    output_vertices = [v for abc in OUTPUT_DEFINITIONS.values() for v in output_mf_points(mf_type_selected, *abc)]
+    return (_grid(X_COLOR[0], X_COLOR[-1], color_step, input_vertices),
+            _grid(X_OUTPUT[0], X_OUTPUT[-1], output_step, output_vertices))
+
+
+# --- CACHÉ DE SISTEMAS COMPILADOS ---
+# Construir un sistema (el ControlSystem de skfuzzy, con sus antecedentes, ~50
+# MF de salida y el grafo de reglas, o el CompiledRuleset del motor NumPy)
+# cuesta mucho más que ejecutar la inferencia, así que se guarda uno por
+# (motor, archivo de reglas, tipo de MF, resolución). La entrada se invalida
+# sola cuando cambia la fecha de modificación del archivo y se descartan las
+# menos usadas (LRU).
+SYSTEM_CACHE_SIZE = 8
+_system_cache = OrderedDict()
+_system_cache_lock = threading.Lock()
+
+
+def _rules_file_mtime(rules_filename):
+    """Fecha de modificación (ns) del archivo de reglas, o None si no existe."""
+    try:
+        return os.stat(os.path.join(RULES_DIR, rules_filename)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _cached_build(engine, rules_filename, mf_type_selected, builder, resolution=DEFAULT_RESOLUTION):
+    """Devuelve el objeto compilado por `builder` para (motor, archivo, tipo de MF, resolución), usando la caché LRU."""
+    key = (engine, rules_filename, mf_type_selected, resolution)
+    mtime = _rules_file_mtime(rules_filename)
+
+    with _system_cache_lock:
+        entry = _system_cache.get(key)
+        if entry is not None and entry[0] == mtime:
+            _system_cache.move_to_end(key)
+            return entry[1]
+
+    # Se construye fuera del lock global para no bloquear a otros rulesets
+    compiled = builder(rules_filename, mf_type_selected, resolution)
+
+    with _system_cache_lock:
+        _system_cache[key] = (mtime, compiled)
+        _system_cache.move_to_end(key)
+        while len(_system_cache) > SYSTEM_CACHE_SIZE:
+            _system_cache.popitem(last=False)
+
+    return compiled
+
+
+def clear_system_cache():
+    """Vacía la caché de sistemas compilados."""
+    with _system_cache_lock:
+        _system_cache.clear()
+
+
+# --- MOTOR NUMPY: MAMDANI VECTORIZADO SIN skfuzzy.control ---
+# Mismo sistema que fuzzy_core.create_system_from_json (AND = min,
+# implicación = min, agregación = max, centroide), pero compilado a arreglos
+# densos.
+ENGINES = ['skfuzzy', 'numpy']
+INPUT_VARIABLES = ['Rojo', 'Verde', 'Azul']
+OUTPUT_LABELS = list(OUTPUT_DEFINITIONS.keys())
+
+
+class CompiledRuleset:
+    """
+    Reglas de un archivo JSON compiladas a arreglos para el motor NumPy.
+
+    - rule_terms: (n_reglas, 3) índice en LEVELS del término de Rojo, Verde y Azul.
+    - rule_outputs: (n_reglas,) índice en OUTPUT_LABELS del consecuente.
+    - rule_is_or: (n_reglas,) True si el antecedente une los términos con OR.
+    - x_color, x_output: universos del perfil de resolución (X_COLOR y X_OUTPUT por defecto).
+    - input_mf: (len(LEVELS), len(x_color)) MF de entrada muestreadas.
+    - input_points: (len(LEVELS), 4) vértices de cada MF de entrada muestreada.
+    - output_mf: (len(OUTPUT_LABELS), len(x_output)) MF de salida muestreadas.
+    - output_points: (len(OUTPUT_LABELS), 4) vértices de cada MF de salida muestreada.
+    - rule_constants: {método: (n_reglas + 1,)} consecuente Sugeno de cada regla
+      (SUGENO_CONSTANTS), con 0 para la regla ficticia de active_rules.
+
+    Una vez construido es inmutable: los arreglos son de solo lectura, las
+    reglas una tupla y no se pueden asignar atributos. Todo el estado de una
+    evaluación vive en la pila de la llamada, así que una misma instancia (la
+    de la caché de compile_ruleset) se comparte entre hilos sin locks.
+    """
+
+    @instrument('numpy/compile')
+    def __init__(self, rules_filename, mf_type_selected, rules_data, resolution=DEFAULT_RESOLUTION):
+        self.rules_filename = rules_filename
+        self.mf_type = mf_type_selected
+        self.resolution = resolution
+        # Copias: con el perfil por defecto universes() devuelve X_COLOR y X_OUTPUT,
+        # y el paso 6 congela los arreglos de la instancia, no los globales del módulo
+        self.x_color, self.x_output = (u.copy() for u in universes(mf_type_selected, resolution))
+
+        # 1. Reglas válidas (mismo criterio que rules_loader.build_rules)
+        rules, rule_terms, rule_outputs = [], [], []
+        for rule_data in rules_data:
+            try:
+                terms = [LEVELS.index(rule_data[var]) for var in INPUT_VARIABLES]
+                output = OUTPUT_LABELS.index(rule_data['OUTPUT'])
+            except (KeyError, ValueError) as e:
+                print(f"⚠️ Error en clave de regla: {e} en la regla {rule_data}")
+                continue
+            rules.append(rule_data)
+            rule_terms.append(terms)
+            rule_outputs.append(output)
+
+        rule_is_or = [False] * len(rules)
+        if not rules:
+            # Regla de emergencia si no hay reglas válidas (igual que en skfuzzy)
+            rules = [{'Rojo': 'Bajo', 'Verde': 'Bajo', 'Azul': 'Bajo', 'OUTPUT': 'Azul'}]
+            rule_terms = [[LEVELS.index('Bajo')] * 3]
+            rule_outputs = [OUTPUT_LABELS.index('Azul')]
+            rule_is_or = [True]
+
+        self.rules = rules
+        self.rule_terms = np.array(rule_terms, dtype=np.intp)
+        self.rule_outputs = np.array(rule_outputs, dtype=np.intp)
+        self.rule_is_or = np.array(rule_is_or, dtype=bool)
+
+        # 2. Funciones de pertenencia de entrada y salida
+        self.input_mf = np.array([create_mf(mf_type_selected, KEY_POINTS[name], self.x_color)
+                                  for name in LEVELS], dtype=float)
+        self.input_points = np.array([_sampled_points(mf, self.x_color) for mf in self.input_mf])
+        output_funcs = get_output_functions(mf_type_selected, self.x_output)
+        self.output_mf = np.array([output_funcs[label] for label in OUTPUT_LABELS], dtype=float)
+        self.output_points = np.array([_sampled_points(mf, self.x_output) for mf in self.output_mf])
+        self.exact_points = np.array([_exact_points(output_mf_points(mf_type_selected, *OUTPUT_DEFINITIONS[label]))
+                                      for label in OUTPUT_LABELS])
+
+        # 3. Agrupar reglas por consecuente: el corte de cada término de salida
+        # es el máximo de las activaciones de sus reglas (np.maximum.reduceat)
+        self.rule_order = np.argsort(self.rule_outputs, kind='stable')
+        sorted_outputs = self.rule_outputs[self.rule_order]
+        self.group_starts = np.flatnonzero(np.r_[True, sorted_outputs[1:] != sorted_outputs[:-1]])
+        self.group_terms = sorted_outputs[self.group_starts]
+
+        # Como mucho se activan a la vez tantos consecuentes como combinaciones
+        # de términos de entrada no nulos (2 por variable con KEY_POINTS)
+        nonzero = self.input_mf > 0
+        max_terms = int((nonzero[:, :-1] | nonzero[:, 1:]).sum(axis=0).max())
+        self.max_active = int(min(len(self.group_terms), max_terms ** len(INPUT_VARIABLES)))
+        self.terms_per_input = max_terms
+
+        # 4. Índice de reglas activas: celda (Rojo, Verde, Azul) -> ids de regla.
+        # Cada celda sin regla (o los huecos hasta la celda con más reglas) se
+        # rellena con la regla ficticia n_reglas, de activación siempre 0
+        n_rules, n_levels = len(self.rules), len(LEVELS)
+        cells = (self.rule_terms * [n_levels ** 2, n_levels, 1]).sum(axis=1)
+        counts = np.bincount(cells, minlength=n_levels ** 3)
+        self.cell_rules = np.full((n_levels ** 3, max(1, counts.max())), n_rules, dtype=np.intp)
+        for cell in np.unique(cells):
+            ids = np.flatnonzero(cells == cell)
+            self.cell_rules[cell, :len(ids)] = ids
+        self.rule_groups = np.r_[np.searchsorted(self.group_terms, self.rule_outputs), -1]
+        self.rule_points = np.vstack([self.output_points[self.rule_outputs], [[0.0, 1.0, 1.0, 2.0]]])
+
+        # El mismo índice en tuplas de Python para evaluate_point: con un solo
+        # color, recorrer 8 celdas en Python cuesta menos que las llamadas NumPy
+        self.has_or = bool(self.rule_is_or.any())
+        self.point_inputs = tuple(tuple(float(p) for p in points) for points in self.input_points)
+        self.point_cells = tuple(tuple(int(i) for i in row if i < n_rules) for row in self.cell_rules)
+        self.point_groups = tuple(int(g) for g in self.rule_groups[:-1])
+        group_points = self.output_points[self.group_terms]
+        self.point_outputs = tuple(tuple(float(p) for p in points) for points in group_points)
+        self.point_shapes = np.column_stack([group_points, 1.0 / (group_points[:, 1] - group_points[:, 0]),
+                                             1.0 / (group_points[:, 3] - group_points[:, 2])])
+
+        # 5. Consecuentes constantes para el modo Sugeno de orden cero
+        self.rule_constants = {method: np.r_[sugeno_constants(mf_type_selected, method)[self.rule_outputs], 0.0]
+                               for method in SUGENO_CONSTANTS}
+
+        # 6. Congelar: arreglos de solo lectura y sin más asignaciones
+        for value in list(vars(self).values()) + list(self.rule_constants.values()):
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+        self.rules = tuple(self.rules)
+        self.rule_constants = MappingProxyType(self.rule_constants)
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"CompiledRuleset es inmutable: no se puede asignar '{name}'")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"CompiledRuleset es inmutable: no se puede borrar '{name}'")
+
+    def fuzzify(self, rgb):
+        """
+        Grados de pertenencia (N, 3, len(LEVELS)) para entradas (N, 3), en una sola
+        operación con broadcasting contra los vértices de KEY_POINTS.
+        """
+        x = np.clip(np.asarray(rgb, dtype=float), self.x_color[0], self.x_color[-1])[..., None]
+        p1, p2, p3, p4 = self.input_points.T
+        return _trapezoid(x, p1, p2, p3, p4)
+
+    def rule_strengths(self, rgb):
+        """Activación (N, n_reglas) de cada regla para entradas (N, 3)."""
+        mu = self.fuzzify(rgb)
+        r = mu[:, 0, self.rule_terms[:, 0]]
+        g = mu[:, 1, self.rule_terms[:, 1]]
+        b = mu[:, 2, self.rule_terms[:, 2]]
+        strengths = np.minimum(np.minimum(r, g), b)
+        if self.rule_is_or.any():
+            strengths = np.where(self.rule_is_or, np.maximum(np.maximum(r, g), b), strengths)
+        return strengths
+
+    def output_cuts(self, strengths):
+        """Corte (N, n_grupos) de cada término de salida usado, alineado con group_terms."""
+        return np.maximum.reduceat(strengths[:, self.rule_order], self.group_starts, axis=1)
+
+    def defuzzify(self, cuts):
+        """
+        Centroide del conjunto agregado para cortes (N, n_grupos); NaN si nada se activa.
+
+        Igual que skfuzzy, el universo de salida se completa con los puntos donde
+        cada MF cruza su nivel de corte, de modo que el agregado es lineal entre
+        puntos consecutivos y el centroide de cada tramo es exacto.
+        """
+        n = cuts.shape[0]
+        points = self.output_points[self.group_terms]
+        if self.max_active < cuts.shape[1]:
+            # Solo los términos con corte > 0 aportan al agregado
+            top = np.argpartition(-cuts, self.max_active - 1, axis=1)[:, :self.max_active]
+            cuts = np.take_along_axis(cuts, top, axis=1)
+            points = points[top]
+        else:
+            points = np.broadcast_to(points, (n,) + points.shape)
+        return self.defuzzify_terms(cuts, points)
+
+    def defuzzify_terms(self, cuts, points):
+        """
+        Centroide de max_k min(cuts[:, k], MF_k) con cuts (N, K) y vértices points (N, K, 4).
+
+        Los K términos no necesitan ser distintos: dos reglas con el mismo
+        consecuente dan el mismo agregado que su corte máximo.
+        """
+        n = cuts.shape[0]
+        p1, p2, p3, p4 = (points[..., i] for i in range(4))
+        x_output = self.x_output
+        left = np.clip(p1 + cuts * (p2 - p1), x_output[0], x_output[-1])
+        right = np.clip(p4 - cuts * (p4 - p3), x_output[0], x_output[-1])
+        xs = np.sort(np.concatenate(
+            [np.broadcast_to(x_output.astype(float), (n, len(x_output))), left, right], axis=1
+        ), axis=1)
+
+        # Agregado = max_k min(corte_k, MF_k), término a término sobre arreglos
+        # (N, puntos) contiguos y en sitio; como corte <= 1 basta con partir de 0
+        inv_rise = 1.0 / (p2 - p1)
+        inv_fall = 1.0 / (p4 - p3)
+        ys = np.zeros_like(xs)
+        rise = np.empty_like(xs)
+        fall = np.empty_like(xs)
+        for k in range(cuts.shape[1]):
+            np.subtract(xs, p1[:, k, None], out=rise)
+            rise *= inv_rise[:, k, None]
+            np.subtract(p4[:, k, None], xs, out=fall)
+            fall *= inv_fall[:, k, None]
+            np.minimum(rise, fall, out=rise)
+            np.minimum(rise, cuts[:, k, None], out=rise)
+            np.maximum(ys, rise, out=ys)
+
+        return _piecewise_centroid(xs, ys)
+
+    def active_cells(self, rgb):
+        """
+        Celdas (Rojo, Verde, Azul) candidatas para entradas (N, 3) y su activación AND, ambas (N, terms_per_input³).
+
+        La celda es el índice t_rojo * len(LEVELS)² + t_verde * len(LEVELS) + t_azul.
+        """
+        mu = self.fuzzify(rgb)
+        n, n_levels, t = mu.shape[0], len(LEVELS), self.terms_per_input
+        if t < n_levels:
+            terms = np.argpartition(-mu, t - 1, axis=2)[:, :, :t]
+            mu = np.take_along_axis(mu, terms, axis=2)
+        else:
+            terms = np.broadcast_to(np.arange(n_levels), mu.shape)
+
+        cells = (terms[:, 0, :, None, None] * n_levels ** 2
+                 + terms[:, 1, None, :, None] * n_levels
+                 + terms[:, 2, None, None, :]).reshape(n, -1)
+        cell_strengths = np.minimum(np.minimum(mu[:, 0, :, None, None], mu[:, 1, None, :, None]),
+                                    mu[:, 2, None, None, :]).reshape(n, -1)
+        return cells, cell_strengths
+
+    def active_rules(self, rgb):
+        """
+        Reglas que pueden activarse para entradas (N, 3): ids (N, K) y activaciones (N, K).
+
+        Por cada variable solo terms_per_input términos son no nulos (2 con
+        KEY_POINTS), así que solo hay terms_per_input³ celdas (Rojo, Verde,
+        Azul) candidatas; las reglas se toman de cell_rules en lugar de evaluar
+        todo el archivo. Los huecos llevan el id n_reglas y activación 0.
+        """
+        n_rules = len(self.rules)
+        if self.rule_is_or.any():
+            # Una regla OR no pertenece a una sola celda: se evalúan todas
+            strengths = self.rule_strengths(rgb)
+            return np.broadcast_to(np.arange(n_rules), strengths.shape), strengths
+
+        return self.cell_active_rules(*self.active_cells(rgb))
+
+    def cell_active_rules(self, cells, cell_strengths):
+        """active_rules a partir de la salida de active_cells (compartible entre rulesets con el mismo tipo de MF)."""
+        n, n_rules = cells.shape[0], len(self.rules)
+        ids = self.cell_rules[cells].reshape(n, -1)
+        strengths = np.where(ids < n_rules, np.repeat(cell_strengths, self.cell_rules.shape[1], axis=1), 0.0)
+
+        # Las reglas reales primero; se descartan las columnas que son hueco en todas las filas
+        k = max(1, int((ids < n_rules).sum(axis=1).max()))
+        if k < ids.shape[1]:
+            order = np.argsort(ids >= n_rules, axis=1, kind='stable')[:, :k]
+            ids = np.take_along_axis(ids, order, axis=1)
+            strengths = np.take_along_axis(strengths, order, axis=1)
+        return ids, strengths
+
+    def dense_strengths(self, ids, strengths):
+        """Activaciones (N, n_reglas) a partir de la salida de active_rules."""
+        dense = np.zeros((ids.shape[0], len(self.rules) + 1))
+        np.put_along_axis(dense, ids, strengths, axis=1)
+        return dense[:, :-1]
+
+    def evaluate_active(self, rgb):
+        """Salida crisp (N,) evaluando solo las reglas activas, junto con sus ids y activaciones (N, K)."""
+        return self.evaluate_rules(*self.active_rules(rgb))
+
+    def evaluate_rules(self, ids, strengths):
+        """Salida crisp (N,) para reglas activas (N, K) de active_rules, junto con esos mismos ids y activaciones."""
+        groups = self.rule_groups[ids]
+        if ids.shape[1] > self.max_active:
+            # Muchas reglas por celda: se juntan por consecuente y se usa el top-K
+            cuts = np.zeros((ids.shape[0], len(self.group_terms) + 1))
+            np.maximum.at(cuts, (np.arange(ids.shape[0])[:, None], groups), strengths)
+            return self.defuzzify(cuts[:, :-1]), ids, strengths
+
+        # skfuzzy añade un punto de corte por término de salida (con el corte
+        # máximo de sus reglas), no uno por regla: las reglas activas que
+        # comparten consecuente toman ese máximo para obtener el mismo universo
+        same = groups[:, :, None] == groups[:, None, :]
+        cuts = np.where(same, strengths[:, None, :], 0.0).max(axis=2)
+        return self.defuzzify_terms(cuts, self.rule_points[ids]), ids, strengths
+
+    def evaluate_point(self, r, g, b):
+        """
+        evaluate() para un solo color: salida crisp (NaN si nada se activa), cortes (n_grupos,) y activaciones (n_reglas,).
+
+        Las pertenencias y las celdas activas se calculan con escalares de
+        Python y el centroide solo con los términos de corte > 0, en lugar de
+        pasar por los arreglos (N, ...) de evaluate, cuyo costo fijo por
+        llamada domina con N = 1. Las operaciones de punto flotante son las
+        mismas que en evaluate, así que el resultado coincide.
+        """
+        if self.has_or:
+            values, cuts, strengths = self.evaluate(np.array([[r, g, b]], dtype=float))
+            return values[0], cuts[0], strengths[0]
+
+        lo, hi = float(self.x_color[0]), float(self.x_color[-1])
+        channels = []
+        for x in (r, g, b):
+            x = min(max(float(x), lo), hi)
+            terms = []
+            for t, (p1, p2, p3, p4) in enumerate(self.point_inputs):
+                mu = min((x - p1) / (p2 - p1), (p4 - x) / (p4 - p3))
+                if mu > 0:
+                    terms.append((t, min(mu, 1.0)))
+            channels.append(terms)
+
+        n_levels = len(LEVELS)
+        strengths = np.zeros(len(self.rules))
+        group_cuts = {}
+        for t_r, mu_r in channels[0]:
+            for t_g, mu_g in channels[1]:
+                for t_b, mu_b in channels[2]:
+                    s = min(mu_r, mu_g, mu_b)
+                    for i in self.point_cells[(t_r * n_levels + t_g) * n_levels + t_b]:
+                        strengths[i] = s
+                        group = self.point_groups[i]
+                        if s > group_cuts.get(group, 0.0):
+                            group_cuts[group] = s
+
+        cuts = np.zeros(len(self.group_terms))
+        if not group_cuts:
+            return np.nan, cuts, strengths
+        groups = list(group_cuts)
+        group_values = list(group_cuts.values())
+        cuts[groups] = group_values
+
+        # defuzzify_terms y _piecewise_centroid con una fila y solo los K
+        # términos activos; los cruces con el corte se calculan como escalares
+        lo, hi = float(self.x_output[0]), float(self.x_output[-1])
+        crossings = []
+        for group, c in zip(groups, group_values):
+            p1, p2, p3, p4 = self.point_outputs[group]
+            crossings.append(min(max(p1 + c * (p2 - p1), lo), hi))
+            crossings.append(min(max(p4 - c * (p4 - p3), lo), hi))
+        xs = np.sort(np.concatenate([self.x_output, crossings]))
+
+        p1, _, _, p4, inv_rise, inv_fall = self.point_shapes[groups].T[:, :, None]
+        rise = (xs - p1) * inv_rise
+        fall = (p4 - xs) * inv_fall
+        ys = np.maximum(np.minimum(np.minimum(rise, fall), np.array(group_values)[:, None]).max(axis=0), 0.0)
+
+        dx = xs[1:] - xs[:-1]
+        y1, y2 = ys[:-1], ys[1:]
+        area = (0.5 * dx * (y1 + y2)).sum()
+        moment = (dx * (xs[:-1] * (y1 + y2) / 2.0 + dx * (y1 + 2.0 * y2) / 6.0)).sum()
+        return moment / area, cuts, strengths
+
+    def evaluate_sugeno(self, rgb, constant='centroid'):
+        """
+        Salida Sugeno de orden cero (N,) con los ids y activaciones (N, K) de las reglas activas.
+
+        Cada regla aporta la constante de su etiqueta de salida (su centroide o
+        su pico, ver sugeno_constants) y la salida es la media ponderada por
+        las activaciones: no hay agregado ni universo de salida. NaN donde
+        ninguna regla se activa.
+        """
+        if constant not in SUGENO_CONSTANTS:
+            raise ValueError(f"Consecuente Sugeno no soportado: {constant} "
+                             f"(usa {', '.join(SUGENO_CONSTANTS)})")
+        ids, strengths = self.active_rules(rgb)
+        weight = strengths.sum(axis=1)
+        total = (strengths * self.rule_constants[constant][ids]).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(weight > 0, total / weight, np.nan), ids, strengths
+
+    def evaluate(self, rgb):
+        """Salida crisp (N,), cortes (N, n_grupos) y activaciones (N, n_reglas) para entradas (N, 3)."""
+        values, ids, active = self.evaluate_active(rgb)
+        strengths = self.dense_strengths(ids, active)
+        return values, self.output_cuts(strengths), strengths
+
+    def defuzzify_exact(self, cuts, method='centroid'):
+        """
+        Defuzzificación exacta para cortes (N, n_grupos), sin universo muestreado.
+
+        Usa los vértices analíticos de las MF de salida (output_mf_points), así
+        que el resultado no depende de la resolución de X_OUTPUT. El agregado
+        es lineal por tramos y sus quiebres solo pueden estar en los vértices
+        de cada término recortado o donde se cruzan dos términos; se evalúa en
+        esos puntos y se integra tramo a tramo. method: 'centroid',
+        'bisector', 'mom', 'som' o 'lom'. NaN donde nada se activa.
+        """
+        if method not in EXACT_DEFUZZ_METHODS:
+            raise ValueError(f"Método de defuzzificación no soportado: {method} "
+                             f"(usa {', '.join(EXACT_DEFUZZ_METHODS)})")
+
+        # Solo los términos con corte > 0 dan forma al agregado
+        points = self.exact_points[self.group_terms]
+        k = max(1, int((cuts > 0).sum(axis=1).max()))
+        if k < cuts.shape[1]:
+            top = np.argpartition(-cuts, k - 1, axis=1)[:, :k]
+            cuts = np.take_along_axis(cuts, top, axis=1)
+            points = points[top]
+        else:
+            points = np.broadcast_to(points, cuts.shape + (4,))
+
+        xs, ys = _exact_aggregate(cuts, points)
+        return EXACT_DEFUZZ_METHODS[method](xs, ys)
+
+    def winning_labels(self, cuts):
+        """Etiqueta de salida con mayor corte para cada fila ('' si ninguna regla se activa)."""
+        labels = np.array(OUTPUT_LABELS)[self.group_terms][np.argmax(cuts, axis=1)]
+        return np.where(cuts.max(axis=1) > 0, labels, '')
+
+    def aggregate(self, cuts):
+        """Conjunto agregado (N, len(x_output)) sobre x_output, para graficar."""
+        mfs = self.output_mf[self.group_terms]
+        return np.minimum(mfs[None, :, :], cuts[:, :, None]).max(axis=1)
+
+
+def _sampled_points(mf, universe):
+    """
+    Vértices [p1, p2, p3, p4] de la MF muestreada tal como la interpola skfuzzy.
+
+    Un borde vertical dentro del universo (p. ej. trapmf [0, 0, 5, 5]) se
+    convierte en una rampa de un paso de muestreo, así que los vértices se
+    toman de las muestras y no de los parámetros de la MF. Un borde vertical en
+    el extremo del universo se prolonga un paso hacia afuera: dentro del
+    universo la MF no cambia y ninguna pendiente queda infinita.
+    """
+    step = float(universe[1] - universe[0])
+    nonzero = np.flatnonzero(mf > 0)
+    top = np.flatnonzero(mf == mf.max())
+    p2, p3 = float(universe[top[0]]), float(universe[top[-1]])
+    p1 = float(universe[nonzero[0] - 1]) if nonzero[0] > 0 else p2 - step
+    p4 = float(universe[nonzero[-1] + 1]) if nonzero[-1] < len(universe) - 1 else p3 + step
+    return [p1, p2, p3, p4]
+
+
+def _trapezoid(x, p1, p2, p3, p4):
+    """MF trapezoidal por tramos con p1 < p2 <= p3 < p4 (p2 == p3 es un triángulo)."""
+    return np.clip(np.minimum((x - p1) / (p2 - p1), (p4 - x) / (p4 - p3)), 0.0, 1.0)
+
+
+def _piecewise_centroid(xs, ys):
+    """Centroide exacto de la función lineal por tramos que une (xs, ys) en cada fila; NaN si el área es 0."""
+    dx = np.diff(xs, axis=1)
+    y1, y2 = ys[:, :-1], ys[:, 1:]
+    area = (0.5 * dx * (y1 + y2)).sum(axis=1)
+    moment = (dx * (xs[:, :-1] * (y1 + y2) / 2.0 + dx * (y1 + 2.0 * y2) / 6.0)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ys.max(axis=1) > 0, moment / area, np.nan)
+
+
+# Ancho con el que se representa un borde vertical de una MF (p1 == p2 o
+# p3 == p4) en el modo exacto, para que toda pendiente sea finita; el error
+# que introduce en la salida es del mismo orden
+EXACT_EDGE = 1e-6
+# Diferencia de altura por debajo de la cual dos términos se consideran empatados
+EXACT_TOLERANCE = 1e-7
+
+
+def _exact_points(points):
+    """Vértices [p1, p2, p3, p4] con los bordes verticales convertidos en rampas de ancho EXACT_EDGE."""
+    p1, p2, p3, p4 = (float(p) for p in points)
+    return [min(p1, p2 - EXACT_EDGE), p2, p3, max(p4, p3 + EXACT_EDGE)]
+
+
+def _exact_heights(xs, cuts, p1, p4, rise, fall):
+    """Altura (K, N, M) de cada término recortado en cada punto xs (N, M), un bloque contiguo por término."""
+    h = np.empty((cuts.shape[1],) + xs.shape)
+    fall_part = np.empty_like(xs)
+    for j in range(cuts.shape[1]):
+        rise_part = h[j]
+        np.subtract(xs, p1[:, j, None], out=rise_part)
+        rise_part *= rise[:, j, None]
+        np.subtract(p4[:, j, None], xs, out=fall_part)
+        fall_part *= fall[:, j, None]
+        np.minimum(rise_part, fall_part, out=rise_part)
+        np.minimum(rise_part, cuts[:, j, None], out=rise_part)
+        np.maximum(rise_part, 0.0, out=rise_part)
+    return h
+
+
+def _exact_aggregate(cuts, points):
+    """
+    Puntos de quiebre (N, M) ordenados del agregado max_k min(corte_k, MF_k) y su altura.
+
+    Se parte de los quiebres de cada término recortado (pies y puntos donde
+    cada rampa alcanza su corte) y de los extremos de X_OUTPUT. Entre dos
+    puntos consecutivos cada término es una recta, así que el agregado es el
+    máximo de rectas, una función convexa: si una misma recta es la máxima en
+    ambos extremos, el agregado es esa recta en todo el tramo. Si no, se
+    inserta el cruce entre la recta máxima a la izquierda y la máxima a la
+    derecha y se repite, solo en las filas que lo necesitan, hasta que ningún
+    tramo cambia de recta. Las filas con menos puntos se rellenan repitiendo
+    el último (tramos de longitud 0).
+    """
+    n, k = cuts.shape
+    p1, p2, p3, p4 = (points[..., i] for i in range(4))
+    rise = 1.0 / (p2 - p1)
+    fall = 1.0 / (p4 - p3)
+    xs = np.concatenate([p1, p4, p1 + cuts / rise, p4 - cuts / fall,
+                         np.full((n, 2), [X_OUTPUT[0], X_OUTPUT[-1]], dtype=float)], axis=1)
+    xs = np.sort(np.clip(xs, X_OUTPUT[0], X_OUTPUT[-1]), axis=1)
+    ys = np.empty_like(xs)
+    rows = np.arange(n)
+    for _ in range(2 * k + 1):
+        x = xs[rows]
+        h = _exact_heights(x, cuts[rows], p1[rows], p4[rows], rise[rows], fall[rows])
+        y = h.max(axis=0)
+        ys[rows] = y
+        left, right = h[..., :-1], h[..., 1:]
+        top_left = left >= y[:, :-1] - EXACT_TOLERANCE
+        top_right = right >= y[:, 1:] - EXACT_TOLERANCE
+        # Los tramos del orden de EXACT_EDGE (un borde vertical) no se dividen
+        split = ~(top_left & top_right).any(axis=0) & (np.diff(x, axis=1) > 10 * EXACT_EDGE)
+        pending = split.any(axis=1)
+        if not pending.any():
+            break
+
+        # Recta máxima a la izquierda (la que más sube) y a la derecha (la que más baja)
+        x, split = x[pending], split[pending]
+        left, right = left[:, pending], right[:, pending]
+        top_left, top_right = top_left[:, pending], top_right[:, pending]
+        a = np.argmax(np.where(top_left, right, -np.inf), axis=0)[None]
+        b = np.argmax(np.where(top_right, left, -np.inf), axis=0)[None]
+        a0, a1 = np.take_along_axis(left, a, 0)[0], np.take_along_axis(right, a, 0)[0]
+        b0, b1 = np.take_along_axis(left, b, 0)[0], np.take_along_axis(right, b, 0)[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.nan_to_num(np.clip((b0 - a0) / ((a1 - a0) - (b1 - b0)), 0.0, 1.0))
+        cross = x[:, :-1] + t * np.diff(x, axis=1)
+
+        # Se añaden tantas columnas como cruces tenga la fila que más necesita;
+        # el resto de filas se rellena con su último punto
+        m = int(split.sum(axis=1).max())
+        order = np.argsort(~split, axis=1, kind='stable')[:, :m]
+        new = np.where(np.take_along_axis(split, order, 1), np.take_along_axis(cross, order, 1), x[:, -1:])
+        xs = np.concatenate([xs, np.repeat(xs[:, -1:], m, axis=1)], axis=1)
+        ys = np.concatenate([ys, np.repeat(ys[:, -1:], m, axis=1)], axis=1)
+        xs[rows[pending]] = np.sort(np.concatenate([x, new], axis=1), axis=1)
+        rows = rows[pending]
+    else:
+        ys[rows] = _exact_heights(xs[rows], cuts[rows], p1[rows], p4[rows], rise[rows], fall[rows]).max(axis=0)
+
+    return xs, ys
+
+
+def _piecewise_bisector(xs, ys):
+    """Punto que divide en dos mitades iguales el área de la función lineal por tramos (xs, ys); NaN si el área es 0."""
+    dx = np.diff(xs, axis=1)
+    y0, y1 = ys[:, :-1], ys[:, 1:]
+    cumulative = np.cumsum(0.5 * dx * (y0 + y1), axis=1)
+    half = cumulative[:, -1] / 2.0
+
+    # Tramo donde el área acumulada alcanza la mitad y área que falta dentro de él.
+    # Si la mitad cae justo en un hueco entre dos zonas con área, cualquier punto
+    # del hueco divide el área en dos; la tolerancia elige su extremo izquierdo
+    j = np.minimum((cumulative < half[:, None] * (1 - 1e-12)).sum(axis=1), dx.shape[1] - 1)
+    rows = np.arange(xs.shape[0])
+    need = half - np.where(j > 0, cumulative[rows, j - 1], 0.0)
+    x0, d, h0, h1 = xs[rows, j], dx[rows, j], y0[rows, j], y1[rows, j]
+
+    # Área desde x0 hasta x0 + t: h0·t + (h1 - h0)·t² / (2·d); forma estable de la raíz
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(d > 0, (h1 - h0) / d, 0.0)
+        t = 2.0 * need / (h0 + np.sqrt(np.maximum(h0 ** 2 + 2.0 * slope * need, 0.0)))
+        t = np.where(np.isfinite(t), np.clip(t, 0.0, d), 0.0)
+    return np.where(half > 0, x0 + t, np.nan)
+
+
+def _max_set(xs, ys):
+    """Máscara de los puntos que alcanzan la altura máxima del agregado (con tolerancia de redondeo)."""
+    top = ys.max(axis=1, keepdims=True)
+    return (ys >= top - EXACT_TOLERANCE) & (top > 0)
+
+
+def _piecewise_mom(xs, ys):
+    """
+    Media del conjunto donde el agregado es máximo: centro de las mesetas,
+    ponderadas por su longitud, o media de los picos si no hay meseta.
+    """
+    at_max = _max_set(xs, ys)
+    plateau = at_max[:, :-1] & at_max[:, 1:]
+    length = np.where(plateau, np.diff(xs, axis=1), 0.0)
+    middle = (xs[:, :-1] + xs[:, 1:]) / 2.0
+    total = length.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        peaks = np.where(at_max, xs, 0.0).sum(axis=1) / at_max.sum(axis=1)
+        return np.where(total > 0, (length * middle).sum(axis=1) / total, peaks)
+
+
+def _piecewise_som(xs, ys):
+    """Menor x donde el agregado es máximo."""
+    at_max = _max_set(xs, ys)
+    return np.where(at_max.any(axis=1), np.where(at_max, xs, np.inf).min(axis=1), np.nan)
+
+
+def _piecewise_lom(xs, ys):
+    """Mayor x donde el agregado es máximo."""
+    at_max = _max_set(xs, ys)
+    return np.where(at_max.any(axis=1), np.where(at_max, xs, -np.inf).max(axis=1), np.nan)
+
+
+EXACT_DEFUZZ_METHODS = {
+    'centroid': _piecewise_centroid,
+    'bisector': _piecewise_bisector,
+    'mom': _piecewise_mom,
+    'som': _piecewise_som,
+    'lom': _piecewise_lom,
+}
+
+
+# Constante que representa a cada etiqueta de salida en el modo Sugeno:
+# el centroide de su MF o el centro de su meseta (el pico en un triángulo)
+SUGENO_CONSTANTS = {
+    'centroid': 'centroid',
+    'peak': 'mom',
+}
+
+
+def sugeno_constants(mf_type_selected, method='centroid'):
+    """
+    Constante (len(OUTPUT_LABELS),) de cada etiqueta de salida para el modo Sugeno.
+
+    Se calcula de forma exacta sobre la MF completa dentro de X_OUTPUT, con la
+    misma defuzzificación que defuzzify_exact aplicada a la etiqueta sola.
+    """
+    if method not in SUGENO_CONSTANTS:
+        raise ValueError(f"Consecuente Sugeno no soportado: {method} (usa {', '.join(SUGENO_CONSTANTS)})")
+    points = np.array([_exact_points(output_mf_points(mf_type_selected, *OUTPUT_DEFINITIONS[label]))
+                       for label in OUTPUT_LABELS])
+    xs, ys = _exact_aggregate(np.ones((len(points), 1)), points[:, None, :])
+    return EXACT_DEFUZZ_METHODS[SUGENO_CONSTANTS[method]](xs, ys)
+
+
+def compile_ruleset(rules_filename, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """Compila un archivo de reglas para el motor NumPy (con caché LRU por archivo, tipo de MF y resolución)."""
+    return _cached_build(
+        'numpy', rules_filename, mf_type_selected,
+        lambda filename, mf_type, res: CompiledRuleset(filename, mf_type, read_rules_json(filename), res),
+        resolution
+    )
+
+
+class NumpySimulation:
+    """Resultado de create_system_numpy, con la misma forma de uso que ControlSystemSimulation."""
+
+    def __init__(self, compiled, strengths, cuts, value):
+        self.compiled = compiled
+        self.rule_strengths = strengths
+        self.cuts = cuts
+        self.output = {'ColorOutput': value}
+        self._aggregate = None
+
+    @property
+    def aggregate(self):
+        """Conjunto agregado sobre x_output; se calcula al pedirlo (solo hace falta para graficar)."""
+        if self._aggregate is None:
+            with timed('numpy/aggregate'):
+                self._aggregate = self.compiled.aggregate(self.cuts[None, :])[0]
+        return self._aggregate
+
+
+def create_system_numpy(rules_filename, R_val, G_val, B_val, mf_type_selected, resolution=DEFAULT_RESOLUTION):
+    """
+    Equivalente a create_system_from_json usando el motor NumPy.
+    Devuelve (salida, simulación) o (None, None) si ninguna regla se activa.
+    """
+    compiled = compile_ruleset(rules_filename, mf_type_selected, resolution)
+    with timed('numpy/compute'):
+        value, cuts, strengths = compiled.evaluate_point(R_val, G_val, B_val)
+
+    if np.isnan(value):
+        print("Error en computación fuzzy: ninguna regla se activó")
+        return None, None
+
+    return float(value), NumpySimulation(compiled, strengths, cuts, float(value))
+
+
+BATCH_CHUNK_SIZE = 4096
+
+
+@instrument('numpy/classify_batch')
+def classify_batch(rules_filename, rgb, mf_type_selected,
+                   return_labels=False, return_strengths=False, chunk_size=BATCH_CHUNK_SIZE, exact=None,
+                   resolution=DEFAULT_RESOLUTION, sugeno=None):
+    """
+    Clasifica N colores en una sola llamada vectorizada con el motor NumPy.
+
+    rgb es un arreglo (N, 3) uint8 o float. Devuelve las salidas crisp (N,) (NaN
+    donde ninguna regla se activa) y, si se piden, la etiqueta ganadora (N,) y
+    la activación de cada regla (N, n_reglas), en ese orden. Se procesa por
+    bloques de chunk_size filas para acotar la memoria intermedia.
+
+    Por defecto el centroide reproduce el de skfuzzy sobre el universo de
+    salida del perfil `resolution`; con exact='centroid', 'bisector', 'mom',
+    'som' o 'lom' se usa CompiledRuleset.defuzzify_exact. Con sugeno='centroid'
+    o 'peak' la salida es la del modo Sugeno de orden cero
+    (CompiledRuleset.evaluate_sugeno), sin agregado de salida; no se puede
+    combinar con exact (ValueError).
+    """
+    if sugeno and exact:
+        raise ValueError(f"sugeno='{sugeno}' y exact='{exact}' no se pueden combinar: "
+                         f"el modo Sugeno no defuzzifica un agregado")
+    compiled = compile_ruleset(rules_filename, mf_type_selected, resolution)
+    rgb = np.asarray(rgb).reshape(-1, 3)
+    n = rgb.shape[0]
+
+    values = np.empty(n, dtype=float)
+    labels = np.empty(n, dtype=f'<U{max(map(len, OUTPUT_LABELS))}') if return_labels else None
+    strengths = np.empty((n, len(compiled.rules)), dtype=float) if return_strengths else None
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        if sugeno:
+            chunk_values, ids, active = compiled.evaluate_sugeno(rgb[start:stop], sugeno)
+        elif exact:
+            ids, active = compiled.active_rules(rgb[start:stop])
+            chunk_strengths = compiled.dense_strengths(ids, active)
+            chunk_values = compiled.defuzzify_exact(compiled.output_cuts(chunk_strengths), exact)
+        else:
+            chunk_values, ids, active = compiled.evaluate_active(rgb[start:stop])
+        values[start:stop] = chunk_values
+        if (return_labels or return_strengths) and not exact:
+            chunk_strengths = compiled.dense_strengths(ids, active)
+        if return_labels:
+            labels[start:stop] = compiled.winning_labels(compiled.output_cuts(chunk_strengths))
+        if return_strengths:
+            strengths[start:stop] = chunk_strengths
+
+    if not (return_labels or return_strengths):
+        return values
+    return (values,) + tuple(x for x in (labels, strengths) if x is not None)
@@ -0,0 +1,288 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from fuzzy_numpy import KEY_POINTS, MF_TYPES, X_COLOR, classify_batch
+from fuzzy_lut import LUT_SIZE, load_lut, rules_file_hash, term_support
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+OCTREE_MAGIC = "FZOCT1"
+DEFAULT_TOLERANCE = 0.5   # error máximo de la interpolación en cualquier color entero
+CHECK_BLOCK = 1 << 22     # colores comparados por bloque al validar las celdas
+
+# Esquina c de una celda: bits (R, G, B) = (c >> 2 & 1, c >> 1 & 1, c & 1)
+CORNER_BITS = np.array([[(c >> 2) & 1, (c >> 1) & 1, c & 1] for c in range(8)])
+OCTANT_WEIGHTS = np.array([4, 2, 1])
+
+
+def support_intervals(mf_type_selected):
+    """
+    Intervalos enteros [inicio, fin] de cada canal donde el conjunto de términos no nulos no cambia.
+
+    En los bordes de soporte (p. ej. R = 0 → 1) entra o sale una regla con
+    activación casi nula y, si todas las activas son débiles, el centroide
+    salta: la superficie es continua dentro de cada caja producto de estos
+    intervalos, pero no a través de ellas, así que el octree parte de esa malla.
+    """
+    edges = sorted({0, LUT_SIZE} | {v for term in KEY_POINTS for v in term_support(mf_type_selected, term)})
+    return np.array([[start, stop - 1] for start, stop in zip(edges[:-1], edges[1:])], dtype=np.int64)
+
+
+def _interpolate(lo, hi, corners, x):
+    """
+    Interpolación trilineal de las 8 esquinas de cada celda en los puntos x (N, 3).
+
+    Las esquinas con peso 0 no participan (un eje de grosor 0 usa solo la
+    esquina inferior), así que un punto sobre una esquina devuelve su valor
+    aunque otras sean NaN; si participa alguna esquina NaN, el resultado es NaN.
+    """
+    size = hi - lo
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(size > 0, (x - lo) / size, 0.0)
+    w = np.prod(np.where(CORNER_BITS[None], t[:, None, :], 1.0 - t[:, None, :]), axis=2)
+    used = w > 0
+    with np.errstate(invalid='ignore'):
+        values = np.where(used, w * corners, 0.0).sum(axis=1)
+    return np.where((used & np.isnan(corners)).any(axis=1), np.nan, values)
+
+
+def _axis_weights(size):
+    """Pesos (inferior, superior) de la interpolación en los size + 1 enteros de un eje de la celda."""
+    t = np.arange(size + 1) / size if size > 0 else np.zeros(1)
+    return 1.0 - t, t
+
+
+def _cells_within(table, lo, hi, corners, tolerance):
+    """
+    True por celda si la interpolación de sus esquinas difiere de la tabla
+    como mucho `tolerance` en todos sus colores enteros y es NaN justo donde
+    la tabla lo es.
+
+    Las celdas del mismo tamaño comparten los pesos de cada esquina, así que
+    se comprueban juntas, en bloques de a lo sumo CHECK_BLOCK colores.
+    """
+    ok = np.zeros(len(lo), dtype=bool)
+    sizes, group = np.unique(hi - lo, axis=0, return_inverse=True)
+    for g, size in enumerate(sizes):
+        axes = [_axis_weights(s) for s in size]
+        weights = np.stack([axes[0][bx][:, None, None] * axes[1][by][None, :, None] * axes[2][bz][None, None, :]
+                            for bx, by, bz in CORNER_BITS])
+        used = weights > 0
+        cells = np.flatnonzero(group.ravel() == g)
+        step = max(1, CHECK_BLOCK // weights[0].size)
+        for start in range(0, cells.size, step):
+            batch = cells[start:start + step]
+            l = lo[batch]
+            idx = [l[:, axis, None] + np.arange(size[axis] + 1) for axis in range(3)]
+            exact = table[idx[0][:, :, None, None], idx[1][:, None, :, None], idx[2][:, None, None, :]].astype(float)
+            c = corners[batch][:, :, None, None, None]
+            with np.errstate(invalid='ignore'):
+                approx = np.where(used, weights * c, 0.0).sum(axis=1)
+            approx[(used & np.isnan(c)).any(axis=1)] = np.nan
+            with np.errstate(invalid='ignore'):
+                good = np.where(np.isnan(exact), np.isnan(approx), np.abs(approx - exact) <= tolerance)
+            ok[batch] = good.reshape(len(batch), -1).all(axis=1)
+    return ok
+
+
+class ColorOctree:
+    """
+    Superficie de clasificación comprimida: un octree adaptativo por cada caja de support_intervals.
+
+    - intervals: (n_intervalos, 2) intervalos enteros de cada canal.
+    - roots: (n, n, n) raíz de cada caja: id de nodo (>= 0) o ~id de hoja (< 0).
+    - children: (n_nodos, 8) por octante, id del hijo o ~id de hoja (0 en los
+      octantes que no existen porque el eje ya no se puede partir).
+    - corners: (n_hojas, 8) float32 salida del motor en las esquinas de cada hoja.
+
+    Las celdas no guardan sus límites: se recalculan al bajar desde la raíz
+    partiendo cada eje en (inicio + fin) // 2. La superficie se define en
+    colores enteros, como la tabla 256³: las consultas se redondean.
+    """
+
+    def __init__(self, intervals, roots, children, corners, header):
+        self.intervals = intervals
+        self.roots = roots
+        self.children = children
+        self.corners = corners
+        self.header = header
+
+    @property
+    def memory_bytes(self):
+        return self.intervals.nbytes + self.roots.nbytes + self.children.nbytes + self.corners.nbytes
+
+    def locate(self, x):
+        """Hoja y límites (inicio, fin) de la celda que contiene cada punto entero x (N, 3)."""
+        box = np.searchsorted(self.intervals[:, 1], x)
+        ref = self.roots[box[:, 0], box[:, 1], box[:, 2]].astype(np.int64)
+        lo, hi = self.intervals[box, 0], self.intervals[box, 1]
+        pending = np.flatnonzero(ref >= 0)
+        while pending.size:
+            l, h = lo[pending], hi[pending]
+            mid = (l + h) // 2
+            split = (h - l) > 1
+            upper = split & (x[pending] >= mid)
+            lo[pending] = np.where(upper, mid, l)
+            hi[pending] = np.where(split & ~upper, mid, h)
+            ref[pending] = self.children[ref[pending], upper @ OCTANT_WEIGHTS]
+            pending = pending[ref[pending] >= 0]
+        return ~ref, lo, hi
+
+    def lookup(self, rgb):
+        """Salidas interpoladas (N,) para colores (N, 3), redondeados y saturados a 0–255; NaN sin reglas activas."""
+        x = np.clip(np.rint(np.asarray(rgb, dtype=float).reshape(-1, 3)), X_COLOR[0], X_COLOR[-1]).astype(np.int64)
+        leaves, lo, hi = self.locate(x)
+        return _interpolate(lo, hi, self.corners[leaves].astype(float), x)
+
+    def save(self, path):
+        np.savez(path, header=np.array(json.dumps(self.header)), intervals=self.intervals,
+                 roots=self.roots, children=self.children, corners=self.corners)
+
+    def is_stale(self):
+        """True si el archivo de reglas cambió desde que se construyó el octree."""
+        return rules_file_hash(self.header['rules_filename']) != self.header['rules_sha256']
+
+
+def load_octree(path):
+    """Abre un octree guardado con ColorOctree.save."""
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        if header.get('magic') != OCTREE_MAGIC:
+            raise ValueError(f"{path} no es un octree de clasificación fuzzy")
+        return ColorOctree(data['intervals'], data['roots'], data['children'], data['corners'], header)
+
+
+def build_octree(rules_filename, mf_type_selected, tolerance=DEFAULT_TOLERANCE, workers=None):
+    """
+    Construye los octrees de todas las cajas a la vez, nivel a nivel.
+
+    Una celda queda como hoja si la interpolación de sus esquinas difiere
+    como mucho `tolerance` de la tabla 256³ float32 del ruleset (fuzzy_lut)
+    en todos los colores enteros de la celda, y es NaN exactamente donde la
+    tabla lo es. Si no, se parte por la mitad en cada eje de más de un paso.
+    Las celdas de a lo sumo un paso por eje son exactas en los puntos enteros
+    y siempre son hojas.
+
+    `tolerance` es por tanto una cota del error en los colores enteros frente
+    a la tabla, que difiere del motor solo en el redondeo a float32. Si la
+    tabla no existe se construye con `workers` procesos, como en fuzzy_lut.
+    """
+    table = np.asarray(load_lut(rules_filename, mf_type_selected, 'float32', workers=workers).table)
+    intervals = support_intervals(mf_type_selected)
+    n_int = len(intervals)
+    boxes = np.stack(np.meshgrid(*[np.arange(n_int)] * 3, indexing='ij'), axis=-1).reshape(-1, 3)
+    lo, hi = intervals[boxes, 0], intervals[boxes, 1]
+    # Padre de cada celda: -1 - índice de caja para las raíces, o el id del nodo
+    parent, octant = -1 - np.arange(len(boxes)), np.zeros(len(boxes), dtype=np.int64)
+
+    roots = np.zeros(len(boxes), dtype=np.int32)
+    children = np.zeros((0, 8), dtype=np.int32)
+    corners = []
+    n_leaves = 0
+
+    while lo.shape[0]:
+        n, size = lo.shape[0], hi - lo
+        mid = (lo + hi) // 2
+        corner_points = lo[:, None, :] + CORNER_BITS[None] * size[:, None, :]
+        cell_corners = table[corner_points[..., 0], corner_points[..., 1], corner_points[..., 2]].astype(float)
+        leaf = (size <= 1).all(axis=1)
+        leaf[~leaf] = _cells_within(table, lo[~leaf], hi[~leaf], cell_corners[~leaf], tolerance)
+
+        # Hojas y nodos internos reciben id; el padre (o la raíz de la caja) apunta a ellos
+        codes = np.empty(n, dtype=np.int64)
+        codes[leaf] = ~(n_leaves + np.arange(int(leaf.sum())))
+        inner = np.flatnonzero(~leaf)
+        codes[inner] = children.shape[0] + np.arange(inner.size)
+        n_leaves += int(leaf.sum())
+        corners.append(cell_corners[leaf].astype(np.float32))
+        children = np.concatenate([children, np.zeros((inner.size, 8), dtype=np.int32)])
+        is_root = parent < 0
+        roots[-1 - parent[is_root]] = codes[is_root]
+        children[parent[~is_root], octant[~is_root]] = codes[~is_root]
+
+        # Hijos: 2 mitades en cada eje que aún se puede partir, 1 en el resto
+        split = size[inner] > 1
+        new = []
+        for bits in CORNER_BITS:
+            valid = ~((bits == 1) & ~split).any(axis=1)
+            cells = inner[valid]
+            new.append((np.where(bits == 1, mid[cells], lo[cells]),
+                        np.where((bits == 0) & split[valid], mid[cells], hi[cells]),
+                        codes[cells], np.full(cells.size, int(bits @ OCTANT_WEIGHTS))))
+        lo, hi, parent, octant = (np.concatenate(parts) for parts in zip(*new))
+
+    header = {
+        'magic': OCTREE_MAGIC,
+        'rules_filename': rules_filename,
+        'rules_sha256': rules_file_hash(rules_filename),
+        'mf_type': mf_type_selected,
+        'tolerance': tolerance,
+    }
+    return ColorOctree(intervals, roots.reshape(n_int, n_int, n_int), children,
+                       np.concatenate(corners).reshape(-1, 8), header)
+
+
+def octree_report(rules_filename, mf_type_selected, tolerance, samples=200000, seed=1, workers=None):
+    """Tamaño, error frente al motor en colores aleatorios y coste de construcción y consulta de un octree."""
+    load_lut(rules_filename, mf_type_selected, 'float32', workers=workers)   # la tabla no cuenta en la construcción
+    start = time.perf_counter()
+    octree = build_octree(rules_filename, mf_type_selected, tolerance)
+    build_s = time.perf_counter() - start
+
+    rgb = np.random.default_rng(seed).integers(0, LUT_SIZE, (samples, 3))
+    exact = classify_batch(rules_filename, rgb, mf_type_selected)
+    start = time.perf_counter()
+    approx = octree.lookup(rgb)
+    lookup_s = time.perf_counter() - start
+
+    both = ~(np.isnan(exact) | np.isnan(approx))
+    diff = np.abs(approx[both] - exact[both])
+    return {
+        'rules_filename': rules_filename,
+        'mf_type': mf_type_selected,
+        'tolerance': tolerance,
+        'nodes': int(octree.children.shape[0]) + octree.roots.size,
+        'leaves': int(octree.corners.shape[0]),
+        'memory_bytes': octree.memory_bytes,
+        'dense_bytes': LUT_SIZE ** 3 * 4,
+        'max_abs_diff': float(diff.max()) if diff.size else 0.0,
+        'mean_abs_diff': float(diff.mean()) if diff.size else 0.0,
+        'nan_mismatches': int((np.isnan(exact) != np.isnan(approx)).sum()),
+        'build_s': build_s,
+        'lookup_us': lookup_s / samples * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Octree adaptativo de la superficie de clasificación: memoria frente a error.")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], nargs='*', default=['trimf', 'trapmf'], help="Tipos de MF")
+    parser.add_argument('--tolerance', type=float, nargs='*', default=[2.0, DEFAULT_TOLERANCE, 0.1],
+                        help="Error máximo de la interpolación en cualquier color entero")
+    parser.add_argument('--samples', type=int, default=200000, help="Colores aleatorios para medir el error")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Procesos para construir la tabla 256³ si falta (por defecto, todos los núcleos)")
+    parser.add_argument('--save', default=None,
+                        help="Guardar el octree de la primera combinación en este archivo .npz en vez de hacer el informe")
+    args = parser.parse_args()
+
+    mf_types = [t for t in MF_TYPES if any(tag in t for tag in args.mf)]
+    if args.save:
+        octree = build_octree(args.rules[0], mf_types[0], args.tolerance[0], args.workers)
+        octree.save(args.save)
+        print(f"Octree guardado en {args.save}: {octree.corners.shape[0]} hojas, "
+              f"{octree.memory_bytes / 2 ** 20:.2f} MB")
+    else:
+        for rules_filename in args.rules:
+            for mf_type in mf_types:
+                for tolerance in args.tolerance:
+                    r = octree_report(rules_filename, mf_type, tolerance, args.samples, workers=args.workers)
+                    print(f"{rules_filename:<15} {mf_type:<21} tol. {tolerance:<5} "
+                          f"{r['leaves']:>8} hojas  {r['memory_bytes'] / 2 ** 20:7.2f} MB "
+                          f"({r['memory_bytes'] / r['dense_bytes']:.1%} de la tabla densa)  "
+                          f"máx {r['max_abs_diff']:.3f}  media {r['mean_abs_diff']:.4f}  "
+                          f"construcción {r['build_s']:.1f} s  consulta {r['lookup_us']:.2f} µs"
+                          + (f"  ⚠️ {r['nan_mismatches']} NaN distintos" if r['nan_mismatches'] else "")
+                          + ("  ⚠️ supera la tolerancia" if r['max_abs_diff'] > tolerance + 1e-4 else ""))
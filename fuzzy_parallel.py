@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from fuzzy_numpy import MF_TYPES, classify_batch
+from fuzzy_image import classify_image, load_image
+
+DEFAULT_TILE_SIZE = 1 << 18  # píxeles por tarea
+
+
+# --- Trabajadores del pool: se enganchan a los buffers compartidos una sola vez ---
+_worker = {}
+
+
+def _attach(name, shape, dtype):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_worker(buffers, rules_filename, mf_type_selected):
+    shms = []
+    for key, (name, shape, dtype) in buffers.items():
+        shm, array = _attach(name, shape, dtype)
+        shms.append(shm)
+        _worker[key] = array
+    _worker['shms'] = shms  # se conservan para que los buffers sigan mapeados
+    _worker['args'] = (rules_filename, mf_type_selected)
+    # Compila el ruleset una vez por proceso (queda en la caché de fuzzy_numpy)
+    classify_batch(rules_filename, np.zeros((1, 3)), mf_type_selected)
+
+
+def _classify_tile(start, stop):
+    rules_filename, mf_type_selected = _worker['args']
+    tile = _worker['rgb'][start:stop].reshape(-1, 1, 3)
+    values, label_ids = classify_image(tile, rules_filename, mf_type_selected)
+    _worker['values'][start:stop] = values.ravel()
+    _worker['labels'][start:stop] = label_ids.ravel()
+    return stop - start
+
+
+def _tiles(n_pixels, tile_size):
+    return [(start, min(start + tile_size, n_pixels)) for start in range(0, n_pixels, tile_size)]
+
+
+def classify_parallel(rgb, rules_filename, mf_type_selected, workers=None, tile_size=DEFAULT_TILE_SIZE):
+    """
+    Clasifica un arreglo grande de colores (N, 3) o una imagen (H, W, 3) en varios procesos.
+
+    La entrada y las salidas viven en multiprocessing.shared_memory: los
+    procesos leen y escriben directamente sus tiles (tile_size píxeles
+    consecutivos) sin copiar ni serializar los datos. Cada tile se resuelve
+    con classify_image (deduplicando colores), así que el resultado es
+    idéntico al de una ejecución en un solo proceso. Devuelve (valores,
+    etiquetas) con la forma de la entrada sin el último eje.
+    """
+    rgb = np.asarray(rgb, dtype=np.uint8)
+    out_shape = rgb.shape[:-1]
+    flat = rgb.reshape(-1, 3)
+    n_pixels = flat.shape[0]
+    workers = workers or os.cpu_count() or 1
+    tasks = _tiles(n_pixels, tile_size)
+
+    if workers == 1 or len(tasks) == 1:
+        values, label_ids = classify_image(flat.reshape(-1, 1, 3), rules_filename, mf_type_selected)
+        return values.reshape(out_shape), label_ids.reshape(out_shape)
+
+    specs = {
+        'rgb': ((n_pixels, 3), np.uint8),
+        'values': ((n_pixels,), np.float64),
+        'labels': ((n_pixels,), np.int16),
+    }
+    shms, arrays = {}, {}
+    try:
+        for key, (shape, dtype) in specs.items():
+            shms[key] = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+            arrays[key] = np.ndarray(shape, dtype=dtype, buffer=shms[key].buf)
+        arrays['rgb'][:] = flat
+
+        buffers = {key: (shms[key].name, specs[key][0], specs[key][1]) for key in specs}
+        with Pool(workers, initializer=_init_worker,
+                  initargs=(buffers, rules_filename, mf_type_selected)) as pool:
+            for _ in pool.starmap(_classify_tile, tasks):
+                pass
+
+        values = arrays['values'].copy().reshape(out_shape)
+        label_ids = arrays['labels'].copy().reshape(out_shape)
+    finally:
+        arrays.clear()
+        for shm in shms.values():
+            shm.close()
+            shm.unlink()
+
+    return values, label_ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clasificación fuzzy en paralelo para imágenes o volcados RGB grandes.")
+    parser.add_argument('input', help="Imagen o arreglo .npy (H, W, 3) o (N, 3)")
+    parser.add_argument('--rules', default='rules_100.json', help="Archivo de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument('--tile-size', type=int, default=DEFAULT_TILE_SIZE, help="Píxeles por tile")
+    parser.add_argument('--out', default=None, help="Prefijo de salida (por defecto, junto a la entrada)")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    data = np.load(args.input) if args.input.lower().endswith('.npy') else load_image(args.input)
+
+    start = time.perf_counter()
+    values, label_ids = classify_parallel(data, args.rules, mf_type, args.workers, args.tile_size)
+    elapsed = time.perf_counter() - start
+
+    out = args.out or os.path.splitext(args.input)[0] + '_fuzzy'
+    np.save(out + '_values.npy', values)
+    np.save(out + '_labels.npy', label_ids)
+    print(f"{values.size} píxeles en {elapsed:.2f} s ({values.size / elapsed:,.0f} px/s)")
+    print(f"Resultados guardados en {out}_values.npy y {out}_labels.npy")
@@ -0,0 +1,109 @@
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from fuzzy_core import MF_TYPES, RESOLUTION_PROFILES, classify_batch, compile_ruleset, run_engine
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+REFERENCE = 'reference'
+
+
+def rgb_grid(step=17):
+    """Malla RGB regular con paso `step` por canal (17 → 16³ = 4096 colores, incluidos 0 y 255)."""
+    axis = np.arange(0, 256, step)
+    return np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+
+
+def deviation(values, reference):
+    """Diferencia máxima y media frente a la referencia, más las filas donde solo uno de los dos es NaN."""
+    both = ~(np.isnan(values) | np.isnan(reference))
+    diff = np.abs(values[both] - reference[both])
+    return {
+        'max_abs_diff': float(diff.max()) if diff.size else 0.0,
+        'mean_abs_diff': float(diff.mean()) if diff.size else 0.0,
+        'nan_mismatches': int((np.isnan(values) != np.isnan(reference)).sum()),
+    }
+
+
+def profile_report(rules_filename, mf_type_selected, rgb, profiles=None, repeat=3):
+    """
+    Mide cada perfil de resolución frente a REFERENCE sobre los colores `rgb`.
+
+    Devuelve [dict] con el perfil, el tamaño de sus universos, las
+    desviaciones del valor defuzzificado y el tiempo por muestra de
+    classify_batch (mejor de `repeat`, con el sistema ya compilado).
+    """
+    profiles = profiles or list(RESOLUTION_PROFILES)
+    reference = classify_batch(rules_filename, rgb, mf_type_selected, resolution=REFERENCE)
+
+    report = []
+    for resolution in profiles:
+        compiled = compile_ruleset(rules_filename, mf_type_selected, resolution)
+        best = np.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            values = classify_batch(rules_filename, rgb, mf_type_selected, resolution=resolution)
+            best = min(best, time.perf_counter() - start)
+        report.append({
+            'resolution': resolution,
+            'color_points': len(compiled.x_color),
+            'output_points': len(compiled.x_output),
+            'us_per_sample': best / len(rgb) * 1e6,
+            **deviation(values, reference),
+        })
+    return report
+
+
+def cheapest_profile(report, tolerance):
+    """Perfil más rápido cuya desviación máxima no supera `tolerance` (None si ninguno la cumple)."""
+    valid = [r for r in report if r['max_abs_diff'] <= tolerance and not r['nan_mismatches']
+             and r['resolution'] != REFERENCE]
+    return min(valid, key=lambda r: r['us_per_sample'])['resolution'] if valid else None
+
+
+def check_skfuzzy(rules_filename, mf_type_selected, resolution, samples=50, seed=0):
+    """Diferencia máxima entre los motores NumPy y skfuzzy con el mismo perfil, sobre colores aleatorios."""
+    worst = 0.0
+    for rgb in np.random.default_rng(seed).integers(0, 256, (samples, 3)):
+        # Los avisos de "ninguna regla se activó" no aportan nada aquí
+        with contextlib.redirect_stdout(io.StringIO()):
+            a = run_engine('skfuzzy', rules_filename, *map(int, rgb), mf_type_selected, resolution)
+            b = run_engine('numpy', rules_filename, *map(int, rgb), mf_type_selected, resolution)
+        if a and b and a[0] is not None and b[0] is not None:
+            worst = max(worst, abs(a[0] - b[0]))
+    return worst
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precisión y velocidad de cada perfil de resolución de los universos.")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--profiles', nargs='*', choices=list(RESOLUTION_PROFILES), default=None,
+                        help="Perfiles a medir (por defecto, todos)")
+    parser.add_argument('--grid-step', type=int, default=17, help="Paso por canal de la malla RGB de prueba")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="Desviación máxima admitida; recomienda el perfil más barato que la cumple")
+    parser.add_argument('--check-skfuzzy', action='store_true',
+                        help="Comprobar además que el motor NumPy coincide con skfuzzy en cada perfil")
+    args = parser.parse_args()
+
+    rgb = rgb_grid(args.grid_step)
+    print(f"{len(rgb)} colores de prueba, referencia '{REFERENCE}' {RESOLUTION_PROFILES[REFERENCE]}")
+    for rules_filename in args.rules:
+        for mf_type in MF_TYPES:
+            print(f"\n{rules_filename} — {mf_type}")
+            report = profile_report(rules_filename, mf_type, rgb, args.profiles)
+            for r in report:
+                line = (f"  {r['resolution']:<10} {r['color_points']:>5} × {r['output_points']:<5} "
+                        f"máx {r['max_abs_diff']:.4f}  media {r['mean_abs_diff']:.4f}  "
+                        f"{r['us_per_sample']:.2f} µs/muestra")
+                if r['nan_mismatches']:
+                    line += f"  ⚠️ {r['nan_mismatches']} NaN distintos"
+                if args.check_skfuzzy:
+                    line += f"  skfuzzy Δ {check_skfuzzy(rules_filename, mf_type, r['resolution']):.2e}"
+                print(line)
+            if args.tolerance is not None:
+                best = cheapest_profile(report, args.tolerance)
+                print(f"  → {best}" if best else f"  ⚠️ Ningún perfil cumple la tolerancia {args.tolerance}")
@@ -0,0 +1,421 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from fuzzy_numpy import (
+    EXACT_DEFUZZ_METHODS, MF_TYPES, SUGENO_CONSTANTS, SYSTEM_CACHE_SIZE, classify_batch, compile_ruleset
+)
+from fuzzy_metrics import snapshot as stage_metrics
+from rules_loader import REPORT_SUFFIX, RULES_DIR
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8060
+DEFAULT_QUEUE_SIZE = 32          # peticiones en espera además de las que se están ejecutando
+MAX_BODY_BYTES = 64 * 1024 * 1024
+STATS_WINDOW = 1000              # últimas peticiones usadas para latencias y rendimiento
+BINARY_TYPE = 'application/octet-stream'
+
+
+def available_rulesets():
+    """Archivos .json de RULES_DIR (sin los informes de fuzzy_minimize), ordenados."""
+    try:
+        return sorted(f for f in os.listdir(RULES_DIR) if f.endswith('.json') and not f.endswith(REPORT_SUFFIX))
+    except OSError:
+        return []
+
+
+def resolve_mf_type(name):
+    """Nombre completo de MF_TYPES a partir de 'trimf', 'trapmf' o el nombre completo exactos (None si no existe)."""
+    if not isinstance(name, str):
+        return None
+    # El tag es lo que va entre paréntesis: 'Triangular (trimf)' -> 'trimf'
+    return next((t for t in MF_TYPES if name == t or name == t[t.rfind('(') + 1:-1]), None)
+
+
+def _option(params, key, choices):
+    """Valor de una opción de texto (None si falta o está vacía); ValueError si no es uno de `choices`."""
+    value = params.get(key)
+    if value is None or value == '':
+        return None
+    if not isinstance(value, str) or value not in choices:
+        raise ValueError(f"'{key}' debe ser uno de {', '.join(choices)}")
+    return value
+
+
+# --- ESTADÍSTICAS ---
+
+class ServiceStats:
+    """Contadores y ventana de latencias de las últimas STATS_WINDOW peticiones, protegidos por un lock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = self.rows = self.errors = self.rejected = 0
+        self.recent = deque(maxlen=STATS_WINDOW)  # (fin, latencia_s, espera_s, filas)
+
+    def record(self, latency, wait, rows):
+        with self.lock:
+            self.requests += 1
+            self.rows += rows
+            self.recent.append((time.time(), latency, wait, rows))
+
+    def count(self, field):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            recent = list(self.recent)
+            snapshot = {'uptime_s': time.time() - self.started, 'requests': self.requests, 'rows': self.rows,
+                        'errors': self.errors, 'rejected': self.rejected}
+
+        if recent:
+            ends, latency, wait, rows = (np.array(col, dtype=float) for col in zip(*recent))
+            span = max(ends[-1] - (ends[0] - latency[0]), 1e-9)
+            snapshot['window'] = {
+                'requests': len(recent),
+                'latency_ms': {f'p{q}': float(np.percentile(latency, q) * 1e3) for q in (50, 95, 99)},
+                'latency_mean_ms': float(latency.mean() * 1e3),
+                'queue_wait_mean_ms': float(wait.mean() * 1e3),
+                'rows_per_s': float(rows.sum() / span),
+                'requests_per_s': float(len(recent) / span),
+            }
+        return snapshot
+
+
+# --- POOL DE TRABAJADORES CON COLA ACOTADA ---
+
+class ClassifierPool:
+    """
+    ThreadPoolExecutor con admisión acotada: como mucho workers + queue_size
+    peticiones dentro a la vez. Cuando está lleno, submit devuelve None en
+    lugar de encolar, y el servicio responde 503 (contrapresión).
+
+    Se usan hilos porque el trabajo pesado de classify_batch ocurre en NumPy y
+    los sistemas compilados se comparten por la caché de fuzzy_numpy.
+    """
+
+    def __init__(self, workers, queue_size=DEFAULT_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fuzzy-worker')
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.lock = threading.Lock()
+        self.inside = 0
+
+    def submit(self, fn, *args, **kwargs):
+        if not self.slots.acquire(blocking=False):
+            return None
+        with self.lock:
+            self.inside += 1
+        future = self.executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self.lock:
+            self.inside -= 1
+        self.slots.release()
+
+    def load(self):
+        """Peticiones ejecutándose y en espera."""
+        with self.lock:
+            inside = self.inside
+        return {'workers': self.workers, 'queue_size': self.queue_size,
+                'running': min(inside, self.workers), 'queued': max(0, inside - self.workers)}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def preload(rulesets, mf_types=MF_TYPES):
+    """Compila de antemano cada (ruleset, tipo de MF) para que la primera petición no pague la construcción."""
+    if len(rulesets) * len(mf_types) > SYSTEM_CACHE_SIZE:
+        print(f"⚠️ {len(rulesets) * len(mf_types)} sistemas no caben en la caché ({SYSTEM_CACHE_SIZE}); "
+              f"algunos se recompilarán bajo demanda")
+    loaded = []
+    for rules_filename in rulesets:
+        for mf_type in mf_types:
+            compile_ruleset(rules_filename, mf_type)
+            loaded.append((rules_filename, mf_type))
+    return loaded
+
+
+# --- PETICIONES ---
+
+def parse_classify_request(body, content_type, query):
+    """
+    Convierte el cuerpo de POST /classify en (rgb, opciones) o lanza ValueError con el motivo.
+
+    - JSON: {"rgb": [[R, G, B], ...], "rules": "rules_30.json", "mf": "trimf",
+      "labels": false, "sugeno": null, "exact": null}.
+    - Binario (application/octet-stream): N×3 bytes uint8 R,G,B seguidos; las
+      opciones van en la query (?rules=...&mf=...&labels=1&sugeno=...&exact=...).
+
+    Cada opción se comprueba con su tipo; 'sugeno' y 'exact' son excluyentes
+    y R, G, B deben estar entre 0 y 255 (no se saturan).
+    """
+    if content_type == BINARY_TYPE:
+        if len(body) % 3:
+            raise ValueError("El cuerpo binario debe tener N×3 bytes (R, G, B uint8)")
+        rgb = np.frombuffer(body, dtype=np.uint8).reshape(-1, 3)
+        params = {key: values[-1] for key, values in query.items()}
+        params['labels'] = params.get('labels', '').lower() in ('1', 'true', 'yes')
+    else:
+        try:
+            params = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido: {e}")
+        if not isinstance(params, dict):
+            raise ValueError("El cuerpo JSON debe ser un objeto")
+        try:
+            rgb = np.asarray(params.get('rgb', []), dtype=float)
+        except (TypeError, ValueError):
+            rgb = None
+        if rgb is not None and rgb.size == 0:
+            rgb = rgb.reshape(0, 3)
+        if rgb is None or rgb.ndim != 2 or rgb.shape[1] != 3 or not np.isfinite(rgb).all():
+            raise ValueError("'rgb' debe ser una lista de tripletas numéricas [R, G, B]")
+        if ((rgb < 0) | (rgb > 255)).any():
+            raise ValueError("Los valores de 'rgb' deben estar entre 0 y 255")
+        if params.get('labels') is not None and not isinstance(params['labels'], bool):
+            raise ValueError("'labels' debe ser true o false")
+
+    # Solo la ausencia (o '') toma el valor por defecto: [], 0 o false son errores
+    rules_filename = params.get('rules') if params.get('rules') not in (None, '') else 'rules_100.json'
+    if not isinstance(rules_filename, str) or rules_filename not in available_rulesets():
+        raise ValueError(f"Ruleset desconocido: {rules_filename} (usa {', '.join(available_rulesets())})")
+    mf_type = resolve_mf_type(params.get('mf') if params.get('mf') not in (None, '') else 'trimf')
+    if mf_type is None:
+        raise ValueError(f"Tipo de MF desconocido: {params.get('mf')} (usa trimf o trapmf)")
+    sugeno = _option(params, 'sugeno', list(SUGENO_CONSTANTS))
+    exact = _option(params, 'exact', list(EXACT_DEFUZZ_METHODS))
+    if sugeno and exact:
+        raise ValueError("'sugeno' y 'exact' no se pueden combinar")
+
+    return rgb, {'rules_filename': rules_filename, 'mf_type_selected': mf_type,
+                 'return_labels': bool(params.get('labels')), 'sugeno': sugeno, 'exact': exact}
+
+
+def run_classify(rgb, options, queued_at):
+    """Tarea del pool: devuelve (valores, etiquetas o None, espera en cola en segundos)."""
+    wait = time.perf_counter() - queued_at
+    result = classify_batch(options['rules_filename'], rgb, options['mf_type_selected'],
+                            return_labels=options['return_labels'],
+                            sugeno=options['sugeno'], exact=options['exact'])
+    values, labels = result if options['return_labels'] else (result, None)
+    return values, labels, wait
+
+
+class ClassifierHandler(BaseHTTPRequestHandler):
+    """GET /stats, GET /metrics, GET /health y POST /classify. El pool y las estadísticas viven en el servidor."""
+
+    server_version = 'FuzzyClassifier/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, allow_nan=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.server.stats.count('errors' if status != 503 else 'rejected')
+        self.send_json(status, {'error': message}, headers)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/stats':
+            self.send_json(200, {**self.server.stats.snapshot(), 'pool': self.server.pool.load()})
+        elif path == '/metrics':
+            # Tiempos por etapa del motor (compilación, classify_batch...)
+            self.send_json(200, stage_metrics())
+        elif path == '/health':
+            self.send_json(200, {'status': 'ok', 'preloaded': [list(item) for item in self.server.preloaded]})
+        else:
+            self.send_error_json(404, f"Ruta desconocida: {path}")
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path != '/classify':
+            self.send_error_json(404, f"Ruta desconocida: {url.path}")
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error_json(400, f"Content-Length inválido: {self.headers.get('Content-Length')}")
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_error_json(413, f"Cuerpo demasiado grande ({length} bytes, máximo {MAX_BODY_BYTES})")
+            return
+        body = self.rfile.read(length)
+        content_type = (self.headers.get('Content-Type') or 'application/json').split(';')[0].strip()
+        binary_response = BINARY_TYPE in (self.headers.get('Accept') or '')
+
+        try:
+            rgb, options = parse_classify_request(body, content_type, parse_qs(url.query))
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        if binary_response and options['return_labels']:
+            self.send_error_json(400, "Las etiquetas solo se devuelven en JSON; quita 'labels' o el Accept binario")
+            return
+
+        future = self.server.pool.submit(run_classify, rgb, options, time.perf_counter())
+        if future is None:
+            self.send_error_json(503, "Servicio saturado: la cola de peticiones está llena", {'Retry-After': '1'})
+            return
+        try:
+            values, labels, wait = future.result()
+        except Exception as e:
+            self.send_error_json(500, f"Error en computación fuzzy: {e}")
+            return
+
+        if binary_response:
+            # float64 little-endian, NaN donde ninguna regla se activa
+            payload = values.astype('<f8').tobytes()
+            self.send_response(200)
+            self.send_header('Content-Type', BINARY_TYPE)
+            self.send_header('Content-Length', str(len(payload)))
+            self.send_header('X-Rows', str(len(values)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            result = {'rules': options['rules_filename'], 'mf_type': options['mf_type_selected'],
+                      'values': [None if np.isnan(v) else float(v) for v in values]}
+            if labels is not None:
+                result['labels'] = labels.tolist()
+            self.send_json(200, result)
+
+        self.server.stats.record(time.perf_counter() - start, wait, len(values))
+
+
+class ClassifierServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer con el pool de clasificación, las estadísticas y los sistemas precargados."""
+
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, queue_size=DEFAULT_QUEUE_SIZE, rulesets=None, verbose=False):
+        self.pool = ClassifierPool(workers or os.cpu_count() or 1, queue_size)
+        self.stats = ServiceStats()
+        self.verbose = verbose
+        self.preloaded = preload(rulesets if rulesets is not None else available_rulesets())
+        super().__init__(address, ClassifierHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+# Peticiones a POST /classify que deben responder 400 (cuerpo JSON)
+BAD_REQUESTS = {
+    "sugeno + exact + labels": {'sugeno': 'centroid', 'exact': 'centroid', 'labels': True},
+    "mf parcial 'f'": {'mf': 'f'},
+    "mf parcial 'mf'": {'mf': 'mf'},
+    "mf no texto": {'mf': 3},
+    "mf lista": {'mf': ['trimf']},
+    "sugeno lista": {'sugeno': ['centroid']},
+    "exact objeto": {'exact': {'method': 'centroid'}},
+    "labels lista": {'labels': [1]},
+    "rules lista": {'rules': ['rules_30.json']},
+    "rgb con objetos": {'rgb': [[1, {}, 3]]},
+    "rgb negativo": {'rgb': [[-500, 30, 40]]},
+    "rgb mayor que 255": {'rgb': [[200, 256, 40]]},
+}
+
+# Valores de Content-Length que deben responder 400
+BAD_CONTENT_LENGTHS = ['abc', '-5']
+
+
+def request_checks(rules_filename='rules_30.json'):
+    """
+    Levanta el servicio en un puerto libre y envía BAD_REQUESTS, los
+    BAD_CONTENT_LENGTHS y una petición válida:
+    [(caso, None si responde lo esperado o el motivo del fallo)].
+    """
+    import http.client
+    import urllib.error
+    import urllib.request
+
+    server = ClassifierServer(('127.0.0.1', 0), workers=1, rulesets=[rules_filename])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/classify"
+
+    def status(payload):
+        request = urllib.request.Request(url, json.dumps(payload).encode(), {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    base = {'rgb': [[200, 30, 40]], 'rules': rules_filename}
+    try:
+        checks = [(f"{case} -> 400", None if (code := status({**base, **extra})) == 400 else f"respondió {code}")
+                  for case, extra in BAD_REQUESTS.items()]
+        code = status({**base, 'mf': 'trapmf', 'sugeno': 'peak', 'labels': True})
+        checks.append(("sugeno + labels -> 200", None if code == 200 else f"respondió {code}"))
+        for value in BAD_CONTENT_LENGTHS:
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+            connection.putrequest('POST', '/classify')
+            connection.putheader('Content-Length', value)
+            connection.endheaders()
+            code = connection.getresponse().status
+            connection.close()
+            checks.append((f"Content-Length {value!r} -> 400", None if code == 400 else f"respondió {code}"))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Servicio HTTP local de clasificación fuzzy por lotes.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Dirección de escucha (por defecto, solo localhost)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Puerto")
+    parser.add_argument('--workers', type=int, default=None, help="Hilos de clasificación (por defecto, núcleos)")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Peticiones en espera antes de responder 503")
+    parser.add_argument('--rules', nargs='*', default=None, help="Rulesets a precargar (por defecto, todos)")
+    parser.add_argument('--verbose', action='store_true', help="Registrar cada petición")
+    parser.add_argument('--check', action='store_true',
+                        help="Solo comprobar las respuestas a peticiones inválidas en un puerto libre y salir")
+    args = parser.parse_args()
+
+    if args.check:
+        problems = [(case, problem) for case, problem in request_checks() if problem]
+        for case, problem in problems:
+            print(f"⚠️ {case}: {problem}")
+        print(f"Validación de peticiones: {'fallan ' + str(len(problems)) if problems else 'todas correctas'}")
+        sys.exit(1 if problems else 0)
+
+    server = ClassifierServer((args.host, args.port), args.workers, args.queue_size, args.rules, args.verbose)
+    print(f"Servicio en http://{args.host}:{args.port} — {len(server.preloaded)} sistemas precargados, "
+          f"{server.pool.workers} hilos, cola {server.pool.queue_size}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
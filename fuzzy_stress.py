@@ -0,0 +1,179 @@
+import argparse
+import contextlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import fuzzy_metrics
+from fuzzy_core import ENGINES, MF_TYPES, classify_batch, run_engine
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+DEFAULT_MAX_GROWTH_MB = 16   # crecimiento de RSS admitido tras el calentamiento
+
+
+def rss_bytes():
+    """Memoria residente actual del proceso (bytes); en sistemas sin /proc, el máximo alcanzado."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _make_call(engine, batch):
+    """Función (archivo, tipo de MF, colores) -> resultado comparable, para una llamada del engine/lote dado."""
+    if batch > 1:
+        return lambda rules_filename, mf_type, rgb: classify_batch(rules_filename, rgb, mf_type)
+    return lambda rules_filename, mf_type, rgb: run_engine(engine, rules_filename, *map(int, rgb[0]), mf_type)[0]
+
+
+def _same(a, b):
+    if isinstance(a, np.ndarray):
+        return np.array_equal(a, b, equal_nan=True)
+    return a == b
+
+
+def stress(rules_filenames=RULESETS, mf_types=MF_TYPES, threads=16, calls=1_000_000, batch=1, engine='numpy',
+           pool_size=4096, seed=0, checkpoints=20, progress=None):
+    """
+    Llama al motor `calls` veces desde `threads` hilos y comprueba resultados y memoria.
+
+    Las entradas salen de un conjunto fijo de pool_size colores agrupados en
+    lotes de `batch` (batch == 1: una llamada por color con run_engine, como
+    los callbacks de Dash; si no, classify_batch). Los resultados esperados
+    se calculan antes en un solo hilo con la misma llamada, así que cualquier
+    diferencia, por pequeña que sea, indica estado compartido entre hilos.
+    La RSS se muestrea `checkpoints` veces; el crecimiento se mide desde la
+    primera muestra, tomada tras un calentamiento. `progress(llamadas, rss)`
+    se llama en cada muestra; la salida estándar está redirigida mientras
+    tanto, así que debe escribir en stderr.
+
+    Devuelve un diccionario con llamadas, errores (con los primeros casos),
+    llamadas/s, las muestras de RSS y el crecimiento en MB.
+    """
+    call = _make_call(engine, batch)
+    rgb = np.random.default_rng(seed).integers(0, 256, (pool_size, 3))
+    batches = [rgb[i:i + batch] for i in range(0, pool_size - batch + 1, batch)]
+    combos = [(f, mf) for f in rules_filenames for mf in mf_types]
+    # Los avisos de "ninguna regla se activó" van a /dev/null: un StringIO crecería con cada llamada
+    devnull = open(os.devnull, 'w')
+    with contextlib.redirect_stdout(devnull):
+        expected = {combo: [call(*combo, b) for b in batches] for combo in combos}
+
+    done = [0] * threads
+    mismatches, examples, lock = [0], [], threading.Lock()
+
+    def worker(t):
+        n = 0
+        for k in range(t, calls, threads):
+            combo = combos[k % len(combos)]
+            j = (k // len(combos)) % len(batches)
+            result = call(*combo, batches[j])
+            if not _same(result, expected[combo][j]):
+                with lock:
+                    mismatches[0] += 1
+                    if len(examples) < 5:
+                        examples.append((combo, batches[j][0].tolist(), result, expected[combo][j]))
+            n += 1
+            if n % 256 == 0:
+                done[t] = n
+        done[t] = n
+
+    samples = []
+    step = max(1, calls // checkpoints)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(devnull), ThreadPoolExecutor(threads) as pool:
+        futures = [pool.submit(worker, t) for t in range(threads)]
+        next_sample = step
+        while not all(f.done() for f in futures):
+            time.sleep(0.05)
+            total = sum(done)
+            if total >= next_sample:
+                samples.append((total, rss_bytes()))
+                next_sample = (total // step + 1) * step
+                if progress:
+                    progress(total, samples[-1][1])
+        for f in futures:
+            f.result()
+    elapsed = time.perf_counter() - start
+    samples.append((calls, rss_bytes()))
+    devnull.close()
+
+    rss = [r for _, r in samples]
+    return {
+        'calls': calls,
+        'threads': threads,
+        'batch': batch,
+        'engine': engine,
+        'mismatches': mismatches[0],
+        'first_mismatches': [(list(c), p, repr(r), repr(e)) for c, p, r, e in examples],
+        'calls_per_s': calls / elapsed,
+        'seconds': elapsed,
+        'rss_samples': samples,
+        'rss_growth_mb': (rss[-1] - rss[0]) / 2 ** 20,
+    }
+
+
+def throughput(threads, calls, batch=1024, rules_filename='rules_100.json', mf_type=MF_TYPES[0], seed=0):
+    """Colores por segundo de classify_batch repartiendo `calls` llamadas de `batch` colores entre `threads` hilos."""
+    rgb = np.random.default_rng(seed).integers(0, 256, (batch, 3))
+    classify_batch(rules_filename, rgb, mf_type)
+
+    def worker(n):
+        for _ in range(n):
+            classify_batch(rules_filename, rgb, mf_type)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, [calls // threads] * threads))
+    return calls // threads * threads * batch / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente: resultados idénticos y memoria estable.")
+    parser.add_argument('--calls', type=int, default=1_000_000, help="Llamadas en total")
+    parser.add_argument('--threads', type=int, default=16, help="Hilos")
+    parser.add_argument('--batch', type=int, default=1,
+                        help="Colores por llamada (1: run_engine por punto; >1: classify_batch)")
+    parser.add_argument('--engine', choices=ENGINES, default='numpy', help="Motor para las llamadas de un punto")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--max-growth', type=float, default=DEFAULT_MAX_GROWTH_MB,
+                        help="Crecimiento de RSS admitido (MB) tras el calentamiento")
+    parser.add_argument('--no-metrics', action='store_true', help="Desactivar fuzzy_metrics durante la prueba")
+    parser.add_argument('--scaling', nargs='*', type=int, default=None, metavar='HILOS',
+                        help="En lugar de la prueba, medir el rendimiento de classify_batch con estos hilos")
+    args = parser.parse_args()
+
+    if args.no_metrics:
+        fuzzy_metrics.set_enabled(False)
+
+    if args.scaling is not None:
+        base = None
+        for threads in args.scaling or [1, 2, 4, 8]:
+            rate = throughput(threads, max(threads, args.calls // 1000), max(args.batch, 1024))
+            base = base or rate
+            print(f"{threads:>3} hilos: {rate / 1e3:9.1f} k colores/s  ({rate / base:.2f}x)")
+        raise SystemExit(0)
+
+    r = stress(args.rules, MF_TYPES, args.threads, args.calls, args.batch, args.engine,
+               progress=lambda n, rss: print(f"  {n:>9} llamadas  RSS {rss / 2 ** 20:8.1f} MB", file=sys.stderr))
+    print(f"{r['calls']} llamadas ({r['engine']}, lote {r['batch']}) en {r['threads']} hilos: "
+          f"{r['seconds']:.1f} s, {r['calls_per_s']:.0f} llamadas/s, "
+          f"RSS {r['rss_samples'][0][1] / 2 ** 20:.1f} → {r['rss_samples'][-1][1] / 2 ** 20:.1f} MB "
+          f"({r['rss_growth_mb']:+.1f} MB)")
+
+    failed = False
+    if r['mismatches']:
+        failed = True
+        print(f"⚠️ {r['mismatches']} resultados distintos de los esperados, p. ej.:")
+        for combo, rgb, got, want in r['first_mismatches']:
+            print(f"   {combo} {rgb}: {got} en lugar de {want}")
+    if r['rss_growth_mb'] > args.max_growth:
+        failed = True
+        print(f"⚠️ La memoria creció {r['rss_growth_mb']:.1f} MB (máximo {args.max_growth} MB)")
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,118 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from fuzzy_numpy import MF_TYPES, SUGENO_CONSTANTS, classify_batch
+
+RULESETS = ['rules_30.json', 'rules_60.json', 'rules_100.json']
+
+
+def drift_report(rules_filename, mf_type_selected, constant='centroid', samples=20000, seed=0, tolerance=1.0):
+    """
+    Compara el modo Sugeno de orden cero con el Mamdani (centroide de skfuzzy) sobre colores aleatorios.
+
+    Devuelve un diccionario con la diferencia máxima, media y el percentil 95,
+    la fracción de colores cuya diferencia no supera `tolerance`, el color con
+    mayor diferencia (con ambos valores) y el tiempo por muestra de cada modo.
+    """
+    rgb = np.random.default_rng(seed).integers(0, 256, (samples, 3))
+    # Compila (y deja en caché) el ruleset antes de medir
+    classify_batch(rules_filename, rgb[:1], mf_type_selected)
+
+    start = time.perf_counter()
+    mamdani = classify_batch(rules_filename, rgb, mf_type_selected)
+    mamdani_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sugeno = classify_batch(rules_filename, rgb, mf_type_selected, sugeno=constant)
+    sugeno_s = time.perf_counter() - start
+
+    both = ~(np.isnan(mamdani) | np.isnan(sugeno))
+    diff = np.where(both, np.abs(sugeno - mamdani), 0.0)
+    worst = int(np.argmax(diff))
+    return {
+        'rules_filename': rules_filename,
+        'mf_type': mf_type_selected,
+        'constant': constant,
+        'samples': samples,
+        'nan_mismatches': int((np.isnan(mamdani) != np.isnan(sugeno)).sum()),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff[both].mean()) if both.any() else 0.0,
+        'p95_abs_diff': float(np.percentile(diff[both], 95)) if both.any() else 0.0,
+        'within_tolerance': float((diff[both] <= tolerance).mean()) if both.any() else 1.0,
+        'worst_rgb': [int(v) for v in rgb[worst]],
+        'worst_mamdani': float(mamdani[worst]),
+        'worst_sugeno': float(sugeno[worst]),
+        'mamdani_us': mamdani_s / samples * 1e6,
+        'sugeno_us': sugeno_s / samples * 1e6,
+    }
+
+
+def _raises(fn, error=ValueError):
+    """None si fn() lanza `error`; si no, la descripción de lo que pasó."""
+    try:
+        fn()
+    except error:
+        return None
+    except Exception as e:
+        return f"lanzó {type(e).__name__}: {e}"
+    return "no lanzó error"
+
+
+def option_checks(rules_filename=RULESETS[0], mf_type_selected=MF_TYPES[0], rgb=None):
+    """
+    Combinaciones de opciones de classify_batch: [(caso, None si se cumple o el motivo del fallo)].
+
+    Los modos Sugeno y exacto son excluyentes (ValueError), y con sugeno las
+    etiquetas y activaciones pedidas son las mismas que en el modo Mamdani.
+    """
+    rgb = np.random.default_rng(0).integers(0, 256, (50, 3)) if rgb is None else rgb
+    checks = [
+        ("sugeno + exact + labels lanza ValueError",
+         _raises(lambda: classify_batch(rules_filename, rgb, mf_type_selected, return_labels=True,
+                                        exact='centroid', sugeno='centroid'))),
+        ("sugeno + exact lanza ValueError",
+         _raises(lambda: classify_batch(rules_filename, rgb, mf_type_selected, exact='centroid', sugeno='peak'))),
+    ]
+
+    _, labels, strengths = classify_batch(rules_filename, rgb, mf_type_selected, True, True, chunk_size=7)
+    values = classify_batch(rules_filename, rgb, mf_type_selected, chunk_size=7, sugeno='centroid')
+    sugeno_values, sugeno_labels, sugeno_strengths = classify_batch(
+        rules_filename, rgb, mf_type_selected, True, True, chunk_size=7, sugeno='centroid')
+    same = (np.array_equal(values, sugeno_values, equal_nan=True) and np.array_equal(labels, sugeno_labels)
+            and np.array_equal(strengths, sugeno_strengths))
+    checks.append(("sugeno + labels + strengths coincide con Mamdani", None if same else "resultados distintos"))
+    return checks
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Desviación del modo Sugeno de orden cero frente al Mamdani.")
+    parser.add_argument('--rules', nargs='*', default=RULESETS, help="Archivos de reglas en rules_data")
+    parser.add_argument('--constant', nargs='*', choices=list(SUGENO_CONSTANTS), default=list(SUGENO_CONSTANTS),
+                        help="Constante de cada etiqueta de salida")
+    parser.add_argument('--samples', type=int, default=20000, help="Colores aleatorios por combinación")
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help="Diferencia admitida para el porcentaje de colores 'dentro'")
+    parser.add_argument('--check', action='store_true',
+                        help="Solo comprobar las combinaciones de opciones de classify_batch (sale con 1 si falla)")
+    args = parser.parse_args()
+
+    if args.check:
+        problems = [(case, problem) for case, problem in option_checks() if problem]
+        for case, problem in problems:
+            print(f"⚠️ {case}: {problem}")
+        print(f"Opciones de classify_batch: {'fallan ' + str(len(problems)) if problems else 'todas correctas'}")
+        sys.exit(1 if problems else 0)
+
+    for rules_filename in args.rules:
+        for mf_type in MF_TYPES:
+            for constant in args.constant:
+                r = drift_report(rules_filename, mf_type, constant, args.samples, tolerance=args.tolerance)
+                print(f"{rules_filename:<15} {mf_type:<21} {constant:<9} "
+                      f"máx {r['max_abs_diff']:.3f}  media {r['mean_abs_diff']:.3f}  p95 {r['p95_abs_diff']:.3f}  "
+                      f"dentro {r['within_tolerance']:.1%}  "
+                      f"peor {tuple(r['worst_rgb'])}: {r['worst_sugeno']:.2f} vs {r['worst_mamdani']:.2f}  "
+                      f"sugeno {r['sugeno_us']:.2f} µs  mamdani {r['mamdani_us']:.2f} µs"
+                      + (f"  ⚠️ {r['nan_mismatches']} NaN distintos" if r['nan_mismatches'] else ""))
@@ -0,0 +1,236 @@
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+
+from fuzzy_image import NO_LABEL, classify_image, pack_rgb, unpack_rgb
+from fuzzy_numpy import MF_TYPES, OUTPUT_LABELS, classify_batch
+
+DEFAULT_MEMO_SIZE = 1 << 16   # entradas del memo RGB -> salida (potencia de 2)
+LATENCY_WINDOW = 1000          # últimos fotogramas usados para los percentiles de latencia
+EMPTY_KEY = np.uint32(0xFFFFFFFF)  # ningún color empaquetado 0xRRGGBB llega a este valor
+HASH_MULTIPLIER = np.uint64(2654435761)  # hash multiplicativo de Knuth sobre 32 bits
+
+
+class StreamClassifier:
+    """
+    Clasificador con estado para una secuencia de fotogramas (H, W, 3) uint8.
+
+    Guarda el último fotograma clasificado y sus mapas de salida; en cada
+    fotograma nuevo solo se vuelven a clasificar los píxeles que cambiaron
+    (con `tolerance` > 0, los que se alejan más de esa cantidad en algún canal
+    del color con el que se clasificaron por última vez). Los colores de esos
+    píxeles se buscan antes en un memo acotado RGB -> (salida, etiqueta) de
+    tabla directa: cada color tiene una sola casilla y el más reciente
+    reemplaza al anterior, así que el memo no crece con el vídeo. Solo los
+    colores que no están en el memo pasan por classify_batch.
+
+    Con tolerance = 0 la salida es idéntica a clasificar cada fotograma
+    entero; con tolerance > 0 un píxel conserva la salida de su color de
+    referencia mientras no se aleje más de la tolerancia.
+    """
+
+    def __init__(self, rules_filename, mf_type_selected, tolerance=0, memo_size=DEFAULT_MEMO_SIZE):
+        if memo_size < 1 or memo_size & (memo_size - 1):
+            raise ValueError(f"memo_size debe ser una potencia de 2: {memo_size}")
+        self.rules_filename = rules_filename
+        self.mf_type = mf_type_selected
+        self.tolerance = int(tolerance)
+        self.memo_bits = memo_size.bit_length() - 1
+        self.memo_keys = np.full(memo_size, EMPTY_KEY, dtype=np.uint32)
+        self.memo_values = np.empty(memo_size, dtype=float)
+        self.memo_labels = np.empty(memo_size, dtype=np.int16)
+        self.label_index = {label: i for i, label in enumerate(OUTPUT_LABELS)}
+        self.reset()
+
+    def reset(self):
+        """Olvida el fotograma anterior y las estadísticas (el memo se conserva)."""
+        self.reference = None
+        self.values = None
+        self.label_ids = None
+        self.frames = 0
+        self.pixels = 0
+        self.changed_pixels = 0
+        self.lookups = 0
+        self.memo_hits = 0
+        # Ventana acotada: un flujo en vivo no termina; media y máximo son acumulados
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _slots(self, keys):
+        hashed = (keys.astype(np.uint64) * HASH_MULTIPLIER) & np.uint64(0xFFFFFFFF)
+        return (hashed >> np.uint64(32 - self.memo_bits)).astype(np.intp)
+
+    def _classify_colors(self, keys):
+        """Salidas y etiquetas para colores empaquetados únicos, pasando por el memo. Devuelve también los aciertos."""
+        slots = self._slots(keys)
+        hit = self.memo_keys[slots] == keys
+        values = np.where(hit, self.memo_values[slots], np.nan)
+        label_ids = np.where(hit, self.memo_labels[slots], NO_LABEL).astype(np.int16)
+
+        miss = ~hit
+        if miss.any():
+            new_values, new_labels = classify_batch(self.rules_filename, unpack_rgb(keys[miss]), self.mf_type,
+                                                    return_labels=True)
+            new_ids = np.array([self.label_index.get(label, NO_LABEL) for label in new_labels], dtype=np.int16)
+            values[miss], label_ids[miss] = new_values, new_ids
+            # Dos colores nuevos en la misma casilla: se queda el último (como cualquier reemplazo)
+            self.memo_keys[slots[miss]] = keys[miss]
+            self.memo_values[slots[miss]] = new_values
+            self.memo_labels[slots[miss]] = new_ids
+        return values, label_ids, int(hit.sum())
+
+    def classify(self, frame):
+        """
+        Clasifica un fotograma (H, W, 3) y devuelve (valores, etiquetas, estadísticas).
+
+        valores y etiquetas son los mapas (H, W) completos, como classify_image;
+        son los arreglos internos del clasificador, así que hay que copiarlos si
+        se quieren conservar después del siguiente fotograma. estadísticas
+        indica los píxeles cambiados, los colores distintos entre ellos, los
+        aciertos del memo y la latencia (s).
+        """
+        start = time.perf_counter()
+        frame = np.ascontiguousarray(np.asarray(frame)[..., :3], dtype=np.uint8)
+        height, width = frame.shape[:2]
+
+        if self.reference is None or self.reference.shape != frame.shape:
+            # Primer fotograma (o cambio de resolución): se clasifica entero
+            self.reference = frame.copy()
+            self.values = np.empty((height, width), dtype=float)
+            self.label_ids = np.empty((height, width), dtype=np.int16)
+            changed = np.arange(height * width)
+        else:
+            # |a - b| en uint8 sin desbordar; comparar canal a canal es varias
+            # veces más rápido que .any(axis=2) sobre el último eje de tamaño 3
+            spread = np.maximum(frame, self.reference)
+            spread -= np.minimum(frame, self.reference)
+            changed = np.flatnonzero((spread[..., 0] > self.tolerance) | (spread[..., 1] > self.tolerance)
+                                     | (spread[..., 2] > self.tolerance))
+
+        pixels = frame.reshape(-1, 3)[changed]
+        n_colors = hits = 0
+        if pixels.shape[0]:
+            keys, inverse = np.unique(pack_rgb(pixels), return_inverse=True)
+            values, label_ids, hits = self._classify_colors(keys)
+            inverse = inverse.reshape(-1)
+            self.values.reshape(-1)[changed] = values[inverse]
+            self.label_ids.reshape(-1)[changed] = label_ids[inverse]
+            # La referencia solo avanza en los píxeles reclasificados, así un
+            # cambio lento no se escapa acumulando pasos por debajo de la tolerancia
+            self.reference.reshape(-1, 3)[changed] = pixels
+            n_colors = keys.shape[0]
+
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.pixels += height * width
+        self.changed_pixels += pixels.shape[0]
+        self.lookups += n_colors
+        self.memo_hits += hits
+        self.latencies.append(elapsed)
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        stats = {'changed_pixels': pixels.shape[0], 'colors': n_colors, 'memo_hits': hits, 'latency_s': elapsed}
+        return self.values, self.label_ids, stats
+
+    def stats(self):
+        """
+        Estadísticas acumuladas: fotogramas, fracción de píxeles cambiados,
+        aciertos del memo y latencias (ms). La media y el máximo cubren todos
+        los fotogramas; p50 y p95, los últimos LATENCY_WINDOW.
+        """
+        latencies = np.array(self.latencies) * 1e3 if self.latencies else np.zeros(1)
+        return {
+            'frames': self.frames,
+            'changed_fraction': self.changed_pixels / self.pixels if self.pixels else 0.0,
+            'memo_hit_rate': self.memo_hits / self.lookups if self.lookups else 0.0,
+            'memo_fill': float((self.memo_keys != EMPTY_KEY).mean()),
+            'latency_mean_ms': self.latency_total / self.frames * 1e3 if self.frames else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p95_ms': float(np.percentile(latencies, 95)),
+            'latency_max_ms': self.latency_max * 1e3,
+        }
+
+
+def classify_frames(frames, rules_filename, mf_type_selected, tolerance=0, memo_size=DEFAULT_MEMO_SIZE):
+    """
+    Clasifica los fotogramas de cualquier iterador con un StreamClassifier.
+
+    Genera (valores, etiquetas, estadísticas) por fotograma; los mapas se
+    copian para que el consumidor pueda guardarlos.
+    """
+    classifier = StreamClassifier(rules_filename, mf_type_selected, tolerance, memo_size)
+    for frame in frames:
+        values, label_ids, stats = classifier.classify(frame)
+        yield values.copy(), label_ids.copy(), stats
+
+
+def synthetic_frames(n_frames, height=480, width=640, box=64, noise=0, seed=0):
+    """
+    Escena de prueba: fondo fijo con un cuadrado de color que se mueve y, con
+    noise > 0, ruido de sensor de ±noise por canal en cada fotograma.
+    """
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8)
+    background = np.repeat(np.repeat(background, 16, axis=0), 16, axis=1)
+    background = np.pad(background, ((0, height - background.shape[0]), (0, width - background.shape[1]), (0, 0)),
+                        mode='edge')
+    color = rng.integers(0, 256, 3, dtype=np.uint8)
+    for i in range(n_frames):
+        frame = background.copy()
+        y = (i * 7) % max(1, height - box)
+        x = (i * 11) % max(1, width - box)
+        frame[y:y + box, x:x + box] = color
+        if noise:
+            jitter = rng.integers(-noise, noise + 1, frame.shape)
+            frame = np.clip(frame.astype(np.int16) + jitter, 0, 255).astype(np.uint8)
+        yield frame
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clasifica un vídeo fotograma a fotograma reutilizando lo que no cambia.")
+    parser.add_argument('video', nargs='?', default=None,
+                        help="Arreglo .npy (T, H, W, 3) uint8; sin él se usa una escena sintética")
+    parser.add_argument('--rules', default='rules_100.json', help="Archivo de reglas en rules_data")
+    parser.add_argument('--mf', choices=['trimf', 'trapmf'], default='trimf', help="Tipo de MF")
+    parser.add_argument('--tolerance', type=int, default=0,
+                        help="Cambio por canal por debajo del cual un píxel no se reclasifica")
+    parser.add_argument('--memo-size', type=int, default=DEFAULT_MEMO_SIZE,
+                        help="Entradas del memo RGB -> salida (potencia de 2)")
+    parser.add_argument('--frames', type=int, default=120, help="Fotogramas de la escena sintética")
+    parser.add_argument('--noise', type=int, default=0, help="Ruido por canal de la escena sintética")
+    parser.add_argument('--compare', action='store_true',
+                        help="Comparar con clasificar cada fotograma entero (classify_image)")
+    args = parser.parse_args()
+
+    mf_type = next(t for t in MF_TYPES if args.mf in t)
+    if args.video:
+        frames = list(np.load(args.video, mmap_mode='r'))
+    else:
+        frames = list(synthetic_frames(args.frames, noise=args.noise))
+
+    classifier = StreamClassifier(args.rules, mf_type, args.tolerance, args.memo_size)
+    max_diff = 0.0
+    for frame in frames:
+        values, label_ids, _ = classifier.classify(frame)
+        if args.compare:
+            full_values, _ = classify_image(frame, args.rules, mf_type)
+            both = ~(np.isnan(values) | np.isnan(full_values))
+            max_diff = max(max_diff, float(np.abs(values - full_values)[both].max(initial=0.0)))
+
+    s = classifier.stats()
+    print(f"{s['frames']} fotogramas {frames[0].shape[1]}x{frames[0].shape[0]}  "
+          f"píxeles cambiados {s['changed_fraction']:.1%}  aciertos del memo {s['memo_hit_rate']:.1%}  "
+          f"memo ocupado {s['memo_fill']:.1%}")
+    print(f"Latencia por fotograma: media {s['latency_mean_ms']:.2f} ms  p50 {s['latency_p50_ms']:.2f} ms  "
+          f"p95 {s['latency_p95_ms']:.2f} ms  máx {s['latency_max_ms']:.2f} ms")
+
+    if args.compare:
+        start = time.perf_counter()
+        for frame in frames:
+            classify_image(frame, args.rules, mf_type)
+        full_ms = (time.perf_counter() - start) / len(frames) * 1e3
+        print(f"Fotograma entero (classify_image): {full_ms:.2f} ms/fotograma  "
+              f"diferencia máx con el modo incremental {max_diff:.2e}")
@@ -1,12 +1,17 @@
 import json
 import os
-from skfuzzy import control as ctrl
+
+from fuzzy_metrics import instrument
 
 # El path base es donde se encuentra este script
 RULES_DIR = os.path.join(os.path.dirname(__file__), "rules_data")
+REPORT_SUFFIX = "_report.json"   # informes que fuzzy_minimize deja junto a sus salidas: no son rulesets
 
 def build_rules(json_rules, Rojo, Verde, Azul, Clasificacion):
     """Convierte un diccionario JSON de reglas en objetos ctrl.Rule."""
+    # skfuzzy solo hace falta para construir reglas; leer el JSON no lo necesita
+    from skfuzzy import control as ctrl
+
     rules = []
     
     for rule_data in json_rules:
@@ -28,20 +33,30 @@ def build_rules(json_rules, Rojo, Verde, Azul, Clasificacion):
             
     return rules
 
-def load_rules_from_file(filename, Rojo, Verde, Azul, Clasificacion):
-    """Carga y parsea las reglas de un archivo JSON específico."""
+@instrument('rules/load_json')
+def read_rules_json(filename):
+    """Lee un archivo JSON de reglas y devuelve la lista de diccionarios (vacía si falla)."""
     filepath = os.path.join(RULES_DIR, filename)
-    
+
     if not os.path.exists(filepath):
         print(f"⚠️ Archivo de reglas no encontrado: {filepath}")
         return []
 
     try:
         with open(filepath, 'r') as f:
-            rules_data = json.load(f)
-        
-        return build_rules(rules_data, Rojo, Verde, Azul, Clasificacion)
-        
+            return json.load(f)
+
     except Exception as e:
         print(f"⚠️ Error al cargar o parsear el JSON {filename}: {e}")
+        return []
+
+def load_rules_from_file(filename, Rojo, Verde, Azul, Clasificacion):
+    """Carga y parsea las reglas de un archivo JSON específico."""
+    rules_data = read_rules_json(filename)
+
+    try:
+        return build_rules(rules_data, Rojo, Verde, Azul, Clasificacion)
+
+    except Exception as e:
+        print(f"⚠️ Error al parsear las reglas de {filename}: {e}")
         return []
\ No newline at end of file
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import IMPORT_BUDGETS, import_time  # noqa: E402
+
+
+@pytest.mark.parametrize('module', list(IMPORT_BUDGETS))
+def test_import_budget(module):
+    """`import módulo` en un intérprete nuevo cabe en su presupuesto y no carga skfuzzy, scipy ni Dash."""
+    stats = import_time(module, repeat=3)
+    assert stats['median_s'] <= IMPORT_BUDGETS[module], \
+        f"import {module}: {stats['median_s'] * 1e3:.0f} ms > {IMPORT_BUDGETS[module] * 1e3:.0f} ms"
+    assert not stats['heavy_modules'], f"import {module} carga {', '.join(stats['heavy_modules'])}"